@@ -1,10 +1,162 @@
 import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
 import psycopg
-from pgvector.psycopg import register_vector
+from pgvector.psycopg import register_vector, register_vector_async
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+from .timing import AsyncTimedCursor, TimedCursor, observe
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-def get_conn():
-    conn = psycopg.connect(DATABASE_URL, autocommit=True)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+
+_pool: Optional[ConnectionPool] = None
+_async_pool: Optional[AsyncConnectionPool] = None
+# Serialize first-use initialization so concurrent callers don't each create a
+# pool. Thread locks, not asyncio ones: an asyncio.Lock made at import would be
+# shared by every event loop that touches the pool (asyncio.run per job, tests).
+_pool_lock = threading.Lock()
+_async_pool_lock = threading.Lock()
+
+
+def _configure(conn: psycopg.Connection) -> None:
+    # Runs once per physical connection, not once per checkout.
     register_vector(conn)
-    return conn
+
+
+async def _configure_async(conn: psycopg.AsyncConnection) -> None:
+    await register_vector_async(conn)
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide sync pool, opening it on first use.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool(
+                DATABASE_URL,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE,
+                kwargs={"autocommit": True, "cursor_factory": TimedCursor},
+                configure=_configure,
+                check=ConnectionPool.check_connection,
+                name="sync",
+                open=False,
+            )
+            pool.open()
+            _pool = pool
+    return _pool
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """
+    Returns the process-wide async pool, opening it on first use.
+    Must be called from within the running event loop.
+    """
+    global _async_pool
+    pool = _async_pool
+    if pool is None:
+        with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = AsyncConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    kwargs={"autocommit": True, "cursor_factory": AsyncTimedCursor},
+                    configure=_configure_async,
+                    check=AsyncConnectionPool.check_connection,
+                    name="async",
+                    open=False,
+                )
+            pool = _async_pool
+    if pool.closed:
+        # Idempotent, so concurrent first callers may all await it.
+        await pool.open()
+    return pool
+
+
+@contextmanager
+def get_conn():
+    """
+    Borrows a connection from the sync pool.
+    Use as `with get_conn() as conn:`; the connection is returned on exit.
+    The wait for a connection is recorded as the "db.connect" stage.
+    """
+    t0 = time.perf_counter()
+    with get_pool().connection() as conn:
+        observe("db.connect", time.perf_counter() - t0)
+        yield conn
+
+
+@asynccontextmanager
+async def get_async_conn():
+    """
+    Borrows a connection from the async pool.
+    Use as `async with get_async_conn() as conn:`.
+    """
+    t0 = time.perf_counter()
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        observe("db.connect", time.perf_counter() - t0)
+        yield conn
+
+
+async def open_pools() -> None:
+    """Opens both pools eagerly (called from the app lifespan)."""
+    if not DATABASE_URL:
+        return
+    get_pool()
+    await get_async_pool()
+
+
+async def close_pools() -> None:
+    """Closes both pools (called from the app lifespan)."""
+    global _pool, _async_pool
+    # Unpublish first, so no caller reopens a pool that is closing.
+    async_pool, _async_pool = _async_pool, None
+    if async_pool is not None:
+        await async_pool.close()
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Pool saturation snapshot for /health.
+    `requests_waiting` > 0 means callers are queued for a connection.
+    """
+    out: Dict[str, Any] = {}
+    for label, pool in (("sync", _pool), ("async", _async_pool)):
+        if pool is None:
+            out[label] = {"open": False}
+            continue
+        s = pool.get_stats()
+        out[label] = {
+            "open": True,
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "size": s.get("pool_size", 0),
+            "available": s.get("pool_available", 0),
+            "requests_waiting": s.get("requests_waiting", 0),
+            "requests_num": s.get("requests_num", 0),
+            "requests_queued": s.get("requests_queued", 0),
+            "requests_errors": s.get("requests_errors", 0),
+            "connections_errors": s.get("connections_errors", 0),
+        }
+    return out
@@ -0,0 +1,55 @@
+"""
+Statement timing for pooled connections.
+
+The db layer only exposes hooks; services/telemetry.py installs its span and
+observe functions here on import, so the dependency runs services -> db.
+Until then the hooks do nothing.
+"""
+import contextlib
+from typing import Callable, ContextManager
+
+import psycopg
+
+
+def _no_span(stage: str) -> ContextManager[None]:
+    return contextlib.nullcontext()
+
+
+def _no_observe(stage: str, seconds: float) -> None:
+    pass
+
+
+_span: Callable[[str], ContextManager[None]] = _no_span
+_observe: Callable[[str, float], None] = _no_observe
+
+
+def set_hooks(span: Callable[[str], ContextManager[None]], observe: Callable[[str, float], None]) -> None:
+    """Routes "db.query" spans and "db.connect" waits to `span` and `observe`."""
+    global _span, _observe
+    _span, _observe = span, observe
+
+
+def observe(stage: str, seconds: float) -> None:
+    _observe(stage, seconds)
+
+
+class TimedCursor(psycopg.Cursor):
+    """Records each execute as a "db.query" stage."""
+
+    def execute(self, *args, **kwargs):
+        with _span("db.query"):
+            return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        with _span("db.query"):
+            return super().executemany(*args, **kwargs)
+
+
+class AsyncTimedCursor(psycopg.AsyncCursor):
+    async def execute(self, *args, **kwargs):
+        with _span("db.query"):
+            return await super().execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        with _span("db.query"):
+            return await super().executemany(*args, **kwargs)
@@ -2,18 +2,37 @@
 from __future__ import annotations
 
 import os
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from .db import connection
+from .services import events_service, openai_client, telemetry
 
 # --- Core routers ---
-from .routes import health, synth, workspaces
+from .routes import health, jobs, synth, tenants, workspaces
 
 APP_NAME = os.getenv("APP_NAME", "FifteenPercent Core API")
 APP_VERSION = os.getenv("APP_VERSION", "0.0.1")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connection.open_pools()
+    await openai_client.startup()
+    try:
+        yield
+    finally:
+        await openai_client.shutdown()
+        events_service.buffer.close()
+        await connection.close_pools()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=APP_NAME,
     version=APP_VERSION,
     docs_url="/docs",
@@ -41,12 +60,22 @@ app.add_middleware(
     expose_headers=["Content-Disposition"],
 )
 
+# Added last so it is outermost: request latency includes every other middleware.
+app.add_middleware(telemetry.TimingMiddleware)
+
 # --------------- Router registration ---------------
 app.include_router(health.router, prefix="/health", tags=["health"])
 app.include_router(synth.router, prefix="/synth", tags=["synth"])
 app.include_router(workspaces.router, prefix="/workspaces", tags=["workspaces"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+app.include_router(tenants.router, prefix="/tenants", tags=["tenants"])
 
 # ---------------- Convenience routes ----------------
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(telemetry.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root():
     return {
@@ -57,5 +86,8 @@ def root():
             "/health",
             "/synth",
             "/workspaces",
+            "/jobs",
+            "/tenants",
+            "/metrics",
         ],
     }
\ No newline at end of file
@@ -1,3 +1,3 @@
 # backend/app/routes/__init__.py
-from . import health, synth, workspaces
-__all__ = ["health", "synth", "workspaces"]
\ No newline at end of file
+from . import health, jobs, synth, workspaces
+__all__ = ["health", "jobs", "synth", "workspaces"]
\ No newline at end of file
@@ -1,7 +1,17 @@
 ﻿from fastapi import APIRouter
 
+from ..db.connection import pool_stats
+from ..services import blob_store, events_service, query_cache, synth_cache
+
 router = APIRouter()
 
 @router.get("/")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "db_pool": pool_stats(),
+        "synth_cache": synth_cache.cache.stats(),
+        "query_cache": query_cache.cache.stats(),
+        "events": events_service.buffer.stats(),
+        "blobs": blob_store.stats(),
+    }
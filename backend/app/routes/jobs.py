@@ -0,0 +1,57 @@
+# backend/app/routes/jobs.py
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from ..services import jobs_service
+
+log = logging.getLogger("jobs")
+
+router = APIRouter()
+
+# --- Schemas ---
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    stage: Optional[str] = None
+    progress: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    # Status counts of jobs this one spawned (e.g. per-document indexing of a bulk import).
+    children: Optional[Dict[str, int]] = None
+
+
+# --- API Endpoints ---
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status and per-stage progress of a background job.
+    """
+    job = await run_in_threadpool(jobs_service.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["kind"] == "bulk_import":
+        job["children"] = await run_in_threadpool(jobs_service.children_summary, job_id)
+    return job
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50):
+    """
+    List recent jobs, newest first.
+    """
+    return await run_in_threadpool(jobs_service.list_jobs, status, kind, min(max(1, limit), 500))
@@ -0,0 +1,11 @@
+# backend/app/routes/sse.py
+"""Server-sent event framing shared by the streaming endpoints."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+def event(name: str, data: Any) -> bytes:
+    """Encode one server-sent event."""
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
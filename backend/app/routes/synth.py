@@ -2,11 +2,14 @@
 Document synthesis endpoints (OpenAI version).
 
 POST /synth/document
+POST /synth/document:stream   (same body; text/event-stream, see _stream_document)
 Body:
 {
   "topic": "string",
   "num_sections": 5,
-  "temperature": 0.7
+  "temperature": 0.7,
+  "tenant_id": "optional; enables persisting the result to synth_docs",
+  "use_cache": true
 }
 
 Response:
@@ -16,6 +19,9 @@ Response:
   "outline": ["...", "..."],
   "content_md": "# Document: ...\n\n## ...",
   "provider": "openai|builtin",
+  "failed_sections": [],
+  "cache": "miss|memory|db|coalesced|bypass",
+  "timings": {"outline_ms": 0.0, "sections_ms": 0.0, "section_ms": [...], "total_ms": 0.0}
 }
 """
 
@@ -23,13 +29,18 @@ from __future__ import annotations
 
 import os
 import time
+import random
+import asyncio
 import logging
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-import httpx
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from ..services import openai_client, synth_cache
+from . import sse
+
 router = APIRouter()
 log = logging.getLogger("synth")
 
@@ -39,6 +50,8 @@ class SynthRequest(BaseModel):
     topic: str = Field(..., min_length=3)
     num_sections: int = Field(5, ge=1, le=20)
     temperature: float = Field(0.7, ge=0.0, le=1.0)
+    tenant_id: Optional[str] = None
+    use_cache: bool = True
 
 
 class SynthResponse(BaseModel):
@@ -47,13 +60,24 @@ class SynthResponse(BaseModel):
     outline: List[str]
     content_md: str
     provider: str
+    failed_sections: List[str] = Field(default_factory=list)
+    cache: str = "miss"
+    timings: Dict[str, Any] = Field(default_factory=dict)
 
 
 # ---------- OpenAI config ----------
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
-OPENAI_URL = "https://api.openai.com/v1/chat/completions" if OPENAI_API_KEY else None
+OPENAI_API_KEY = openai_client.OPENAI_API_KEY
+
+# ---------- Section generation config ----------
+
+# Max sections generated at once per request; keep below the provider's rate limit.
+SYNTH_MAX_CONCURRENCY = int(os.getenv("SYNTH_MAX_CONCURRENCY", "4"))
+# Extra attempts per section after _openai_chat has exhausted its own retries.
+SYNTH_SECTION_RETRIES = int(os.getenv("SYNTH_SECTION_RETRIES", "1"))
+# Base of the jittered, doubling pause before each of those extra attempts.
+SYNTH_SECTION_RETRY_DELAY_S = float(os.getenv("SYNTH_SECTION_RETRY_DELAY_S", "1.0"))
 
 # ---------- Helpers ----------
 
@@ -76,18 +100,8 @@ def _parse_numbered_list(text: str) -> List[str]:
     return lines
 
 
-async def _openai_chat(prompt: str, *, max_tokens: int, temperature: float) -> str:
-    """
-    Call OpenAI Chat Completions and return the assistant text.
-    Retries with exponential backoff; raises on final failure.
-    """
-    assert OPENAI_URL and OPENAI_API_KEY
-
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload = {
+def _chat_payload(prompt: str, *, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return {
         "model": OPENAI_MODEL,
         "temperature": temperature,
         "max_tokens": max_tokens,
@@ -97,20 +111,27 @@ async def _openai_chat(prompt: str, *, max_tokens: int, temperature: float) -> s
         ],
     }
 
-    backoff = 0.5
-    async with httpx.AsyncClient(timeout=60) as client:
-        for attempt in range(5):
-            try:
-                r = await client.post(OPENAI_URL, headers=headers, json=payload)
-                r.raise_for_status()
-                j = r.json()
-                return j["choices"][0]["message"]["content"]  # type: ignore[index]
-            except Exception as e:
-                if attempt == 4:
-                    raise
-                log.warning("OpenAI call failed (attempt %s): %s", attempt + 1, e)
-                time.sleep(backoff)
-                backoff *= 2
+
+async def _openai_chat(prompt: str, *, max_tokens: int, temperature: float) -> str:
+    """
+    Call OpenAI Chat Completions and return the assistant text.
+    Retries/backoff/rate limiting live in the shared client; raises on final failure.
+    """
+    assert OPENAI_API_KEY
+    payload = _chat_payload(prompt, max_tokens=max_tokens, temperature=temperature)
+    j = await openai_client.post_json("/chat/completions", payload)
+    return j["choices"][0]["message"]["content"]  # type: ignore[index]
+
+
+async def _openai_chat_stream(prompt: str, *, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+    """Like _openai_chat, but yields content deltas as the provider produces them."""
+    assert OPENAI_API_KEY
+    payload = _chat_payload(prompt, max_tokens=max_tokens, temperature=temperature)
+    async for event in openai_client.stream_json("/chat/completions", payload):
+        choices = event.get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        if delta:
+            yield delta
 
 
 async def _outline_openai(topic: str, n: int, temperature: float) -> List[str]:
@@ -123,8 +144,8 @@ Topic: {topic}
     return _parse_numbered_list(text)
 
 
-async def _section_openai(topic: str, section_title: str, temperature: float) -> str:
-    prompt = f"""Write a detailed, realistic section for a document.
+def _section_prompt(topic: str, section_title: str) -> str:
+    return f"""Write a detailed, realistic section for a document.
 
 Overall Topic: {topic}
 Section Title: {section_title}
@@ -133,9 +154,19 @@ Constraints:
 - Use specific, realistic details and example data points.
 - Mix short paragraphs and bullet points; include a small table if helpful.
 - Output *Markdown only*. Do NOT repeat the section title in the body."""
+
+
+async def _section_openai(topic: str, section_title: str, temperature: float) -> str:
+    prompt = _section_prompt(topic, section_title)
     return await _openai_chat(prompt, max_tokens=3000, temperature=temperature)
 
 
+async def _section_openai_stream(topic: str, section_title: str, temperature: float) -> AsyncIterator[str]:
+    prompt = _section_prompt(topic, section_title)
+    async for delta in _openai_chat_stream(prompt, max_tokens=3000, temperature=temperature):
+        yield delta
+
+
 def _outline_builtin(topic: str, n: int) -> List[str]:
     """Deterministic, offline outline if no OpenAI key present."""
     seeds = [
@@ -178,43 +209,293 @@ def _section_builtin(topic: str, section_title: str) -> str:
 """
 
 
+async def _section_builtin_stream(topic: str, section_title: str) -> AsyncIterator[str]:
+    """Builtin section body emitted line by line, so streaming works offline."""
+    for line in _section_builtin(topic, section_title).splitlines(keepends=True):
+        yield line
+        await asyncio.sleep(0)
+
+
+_FAILED_SECTION_MD = "> Note: This section could not be generated. Try again later."
+
+
+async def _section_retry_pause(attempt: int) -> None:
+    """Full-jitter pause before retry `attempt` (1-based) of a section."""
+    await asyncio.sleep(random.uniform(0, SYNTH_SECTION_RETRY_DELAY_S * (2 ** (attempt - 1))))
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+async def _generate_sections(
+    topic: str, outline: List[str], temperature: float
+) -> Tuple[List[str], List[float], List[str]]:
+    """
+    Generate all section bodies concurrently (bounded by SYNTH_MAX_CONCURRENCY).
+    Returns (bodies, per-section ms, failed titles) in outline order.
+    A section that still fails after SYNTH_SECTION_RETRIES gets a placeholder
+    body instead of failing the whole document.
+    """
+    sem = asyncio.Semaphore(max(1, SYNTH_MAX_CONCURRENCY))
+
+    async def one(title: str) -> Tuple[str, float, bool]:
+        async with sem:
+            t0 = time.perf_counter()
+            for attempt in range(SYNTH_SECTION_RETRIES + 1):
+                if attempt:
+                    await _section_retry_pause(attempt)
+                try:
+                    body = await _section_openai(topic, title, temperature)
+                    return body, _ms(t0), True
+                except Exception as e:
+                    log.warning("Section %r failed (attempt %s): %s", title, attempt + 1, e)
+            return _FAILED_SECTION_MD, _ms(t0), False
+
+    results = await asyncio.gather(*(one(t) for t in outline))
+    bodies = [r[0] for r in results]
+    section_ms = [r[1] for r in results]
+    failed = [title for title, r in zip(outline, results) if not r[2]]
+    return bodies, section_ms, failed
+
+
+def _assemble_markdown(topic: str, outline: List[str], bodies: List[str]) -> str:
+    parts: List[str] = [f"# Document: {topic}\n"]
+    for title, body in zip(outline, bodies):
+        parts.append(f"## {title}\n\n{body.strip()}\n")
+    return "\n".join(parts)
+
+
+def _cache_key(req: SynthRequest) -> str:
+    model = OPENAI_MODEL if OPENAI_API_KEY else "builtin"
+    return synth_cache.request_key(req.topic, req.num_sections, req.temperature, model, req.tenant_id)
+
+
+def _cacheable(value: Dict[str, Any]) -> bool:
+    # Never pin a document with placeholder sections in the cache.
+    return not value.get("failed_sections")
+
+
+def _from_cache(req: SynthRequest, value: Dict[str, Any], source: str, t_start: float) -> SynthResponse:
+    return SynthResponse(
+        topic=value["topic"],
+        num_sections=req.num_sections,
+        outline=value["outline"],
+        content_md=value["content_md"],
+        provider=value["provider"],
+        failed_sections=value.get("failed_sections", []),
+        cache=source,
+        timings={"total_ms": _ms(t_start)},
+    )
+
+
+async def _stream_document(req: SynthRequest) -> AsyncIterator[bytes]:
+    """
+    Event sequence:
+      outline        {"topic", "outline", "provider", "outline_ms"}
+      section_delta  {"index", "delta"}             (interleaved across sections)
+      section_reset  {"index"}                      (a retry discards earlier deltas)
+      section        {"index", "title", "body_md", "ms", "failed"}
+      done           full SynthResponse
+      error          {"detail"}                     (outline failed; stream ends)
+    A cached or coalesced document is sent as just outline + done.
+    """
+    t_start = time.perf_counter()
+    if not req.use_cache:
+        async for chunk in _stream_generate(req, None, t_start):
+            yield chunk
+        return
+
+    # Same single-flight as /document: a concurrent identical request, streamed
+    # or not, waits for this generation instead of starting its own.
+    async with synth_cache.cache.flight(_cache_key(req), tenant_id=req.tenant_id, cacheable=_cacheable) as flight:
+        if flight.value is not None:
+            resp = _from_cache(req, flight.value, flight.source, t_start)
+            yield sse.event("outline", {"topic": resp.topic, "outline": resp.outline, "provider": resp.provider, "outline_ms": 0.0})
+            yield sse.event("done", resp.model_dump())
+            return
+        async for chunk in _stream_generate(req, flight, t_start):
+            yield chunk
+
+
+async def _stream_generate(
+    req: SynthRequest, flight: Optional[synth_cache.Flight], t_start: float
+) -> AsyncIterator[bytes]:
+    """Generates the document for _stream_document; resolves `flight` before the done event."""
+    use_openai = bool(OPENAI_API_KEY)
+    provider = "openai" if use_openai else "builtin"
+
+    try:
+        if use_openai:
+            outline = await _outline_openai(req.topic, req.num_sections, req.temperature)
+        else:
+            outline = _outline_builtin(req.topic, req.num_sections)
+        if not outline:
+            raise RuntimeError("Empty outline from provider")
+    except Exception as e:
+        log.error("Streaming synthesis failed at outline: %s", e)
+        yield sse.event("error", {"detail": f"synthesis_failed: {e}"})
+        return
+    outline_ms = _ms(t_start)
+    yield sse.event("outline", {"topic": req.topic, "outline": outline, "provider": provider, "outline_ms": outline_ms})
+
+    queue: asyncio.Queue = asyncio.Queue()
+    sem = asyncio.Semaphore(max(1, SYNTH_MAX_CONCURRENCY) if use_openai else 1)
+
+    async def run(index: int, title: str) -> None:
+        async with sem:
+            ts = time.perf_counter()
+            for attempt in range(SYNTH_SECTION_RETRIES + 1):
+                if attempt:
+                    await _section_retry_pause(attempt)
+                parts: List[str] = []
+                try:
+                    if use_openai:
+                        deltas = _section_openai_stream(req.topic, title, req.temperature)
+                    else:
+                        deltas = _section_builtin_stream(req.topic, title)
+                    async for delta in deltas:
+                        parts.append(delta)
+                        await queue.put(("section_delta", {"index": index, "delta": delta}))
+                    body = "".join(parts).strip()
+                    await queue.put(("section", {"index": index, "title": title, "body_md": body, "ms": _ms(ts), "failed": False}))
+                    return
+                except Exception as e:
+                    log.warning("Section %r failed (attempt %s): %s", title, attempt + 1, e)
+                    if parts:
+                        await queue.put(("section_reset", {"index": index}))
+            await queue.put(("section", {"index": index, "title": title, "body_md": _FAILED_SECTION_MD, "ms": _ms(ts), "failed": True}))
+
+    t_sections = time.perf_counter()
+    tasks = [asyncio.create_task(run(i, t)) for i, t in enumerate(outline)]
+    bodies: List[str] = [""] * len(outline)
+    section_ms: List[float] = [0.0] * len(outline)
+    failed: List[str] = []
+    try:
+        remaining = len(outline)
+        while remaining:
+            event, data = await queue.get()
+            if event == "section":
+                bodies[data["index"]] = data["body_md"]
+                section_ms[data["index"]] = data["ms"]
+                if data["failed"]:
+                    failed.append(data["title"])
+                remaining -= 1
+            yield sse.event(event, data)
+    finally:
+        # Client disconnects surface here as GeneratorExit; stop pending provider calls.
+        for task in tasks:
+            task.cancel()
+
+    resp = SynthResponse(
+        topic=req.topic,
+        num_sections=req.num_sections,
+        outline=outline,
+        content_md=_assemble_markdown(req.topic, outline, bodies),
+        provider=provider,
+        failed_sections=[t for t in outline if t in failed],
+        cache="miss" if req.use_cache else "bypass",
+        timings={
+            "outline_ms": outline_ms,
+            "sections_ms": _ms(t_sections),
+            "section_ms": section_ms,
+            "total_ms": _ms(t_start),
+            "concurrency": SYNTH_MAX_CONCURRENCY if use_openai else 1,
+        },
+    )
+    if flight is not None:
+        await flight.resolve(resp.model_dump())
+    yield sse.event("done", resp.model_dump())
+
+
 # ---------- Endpoint ----------
 
+async def _build_document(req: SynthRequest) -> SynthResponse:
+    provider = "builtin"
+    failed: List[str] = []
+    t_start = time.perf_counter()
+    if OPENAI_API_KEY:
+        provider = "openai"
+        t0 = time.perf_counter()
+        outline = await _outline_openai(req.topic, req.num_sections, req.temperature)
+        outline_ms = _ms(t0)
+        if not outline:
+            raise RuntimeError("Empty outline from provider")
+
+        t0 = time.perf_counter()
+        bodies, section_ms, failed = await _generate_sections(req.topic, outline, req.temperature)
+        sections_ms = _ms(t0)
+        if len(failed) == len(outline):
+            raise RuntimeError("All sections failed")
+    else:
+        t0 = time.perf_counter()
+        outline = _outline_builtin(req.topic, req.num_sections)
+        outline_ms = _ms(t0)
+        t0 = time.perf_counter()
+        bodies, section_ms = [], []
+        for title in outline:
+            ts = time.perf_counter()
+            bodies.append(_section_builtin(req.topic, title))
+            section_ms.append(_ms(ts))
+        sections_ms = _ms(t0)
+
+    content_md = _assemble_markdown(req.topic, outline, bodies)
+
+    return SynthResponse(
+        topic=req.topic,
+        num_sections=req.num_sections,
+        outline=outline,
+        content_md=content_md,
+        provider=provider,
+        failed_sections=failed,
+        timings={
+            "outline_ms": outline_ms,
+            "sections_ms": sections_ms,
+            "section_ms": section_ms,
+            "total_ms": _ms(t_start),
+            "concurrency": SYNTH_MAX_CONCURRENCY if provider == "openai" else 1,
+        },
+    )
+
+
 @router.post("/document", response_model=SynthResponse)
 async def synthesize_document(req: SynthRequest) -> SynthResponse:
     """
     Build a multi-section markdown document and an outline in one call.
     - Uses OpenAI if OPENAI_API_KEY is set, otherwise a deterministic builtin writer.
+    - Identical requests are served from synth_cache (set use_cache=false to regenerate).
     """
-    provider = "builtin"
+    t_start = time.perf_counter()
     try:
-        if OPENAI_API_KEY:
-            provider = "openai"
-            outline = await _outline_openai(req.topic, req.num_sections, req.temperature)
-            if not outline:
-                raise RuntimeError("Empty outline from provider")
-
-            parts: List[str] = [f"# Document: {req.topic}\n"]
-            for title in outline:
-                body = await _section_openai(req.topic, title, req.temperature)
-                parts.append(f"## {title}\n\n{body.strip()}\n")
-            content_md = "\n".join(parts)
-        else:
-            outline = _outline_builtin(req.topic, req.num_sections)
-            parts = [f"# Document: {req.topic}\n"]
-            for title in outline:
-                parts.append(f"## {title}\n\n{_section_builtin(req.topic, title)}\n")
-            content_md = "\n".join(parts)
-
-        return SynthResponse(
-            topic=req.topic,
-            num_sections=req.num_sections,
-            outline=outline,
-            content_md=content_md,
-            provider=provider,
+        if not req.use_cache:
+            resp = await _build_document(req)
+            resp.cache = "bypass"
+            return resp
+
+        async def build() -> Dict[str, Any]:
+            return (await _build_document(req)).model_dump()
+
+        value, source = await synth_cache.cache.get_or_create(
+            _cache_key(req), build, tenant_id=req.tenant_id, cacheable=_cacheable,
         )
+        if source == "miss":
+            return SynthResponse(**value)
+        return _from_cache(req, value, source, t_start)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"synthesis_failed: {e}") from e
+
+
+@router.post("/document:stream")
+async def synthesize_document_stream(req: SynthRequest) -> StreamingResponse:
+    """
+    Same as /document, but streams the outline, section deltas and finished
+    sections as server-sent events as soon as each is ready.
+    """
+    return StreamingResponse(
+        _stream_document(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,55 @@
+# backend/app/routes/tenants.py
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from ..services import tenant_settings
+
+log = logging.getLogger("tenants")
+
+router = APIRouter()
+
+# --- Schemas ---
+
+class TenantSettingsUpdate(BaseModel):
+    # none | halfvec | binary (see services/tenant_settings.py)
+    vector_quantization: str
+
+
+class TenantSettingsResponse(BaseModel):
+    tenant_id: str
+    vector_quantization: str
+    updated_at: Optional[datetime] = None
+    # Set when a change moves existing vectors in the background.
+    job_id: Optional[str] = None
+
+
+# --- API Endpoints ---
+
+@router.get("/{tenant_id}/settings", response_model=TenantSettingsResponse)
+async def get_settings(tenant_id: str):
+    """
+    Get a tenant's settings (defaults if none were stored).
+    """
+    return await run_in_threadpool(tenant_settings.get, tenant_id)
+
+
+@router.put("/{tenant_id}/settings", response_model=TenantSettingsResponse)
+async def update_settings(tenant_id: str, req: TenantSettingsUpdate):
+    """
+    Change a tenant's vector quantization. Existing vectors are moved to the
+    new index by a "requantize_vectors" job; poll /jobs/{job_id}.
+    """
+    try:
+        return await run_in_threadpool(tenant_settings.set_vector_quantization, tenant_id, req.vector_quantization)
+    except tenant_settings.SettingsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error("Failed to update settings of tenant %s: %s", tenant_id, e)
+        raise HTTPException(status_code=500, detail="Failed to update tenant settings")
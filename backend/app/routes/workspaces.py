@@ -1,12 +1,21 @@
 # backend/app/routes/workspaces.py
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List, Optional
+import mimetypes
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field, UUID4, field_validator, ConfigDict
 
+from ..services import answers, blob_store, bulk_import, documents_service, events_service, extraction, ingest_service, openai_client, page_store, query_cache, rerank, retrieval
+from . import sse
+
 log = logging.getLogger("workspaces")
 
 router = APIRouter()
@@ -33,14 +42,128 @@ class DocumentResponse(BaseModel):
 
 # Placeholder schema for later implementation
 class QueryRequest(BaseModel):
-    question: str
-    top_k: int = 8
+    question: str = Field(..., min_length=1)
+    top_k: int = Field(8, ge=1, le=retrieval.RETRIEVAL_MAX_TOP_K)
+
+class ImportDirectoryRequest(BaseModel):
+    path: str = Field(..., min_length=1)  # relative to IMPORT_ROOT
+
+class PagesResponse(BaseModel):
+    version_id: str
+    page_count: Optional[int] = None
+    pages: List[dict]
+
+class TextSpanResponse(BaseModel):
+    version_id: str
+    char_start: int
+    char_end: int
+    text: str
 
-# Placeholder schema for later implementation
 class QueryResponse(BaseModel):
     answer_md: str
     snippets: List[dict]
     citations: List[dict]
+    provider: str = "builtin"
+    timings: Dict[str, Any] = Field(default_factory=dict)
+
+
+# --- Query pipeline ---
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _hit_timings(version: int, t0: float) -> Dict[str, Any]:
+    return {"cache": "hit", "corpus_version": version, "total_ms": _ms(t0)}
+
+
+async def _cached_query(ws: str, req: QueryRequest) -> Tuple[int, Optional[Dict[str, Any]]]:
+    version = await query_cache.cache.corpus_version(ws)
+    return version, query_cache.cache.get_result(ws, req.question, req.top_k, version)
+
+
+async def _retrieve_for_query(ws: str, req: QueryRequest, version: int, t0: float) -> Tuple[List[dict], Dict[str, Any]]:
+    """Retrieval + rerank; returns the final hits and the timings so far."""
+    candidates = rerank.candidate_count(req.top_k, retrieval.RETRIEVAL_MAX_TOP_K)
+    result = await retrieval.retrieve(ws, req.question, candidates)
+    retrieve_ms = _ms(t0)
+    hits, rerank_stats = await run_in_threadpool(rerank.rerank, req.question, result["hits"], req.top_k)
+    timings = {
+        key: result.get(key)
+        for key in ("mode", "strategy", "scope_rows", "embed_ms", "vector_ms", "lexical_ms")
+        if result.get(key) is not None
+    }
+    timings.update(cache="miss", corpus_version=version, retrieve_ms=retrieve_ms, rerank=rerank_stats)
+    return hits, timings
+
+
+def _store_query(ws: str, req: QueryRequest, version: int, body: Dict[str, Any]) -> None:
+    # Don't pin the extractive fallback used when the provider call failed.
+    if body["provider"] == "openai" or not openai_client.OPENAI_API_KEY:
+        query_cache.cache.put_result(ws, req.question, req.top_k, version, body)
+
+
+async def _answer_builtin_stream(question: str, hits: List[dict]) -> AsyncIterator[str]:
+    for line in answers.answer_builtin(question, hits).splitlines(keepends=True):
+        yield line
+        await asyncio.sleep(0)
+
+
+async def _stream_query(ws: str, req: QueryRequest) -> AsyncIterator[bytes]:
+    """
+    Event sequence:
+      snippets  {"snippets", "citations", "timings"}   (retrieval done)
+      delta     {"delta"}                              (answer text as generated)
+      reset     {}                                     (provider failed mid-answer; a fallback follows)
+      done      full QueryResponse
+      error     {"detail"}                             (retrieval failed; stream ends)
+    """
+    t0 = time.perf_counter()
+    try:
+        version, cached = await _cached_query(ws, req)
+        if cached is not None:
+            timings = _hit_timings(version, t0)
+            yield sse.event("snippets", {"snippets": cached["snippets"], "citations": cached["citations"], "timings": timings})
+            yield sse.event("done", QueryResponse(**cached, timings=timings).model_dump())
+            return
+        hits, timings = await _retrieve_for_query(ws, req, version, t0)
+    except Exception as e:
+        log.error("Failed to query workspace: %s", e)
+        yield sse.event("error", {"detail": "Failed to query workspace"})
+        return
+
+    citations = retrieval.citations_for(hits)
+    yield sse.event("snippets", {"snippets": hits, "citations": citations, "timings": timings})
+
+    t_answer = time.perf_counter()
+    parts: List[str] = []
+    provider = "builtin"
+    if not hits:
+        parts.append(answers.NO_HITS_MD)
+        yield sse.event("delta", {"delta": answers.NO_HITS_MD})
+    else:
+        if openai_client.OPENAI_API_KEY:
+            try:
+                async for delta in answers.answer_openai_stream(req.question, hits):
+                    if not parts:
+                        timings["first_token_ms"] = _ms(t0)
+                    parts.append(delta)
+                    yield sse.event("delta", {"delta": delta})
+                provider = "openai"
+            except Exception as e:
+                log.error("Failed to stream answer, using extractive fallback: %s", e)
+                if parts:
+                    parts = []
+                    yield sse.event("reset", {})
+        if provider == "builtin":
+            async for delta in _answer_builtin_stream(req.question, hits):
+                parts.append(delta)
+                yield sse.event("delta", {"delta": delta})
+
+    body = {"answer_md": "".join(parts).strip(), "snippets": hits, "citations": citations, "provider": provider}
+    _store_query(ws, req, version, body)
+    timings["answer_ms"] = _ms(t_answer)
+    yield sse.event("done", QueryResponse(**body, timings=timings).model_dump())
 
 
 # --- API Endpoints ---
@@ -71,38 +194,278 @@ async def list_workspaces(tenant_id: str):
         log.error("Failed to list workspaces: %s", e)
         raise HTTPException(status_code=500, detail="Failed to list workspaces")
 
-@router.post("/{workspace_id}/documents:upload")
-async def upload_document(workspace_id: UUID4):
+@router.post("/{workspace_id}/documents:upload", status_code=202)
+async def upload_document(
+    workspace_id: UUID4,
+    request: Request,
+    filename: str,
+    title: Optional[str] = None,
+):
     """
     Upload a document to a workspace. (Async job enqueued).
+
+    The request body is the raw file (e.g. `curl --data-binary @manual.pdf`).
+    It is hashed while being spooled to disk, so memory stays flat, and a
+    file already present in the workspace is not parsed again. Extraction,
+    chunking and embedding run in the worker; poll GET /jobs/{job_id}.
     """
+    spool_path = None
     try:
-        # TODO: Implement the file upload and ingestion logic
-        pass
+        spool_path, sha256, size = await documents_service.spool_upload(request.stream())
+
+        existing = await run_in_threadpool(documents_service.find_version_by_sha256, workspace_id, sha256)
+        if existing:
+            os.remove(spool_path)
+            return {"status": "duplicate", "sha256": sha256, "bytes": size, **existing}
+
+        file_kind = os.path.splitext(filename)[1].lstrip(".").lower() or "pdf"
+        await run_in_threadpool(extraction.supported_mime, spool_path, file_kind)
+        job_id = await run_in_threadpool(
+            ingest_service.enqueue_ingest,
+            workspace_id, title or os.path.splitext(filename)[0], spool_path, sha256, file_kind,
+        )
+        documents_service.add_event(workspace_id, "document.upload_queued", "api", {
+            "job_id": job_id, "filename": filename, "sha256": sha256, "bytes": size,
+        })
+        return {"status": "queued", "job_id": job_id, "sha256": sha256, "bytes": size}
+    except documents_service.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except extraction.UnsupportedFormat as e:
+        os.remove(spool_path)
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         log.error("Failed to upload document: %s", e)
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
         raise HTTPException(status_code=500, detail="Failed to upload document")
 
+@router.post("/{workspace_id}/documents/{document_id}/versions:upload", status_code=202)
+async def upload_document_version(
+    workspace_id: UUID4,
+    document_id: UUID4,
+    request: Request,
+    filename: str,
+):
+    """
+    Upload a new version of an existing document. (Async job enqueued).
+
+    The body is the raw file, as for documents:upload. Chunks whose text is
+    unchanged since the previous version keep their rows and vectors, so
+    only the changed parts are embedded; the job result reports reuse_ratio.
+    """
+    doc = await run_in_threadpool(documents_service.find_document_by_id, document_id)
+    if doc is None or str(doc["playground_id"]) != str(workspace_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    spool_path = None
+    try:
+        spool_path, sha256, size = await documents_service.spool_upload(request.stream())
+        file_kind = os.path.splitext(filename)[1].lstrip(".").lower() or doc["kind"] or "pdf"
+        await run_in_threadpool(extraction.supported_mime, spool_path, file_kind)
+        job_id = await run_in_threadpool(
+            ingest_service.enqueue_ingest,
+            workspace_id, doc["title"], spool_path, sha256, file_kind, document_id,
+        )
+        documents_service.add_event(workspace_id, "document.version_queued", "api", {
+            "job_id": job_id, "document_id": str(document_id), "filename": filename, "sha256": sha256, "bytes": size,
+        })
+        return {"status": "queued", "job_id": job_id, "sha256": sha256, "bytes": size}
+    except documents_service.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except extraction.UnsupportedFormat as e:
+        os.remove(spool_path)
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        log.error("Failed to upload document version: %s", e)
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise HTTPException(status_code=500, detail="Failed to upload document version")
+
+@router.post("/{workspace_id}/documents:import", status_code=202)
+async def import_archive(workspace_id: UUID4, request: Request):
+    """
+    Bulk-import a zip or tar(.gz) archive of documents. (Async job enqueued).
+
+    The request body is the raw archive; it is spooled to disk and unpacked
+    by the worker, which deduplicates, inserts documents in batches and fans
+    indexing out as one job per document. Poll GET /jobs/{job_id}.
+    """
+    spool_path = None
+    try:
+        spool_path, sha256, size = await documents_service.spool_upload(request.stream())
+        job_id = await run_in_threadpool(bulk_import.enqueue_import, workspace_id, archive_path=spool_path)
+        return {"status": "queued", "job_id": job_id, "sha256": sha256, "bytes": size}
+    except documents_service.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        log.error("Failed to import archive: %s", e)
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise HTTPException(status_code=500, detail="Failed to import archive")
+
+@router.post("/{workspace_id}/documents:import_directory", status_code=202)
+async def import_directory(workspace_id: UUID4, req: ImportDirectoryRequest):
+    """
+    Bulk-import every supported file below a server-side directory inside IMPORT_ROOT.
+    """
+    try:
+        directory = bulk_import.resolve_import_dir(req.path)
+    except bulk_import.ImportForbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except bulk_import.ImportSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job_id = await run_in_threadpool(bulk_import.enqueue_import, workspace_id, directory=directory)
+        return {"status": "queued", "job_id": job_id}
+    except Exception as e:
+        log.error("Failed to import directory: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to import directory")
+
+@router.get("/{workspace_id}/documents/{document_id}/file")
+async def download_document(workspace_id: UUID4, document_id: UUID4):
+    """
+    Download the original file of a document's latest version.
+
+    Local blobs are served with FileResponse (sendfile / http.response.pathsend
+    where the server supports it); S3 blobs redirect to a presigned URL so the
+    bytes never pass through the API process.
+    """
+    row = await run_in_threadpool(documents_service.find_original, workspace_id, document_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    filename = f"{row['title']}.{row['kind']}" if row["kind"] else row["title"]
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+
+    store = blob_store.get_store()
+    path = store.local_path(row["sha256"])
+    if path and os.path.exists(path):
+        return FileResponse(path, media_type=media_type, filename=filename, headers={**headers, "ETag": f'"{row["sha256"]}"'})
+    if await run_in_threadpool(store.exists, row["sha256"]):
+        url = await run_in_threadpool(store.presigned_url, row["sha256"])
+        if url:
+            return RedirectResponse(url, status_code=307)
+        body = await run_in_threadpool(store.open, row["sha256"])
+        return StreamingResponse(iter(lambda: body.read(documents_service.UPLOAD_CHUNK_SIZE), b""), media_type=media_type)
+    # Versions stored before the blob store kept a plain path in bytes_url.
+    legacy = row["bytes_url"]
+    if legacy and legacy.startswith("/") and os.path.exists(legacy):
+        return FileResponse(legacy, media_type=media_type, filename=filename)
+    raise HTTPException(status_code=404, detail="Original file is not stored")
+
+@router.get("/{workspace_id}/documents/{document_id}/pages", response_model=PagesResponse)
+async def get_document_pages(
+    workspace_id: UUID4,
+    document_id: UUID4,
+    first: int = Query(1, ge=1),
+    last: Optional[int] = Query(None, ge=1),
+    version_id: Optional[str] = None,
+):
+    """
+    Extracted text of pages first..last (default: just `first`) of a document
+    version (default: the latest), at most PAGE_READ_MAX_PAGES per request.
+    Each page has its char_start in the document text, the coordinates of
+    chunk char_spans.
+    """
+    last = first if last is None else last
+    if last < first or last - first + 1 > page_store.PAGE_READ_MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"page range must cover 1-{page_store.PAGE_READ_MAX_PAGES} pages")
+    version = await run_in_threadpool(documents_service.find_version, workspace_id, document_id, version_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Document version not found")
+    pages = await run_in_threadpool(page_store.get_pages, version["version_id"], first, last)
+    return {"version_id": version["version_id"], "page_count": version["page_count"], "pages": pages}
+
+
+@router.get("/{workspace_id}/documents/{document_id}/text", response_model=TextSpanResponse)
+async def get_document_text(
+    workspace_id: UUID4,
+    document_id: UUID4,
+    start: int = Query(..., ge=0),
+    end: int = Query(..., ge=0),
+    version_id: Optional[str] = None,
+):
+    """
+    document_text[start:end] of a version (default: the latest), e.g. a
+    citation's char_span; only the pages it overlaps are read.
+    """
+    if end <= start or end - start > page_store.PAGE_READ_MAX_CHARS:
+        raise HTTPException(status_code=400, detail=f"span must cover 1-{page_store.PAGE_READ_MAX_CHARS} characters")
+    version = await run_in_threadpool(documents_service.find_version, workspace_id, document_id, version_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Document version not found")
+    text = await run_in_threadpool(page_store.get_text_span, version["version_id"], start, end)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Span is outside the document text")
+    return {"version_id": version["version_id"], "char_start": start, "char_end": end, "text": text}
+
+
 @router.post("/{workspace_id}/query", response_model=QueryResponse)
 async def query_workspace(workspace_id: UUID4, req: QueryRequest):
     """
     Query a workspace across all its documents.
+
+    Keyword lookups (SKUs, names, quoted phrases) are answered from the
+    full-text index; other questions run vector and lexical search in
+    parallel and fuse the rankings (see retrieval.retrieve). The hits are
+    then deduped and trimmed to a token budget (rerank.rerank), and the
+    answer cites the returned snippets as [n].
+
+    Responses are cached per (workspace, question, top_k, corpus version);
+    the version changes whenever the workspace's documents do.
     """
     try:
-        # TODO: Implement the retrieval and synthesis logic
-        pass
+        t0 = time.perf_counter()
+        ws = str(workspace_id)
+        version, cached = await _cached_query(ws, req)
+        if cached is not None:
+            return QueryResponse(**cached, timings=_hit_timings(version, t0))
+
+        hits, timings = await _retrieve_for_query(ws, req, version, t0)
+        t_answer = time.perf_counter()
+        answer_md, provider = await answers.answer(req.question, hits)
+        body = {
+            "answer_md": answer_md,
+            "snippets": hits,
+            "citations": retrieval.citations_for(hits),
+            "provider": provider,
+        }
+        _store_query(ws, req, version, body)
+        timings["answer_ms"] = _ms(t_answer)
+        return QueryResponse(**body, timings=timings)
     except Exception as e:
         log.error("Failed to query workspace: %s", e)
         raise HTTPException(status_code=500, detail="Failed to query workspace")
 
+@router.post("/{workspace_id}/query:stream")
+async def query_workspace_stream(workspace_id: UUID4, req: QueryRequest) -> StreamingResponse:
+    """
+    Same as /query, but streams server-sent events: the snippets and
+    citations as soon as retrieval finishes, then the answer as it is
+    generated (see _stream_query for the event sequence).
+    """
+    return StreamingResponse(
+        _stream_query(str(workspace_id), req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{workspace_id}/events")
-async def get_events(workspace_id: UUID4):
+async def get_events(
+    workspace_id: UUID4,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    kind: Optional[str] = None,
+):
     """
-    Get the audit trail for a workspace.
+    Get the audit trail for a workspace, newest first.
+
+    Pass the returned `next_cursor` as `cursor` to fetch the next page;
+    it is null on the last page.
     """
     try:
-        # TODO: Implement the event log retrieval logic
-        pass
+        return await events_service.list_events(str(workspace_id), limit, cursor, kind)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         log.error("Failed to get events: %s", e)
-        raise HTTPException(status_code=500, detail="Failed to get events")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to get events")
@@ -0,0 +1,97 @@
+# backend/app/services/answers.py
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from backend.app.services import openai_client
+
+log = logging.getLogger("answers")
+
+ANSWER_MODEL = os.getenv("ANSWER_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+ANSWER_MAX_TOKENS = int(os.getenv("ANSWER_MAX_TOKENS", "700"))
+# Characters of each snippet included in the prompt.
+ANSWER_SNIPPET_CHARS = int(os.getenv("ANSWER_SNIPPET_CHARS", "1500"))
+
+NO_HITS_MD = "_No documents in this workspace match the question._"
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]?")
+_WORD_RE = re.compile(r"\w{4,}")  # skips most stopwords
+
+
+def build_prompt(question: str, hits: Sequence[Dict[str, Any]]) -> str:
+    sources = "\n\n".join(
+        f"[{i}] {h.get('title') or h['doc_id']} (p. {h['page_start']})\n{h['text'][:ANSWER_SNIPPET_CHARS]}"
+        for i, h in enumerate(hits, 1)
+    )
+    return f"""Answer the question using only the numbered sources below.
+Cite sources inline as [n]. If the sources do not contain the answer, say so.
+Output Markdown only.
+
+Question: {question}
+
+Sources:
+{sources}
+"""
+
+
+def chat_payload(question: str, hits: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "model": ANSWER_MODEL,
+        "temperature": 0.1,
+        "max_tokens": ANSWER_MAX_TOKENS,
+        "messages": [
+            {"role": "system", "content": "You answer questions about the user's documents, citing sources."},
+            {"role": "user", "content": build_prompt(question, hits)},
+        ],
+    }
+
+
+async def answer_openai(question: str, hits: Sequence[Dict[str, Any]]) -> str:
+    j = await openai_client.post_json("/chat/completions", chat_payload(question, hits))
+    return j["choices"][0]["message"]["content"]  # type: ignore[index]
+
+
+async def answer_openai_stream(question: str, hits: Sequence[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Like answer_openai, but yields content deltas as the provider produces them."""
+    async for event in openai_client.stream_json("/chat/completions", chat_payload(question, hits)):
+        choices = event.get("choices") or []
+        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+        if delta:
+            yield delta
+
+
+def answer_builtin(question: str, hits: Sequence[Dict[str, Any]], max_sentences: int = 4) -> str:
+    """
+    Offline extractive answer: the sentences sharing the most words with
+    the question, each cited with its snippet number.
+    """
+    terms = {w.casefold() for w in _WORD_RE.findall(question)}
+    scored: List[Tuple[int, int, int, str]] = []
+    for n, h in enumerate(hits, 1):
+        for pos, m in enumerate(_SENTENCE_RE.finditer(h["text"])):
+            sentence = " ".join(m.group().split())
+            overlap = len(terms & {w.casefold() for w in _WORD_RE.findall(sentence)})
+            if overlap and len(sentence) > 20:
+                scored.append((-overlap, n, pos, sentence))
+    if not scored:
+        return "_No relevant passages found in this workspace._"
+    best = sorted(sorted(scored)[:max_sentences], key=lambda s: (s[1], s[2]))
+    return "\n".join(f"- {s} [{n}]" for _, n, _, s in best)
+
+
+async def answer(question: str, hits: Sequence[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Returns (answer_md, provider). Falls back to the extractive answer when
+    no API key is configured or the provider call fails.
+    """
+    if not hits:
+        return NO_HITS_MD, "builtin"
+    if openai_client.OPENAI_API_KEY:
+        try:
+            return await answer_openai(question, hits), "openai"
+        except Exception as e:
+            log.error("Failed to generate answer, using extractive fallback: %s", e)
+    return answer_builtin(question, hits), "builtin"
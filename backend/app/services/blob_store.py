@@ -0,0 +1,360 @@
+# backend/app/services/blob_store.py
+"""
+Content-addressed storage for original document bytes.
+
+Blobs are keyed by SHA-256, so a file uploaded to several workspaces (or
+several times) is stored once. The `blobs` table counts the document
+versions using each blob (triggers on document_versions keep it current);
+gc() removes blobs that have been unreferenced for BLOB_GC_GRACE_S.
+
+    BLOB_STORE=local  sharded files under BLOB_STORE_DIR (default)
+    BLOB_STORE=s3     any S3-compatible endpoint (AWS, MinIO, ...); needs boto3
+"""
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.app.db.connection import get_conn
+
+log = logging.getLogger("blob_store")
+
+BLOB_STORE = os.getenv("BLOB_STORE", "local")
+# Keep on the same filesystem as DOCUMENT_STORAGE_DIR so storing a spooled upload is a rename.
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.getenv("DOCUMENT_STORAGE_DIR", "/tmp"), "blobs"))
+BLOB_S3_BUCKET = os.getenv("BLOB_S3_BUCKET", "")
+BLOB_S3_PREFIX = os.getenv("BLOB_S3_PREFIX", "blobs/")
+BLOB_S3_ENDPOINT_URL = os.getenv("BLOB_S3_ENDPOINT_URL") or None
+BLOB_S3_PRESIGN_TTL_S = int(os.getenv("BLOB_S3_PRESIGN_TTL_S", "300"))
+# Unreferenced (and orphaned) blobs younger than this are kept, so a re-upload can still claim them.
+BLOB_GC_GRACE_S = float(os.getenv("BLOB_GC_GRACE_S", "3600"))
+BLOB_GC_BATCH = int(os.getenv("BLOB_GC_BATCH", "500"))
+
+
+def _shard(sha256: str) -> str:
+    sha256 = sha256.lower()
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise ValueError(f"not a sha256 digest: {sha256!r}")
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class BlobStore:
+    """Interface shared by the local and S3 stores."""
+
+    name = ""
+
+    def url(self, sha256: str) -> str:
+        raise NotImplementedError
+
+    def put_file(self, path: str, sha256: str) -> bool:
+        """
+        Stores the file at `path` (which is consumed) under `sha256`.
+        Returns False if the blob was already stored. Call under lock(), in
+        the transaction that inserts the referencing version (see gc).
+        """
+        raise NotImplementedError
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    def open(self, sha256: str) -> IO[bytes]:
+        raise NotImplementedError
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        """A filesystem path the blob can be served from directly, if there is one."""
+        return None
+
+    def presigned_url(self, sha256: str) -> Optional[str]:
+        """A short-lived URL clients can download from directly, if supported."""
+        return None
+
+    def delete(self, sha256: str) -> None:
+        raise NotImplementedError
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """Yields (sha256, last modified) for every stored blob."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Files under root/ab/cd/<sha256>. Writes go to a temp file in the target
+    shard and are renamed into place, so readers never see a partial blob.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, _shard(sha256))
+
+    def url(self, sha256: str) -> str:
+        return "file://" + self._path(sha256)
+
+    def put_file(self, path: str, sha256: str) -> bool:
+        dest = self._path(sha256)
+        if os.path.exists(dest):
+            os.utime(dest)  # keeps a just-claimed orphan out of the next sweep
+            os.remove(path)
+            return False
+        shard_dir = os.path.dirname(dest)
+        os.makedirs(shard_dir, exist_ok=True)
+        os.utime(path)  # a spool that waited in the queue must not look like an old orphan
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+        try:
+            os.replace(path, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Spool dir on another filesystem: copy next to the target, then rename.
+            fd, tmp = tempfile.mkstemp(prefix=".put-", dir=shard_dir)
+            try:
+                with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, dest)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            os.remove(path)
+        dir_fd = os.open(shard_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return True
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def open(self, sha256: str) -> IO[bytes]:
+        return open(self._path(sha256), "rb")
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        return self._path(sha256)
+
+    def delete(self, sha256: str) -> None:
+        try:
+            os.remove(self._path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    mtime = os.stat(full).st_mtime
+                except FileNotFoundError:
+                    continue
+                if name.startswith(".put-"):
+                    # Left behind by a crashed copy.
+                    if time.time() - mtime > BLOB_GC_GRACE_S:
+                        os.remove(full)
+                    continue
+                yield name, mtime
+
+
+class S3BlobStore(BlobStore):
+    """Objects at s3://bucket/prefix/ab/cd/<sha256> on AWS or any S3-compatible server."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None, client=None):
+        """`client` replaces the boto3 client, e.g. with backend.bench.stub_s3.StubS3Client."""
+        if not bucket:
+            raise RuntimeError("BLOB_STORE=s3 requires BLOB_S3_BUCKET")
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("BLOB_STORE=s3 requires boto3 (pip install boto3)") from e
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+        self._client_error = client.exceptions.ClientError
+
+    def _key(self, sha256: str) -> str:
+        return self.prefix + _shard(sha256)
+
+    def url(self, sha256: str) -> str:
+        return f"s3://{self.bucket}/{self._key(sha256)}"
+
+    def exists(self, sha256: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put_file(self, path: str, sha256: str) -> bool:
+        if self.exists(sha256):
+            os.remove(path)
+            return False
+        # upload_file switches to multipart for large files; the object only
+        # becomes visible once the upload completes.
+        self._client.upload_file(path, self.bucket, self._key(sha256))
+        os.remove(path)
+        return True
+
+    def open(self, sha256: str) -> IO[bytes]:
+        return self._client.get_object(Bucket=self.bucket, Key=self._key(sha256))["Body"]
+
+    def presigned_url(self, sha256: str) -> Optional[str]:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(sha256)},
+            ExpiresIn=BLOB_S3_PRESIGN_TTL_S,
+        )
+
+    def delete(self, sha256: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(sha256))
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        pages = self._client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                yield obj["Key"].rsplit("/", 1)[-1], obj["LastModified"].timestamp()
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_store() -> BlobStore:
+    global _store
+    if _store is None:
+        if BLOB_STORE == "s3":
+            _store = S3BlobStore(BLOB_S3_BUCKET, BLOB_S3_PREFIX, BLOB_S3_ENDPOINT_URL)
+        elif BLOB_STORE == "local":
+            _store = LocalBlobStore(BLOB_STORE_DIR)
+        else:
+            raise RuntimeError(f"unknown BLOB_STORE {BLOB_STORE!r}")
+    return _store
+
+
+def lock(conn, hashes: List[str]) -> None:
+    """
+    Takes the per-blob transaction advisory locks for `hashes` on `conn`, in
+    sorted order. Writers hold them from put_file until their version rows
+    commit; gc holds them while it deletes objects.
+    """
+    if hashes:
+        conn.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended('blob:' || s, 0)) FROM unnest(%s::text[]) AS s",
+            (sorted(set(hashes)),),
+        )
+
+
+# ---------- Garbage collection ----------
+
+def gc(sweep_orphans: bool = True) -> Dict[str, Any]:
+    """
+    Deletes blobs whose refcount has been zero for BLOB_GC_GRACE_S and, with
+    `sweep_orphans`, stored objects that have no `blobs` row at all (left by
+    a transaction that stored the file and then rolled back).
+
+    Rows are taken FOR UPDATE SKIP LOCKED and deleted first; objects are only
+    deleted after that commit, by _delete_objects. Uploads insert their
+    version row (whose trigger recreates the blobs row) before calling
+    put_file under lock(), so an upload racing gc either commits its row
+    first and gc keeps the object, or sees the object already gone and
+    stores its spool. A session advisory lock keeps several workers from
+    walking the store at once.
+    """
+    with get_conn() as lock_conn:
+        got = lock_conn.execute("SELECT pg_try_advisory_lock(hashtext('blob_gc'))").fetchone()[0]
+        if not got:
+            return {"deleted": 0, "orphans": 0}
+        try:
+            return _gc(sweep_orphans)
+        finally:
+            lock_conn.execute("SELECT pg_advisory_unlock(hashtext('blob_gc'))")
+
+
+def _gc(sweep_orphans: bool) -> Dict[str, Any]:
+    store = get_store()
+    deleted = 0
+    select_sql = """
+    SELECT sha256 FROM blobs
+    WHERE refcount <= 0 AND unreferenced_since < now() - make_interval(secs => %s)
+    ORDER BY unreferenced_since
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+    """
+    with get_conn() as conn:
+        while True:
+            with conn.transaction():
+                shas = [r[0] for r in conn.execute(select_sql, (BLOB_GC_GRACE_S, BLOB_GC_BATCH)).fetchall()]
+                conn.execute("DELETE FROM blobs WHERE sha256 = ANY(%s)", (shas,))
+            deleted += _delete_objects(conn, store, shas)
+            if len(shas) < BLOB_GC_BATCH:
+                break
+
+    orphans = 0
+    if sweep_orphans:
+        cutoff = time.time() - BLOB_GC_GRACE_S
+        candidates: List[str] = []
+
+        def _sweep(batch: List[str]) -> int:
+            with get_conn() as conn:
+                return _delete_objects(conn, store, batch)
+
+        for sha, mtime in store.iter_blobs():
+            if mtime < cutoff:
+                candidates.append(sha)
+            if len(candidates) >= BLOB_GC_BATCH:
+                orphans += _sweep(candidates)
+                candidates = []
+        if candidates:
+            orphans += _sweep(candidates)
+
+    if deleted or orphans:
+        log.info("Blob GC: %s unreferenced and %s orphaned blobs deleted", deleted, orphans)
+    return {"deleted": deleted, "orphans": orphans}
+
+
+def _delete_objects(conn, store: BlobStore, shas: List[str]) -> int:
+    """
+    Deletes the objects among `shas` that have no committed `blobs` row. The
+    check runs under lock(), so it sees any upload that is storing the same
+    content: such an upload either commits its row before the check, or
+    calls put_file after the delete and finds nothing to reuse.
+    """
+    if not shas:
+        return 0
+    with conn.transaction():
+        lock(conn, shas)
+        known = {r[0] for r in conn.execute("SELECT sha256 FROM blobs WHERE sha256 = ANY(%s)", (shas,))}
+        gone = [s for s in shas if s not in known]
+        for sha in gone:
+            store.delete(sha)
+    return len(gone)
+
+
+def stats() -> Dict[str, Any]:
+    sql = """
+    SELECT count(*) AS blobs,
+           count(*) FILTER (WHERE refcount <= 0) AS unreferenced,
+           coalesce(sum(refcount), 0) AS references
+    FROM blobs
+    """
+    try:
+        with get_conn() as conn:
+            blobs, unreferenced, references = conn.execute(sql).fetchone()
+        return {"store": BLOB_STORE, "blobs": blobs, "unreferenced": unreferenced, "references": int(references)}
+    except Exception as e:
+        log.error("Failed to read blob stats: %s", e)
+        return {"store": BLOB_STORE}
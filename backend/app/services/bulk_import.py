@@ -0,0 +1,246 @@
+# backend/app/services/bulk_import.py
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import os
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.app.services import documents_service, extraction, jobs_service
+
+log = logging.getLogger("bulk_import")
+
+# Server-side directory imports are only allowed below this path; unset disables them.
+IMPORT_ROOT = os.getenv("IMPORT_ROOT", "")
+IMPORT_EXTENSIONS = {e.strip().lower() for e in os.getenv("IMPORT_EXTENSIONS", "pdf,txt,md,docx").split(",") if e.strip()}
+IMPORT_MAX_FILES = int(os.getenv("IMPORT_MAX_FILES", "10000"))
+# Files parsed concurrently, and files per insert transaction.
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "4"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "100"))
+
+
+class ImportSourceError(jobs_service.PermanentJobError):
+    pass
+
+
+class ImportForbidden(ImportSourceError):
+    pass
+
+
+def resolve_import_dir(path: str) -> str:
+    """
+    Real path of a server-side import directory, which must lie inside IMPORT_ROOT.
+    """
+    if not IMPORT_ROOT:
+        raise ImportForbidden("directory imports are disabled (IMPORT_ROOT is not set)")
+    root = os.path.realpath(IMPORT_ROOT)
+    real = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, real]) != root:
+        raise ImportForbidden("path is outside the import root")
+    if not os.path.isdir(real):
+        raise ImportSourceError("not a directory")
+    return real
+
+
+def _discard(path: str) -> None:
+    with contextlib.suppress(OSError):
+        os.remove(path)
+
+
+def _kind(name: str) -> str:
+    return os.path.splitext(name)[1].lstrip(".").lower()
+
+
+def _iter_archive(path: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Yields (member name, file object) for regular files, in archive order."""
+    if zipfile.is_zipfile(path):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        with zf.open(info) as f:
+                            yield info.filename, f
+        except zipfile.BadZipFile as e:
+            raise ImportSourceError(f"corrupt zip archive: {e}")
+        return
+    try:
+        # Sequential read: tar members are streamed, never listed up front.
+        with tarfile.open(path, "r|*") as tf:
+            for member in tf:
+                if member.isfile():
+                    f = tf.extractfile(member)
+                    if f is not None:
+                        yield member.name, f
+    except tarfile.ReadError as e:
+        raise ImportSourceError(f"not a zip or tar archive: {e}")
+
+
+def _iter_directory(root: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            if os.path.islink(full):
+                continue
+            with open(full, "rb") as f:
+                yield os.path.relpath(full, root), f
+
+
+def _spool_member(src: IO[bytes]) -> Tuple[str, str, int]:
+    """Copies one member into DOCUMENT_STORAGE_DIR while hashing it."""
+    h = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".part", dir=documents_service.DOCUMENT_STORAGE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = src.read(documents_service.UPLOAD_CHUNK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > documents_service.UPLOAD_MAX_BYTES:
+                    raise documents_service.UploadTooLarge(f"file exceeds {documents_service.UPLOAD_MAX_BYTES} bytes")
+                h.update(block)
+                out.write(block)
+    except BaseException:
+        _discard(path)
+        raise
+    return path, h.hexdigest(), size
+
+
+def enqueue_import(workspace_id: Any, *, archive_path: Optional[str] = None, directory: Optional[str] = None) -> str:
+    job_id = jobs_service.enqueue("bulk_import", {
+        "workspace_id": str(workspace_id),
+        "archive_path": archive_path,
+        "directory": directory,
+    }, max_attempts=3)
+    if job_id is None:
+        raise RuntimeError("failed to enqueue import job")
+    return job_id
+
+
+def _parse(item: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        item["pages"] = extraction.extract_pages(item["spool_path"], item["kind"])
+    except Exception as e:
+        log.error("Failed to extract %s: %s", item["name"], e)
+        item["pages"] = None
+    return item
+
+
+def run_bulk_import(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler for "bulk_import".
+
+    Members are spooled (hashed on the way), deduplicated against each other
+    and the workspace, parsed IMPORT_PARSE_WORKERS at a time, and inserted
+    IMPORT_BATCH_SIZE per transaction. Each new document then gets its own
+    "index_version" job (chunk + embed), so the worker pool indexes them in
+    parallel; GET /jobs/{id} reports their aggregate status.
+
+    A bad source (ImportSourceError) fails the job without retries. The
+    uploaded archive is removed once the job will not run again.
+    """
+    archive_path = job["payload"].get("archive_path")
+    retry_pending = False
+    try:
+        return _import(job)
+    except ImportSourceError:
+        raise
+    except Exception:
+        # Transient failure: the retry reads the archive again.
+        retry_pending = job["attempts"] < job["max_attempts"]
+        raise
+    finally:
+        if archive_path and not retry_pending:
+            _discard(archive_path)
+
+
+def _import(job: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = job["job_id"]
+    p = job["payload"]
+    ws = p["workspace_id"]
+    stats = {"files": 0, "imported": 0, "duplicates": 0, "unsupported": 0, "too_large": 0, "failed": 0}
+    children: List[str] = []
+
+    if p.get("archive_path"):
+        source = _iter_archive(p["archive_path"])
+    else:
+        source = _iter_directory(resolve_import_dir(p["directory"]))
+
+    batch: List[Dict[str, Any]] = []
+    seen: set = set()
+    pool = ThreadPoolExecutor(max_workers=max(1, IMPORT_PARSE_WORKERS))
+
+    def flush() -> None:
+        existing = documents_service.find_versions_by_sha256(ws, [i["sha256"] for i in batch])
+        fresh = []
+        for item in batch:
+            if item["sha256"] in existing:
+                stats["duplicates"] += 1
+                _discard(item["spool_path"])
+            else:
+                fresh.append(item)
+        parsed = []
+        for item in pool.map(_parse, fresh):
+            if item["pages"] is None:
+                # Unreadable file: not imported, so it can be fixed and uploaded again.
+                stats["failed"] += 1
+                _discard(item["spool_path"])
+            else:
+                parsed.append(item)
+        created = documents_service.create_documents_bulk(ws, parsed)
+        if created is None:
+            stats["failed"] += len(parsed)
+            for item in parsed:
+                _discard(item["spool_path"])
+        else:
+            fresh = [c for c in created if not c.get("duplicate")]
+            stats["imported"] += len(fresh)
+            stats["duplicates"] += len(created) - len(fresh)
+            children.extend(jobs_service.enqueue_many("index_version", [
+                {"workspace_id": ws, "document_id": c["document_id"], "version_id": c["version_id"], "parent_job_id": job_id}
+                for c in fresh
+            ]))
+        batch.clear()
+        jobs_service.set_progress(job_id, "import", **stats, index_jobs=len(children))
+
+    try:
+        jobs_service.set_progress(job_id, "import", status="running")
+        for name, f in source:
+            kind = _kind(name)
+            if kind not in IMPORT_EXTENSIONS or os.path.basename(name).startswith("."):
+                stats["unsupported"] += 1
+                continue
+            stats["files"] += 1
+            if stats["files"] > IMPORT_MAX_FILES:
+                raise ImportSourceError(f"more than {IMPORT_MAX_FILES} files")
+            try:
+                spool_path, sha256, size = _spool_member(f)
+            except documents_service.UploadTooLarge:
+                stats["too_large"] += 1
+                continue
+            if sha256 in seen:
+                stats["duplicates"] += 1
+                _discard(spool_path)
+                continue
+            seen.add(sha256)
+            title = os.path.splitext(os.path.basename(name))[0]
+            batch.append({"name": name, "title": title, "kind": kind, "spool_path": spool_path, "sha256": sha256, "bytes": size})
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        pool.shutdown(wait=True)
+        for item in batch:  # left over after an error
+            _discard(item["spool_path"])
+
+    jobs_service.set_progress(job_id, "import", **stats, index_jobs=len(children), status="done")
+    documents_service.add_event(ws, "documents.bulk_imported", "worker", {"job_id": job_id, **stats})
+    return {**stats, "index_jobs": len(children)}
@@ -0,0 +1,134 @@
+# backend/app/services/chunking.py
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, NamedTuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to an approximate counter
+    tiktoken = None
+
+log = logging.getLogger("chunking")
+
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "cl100k_base")
+# Once a chunk holds this fraction of chunk_size it ends at the next sentence end
+# or page start. Content-defined boundaries re-align shortly after an edit, so
+# the chunks of a new version's unchanged text are identical (and reusable).
+# 1.0 gives plain fixed-size windows.
+CHUNK_MIN_FILL = float(os.getenv("CHUNK_MIN_FILL", "0.75"))
+
+# A piece is one whitespace-delimited run (capped so a huge blob still splits),
+# matching how BPE tokenizers attach leading spaces to words.
+_PIECE_RE = re.compile(r"\S{1,64}")
+_APPROX_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        log.warning("tiktoken not installed; using approximate token counts")
+        return None
+    try:
+        return tiktoken.get_encoding(CHUNK_TOKENIZER)
+    except Exception as e:  # e.g. BPE file not downloadable offline
+        log.warning("tokenizer %s unavailable (%s); using approximate token counts", CHUNK_TOKENIZER, e)
+        return None
+
+
+@lru_cache(maxsize=1 << 16)
+def count_tokens(piece: str) -> int:
+    """
+    Token count for one piece (" word"). Cached: natural text repeats a small
+    vocabulary, so most lookups never reach the tokenizer.
+    """
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode_ordinary(piece))
+    return sum(max(1, (len(w) + 3) // 4) for w in _APPROX_RE.findall(piece)) or 1
+
+
+class _Piece(NamedTuple):
+    start: int      # absolute char offset of the piece body
+    end: int
+    page_no: int
+    tokens: int
+    gap: str        # text between the previous piece and this one
+    body: str
+
+
+def iter_chunks(
+    pages: Iterable[Dict[str, Any]],
+    chunk_size: int,
+    overlap: int,
+    min_fill: float = CHUNK_MIN_FILL,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams token-bounded, overlapping chunks over pages of {"page_no", "text"}.
+
+    Offsets refer to the document text formed by joining pages with "\\n", so
+    a chunk's `text` is exactly doc_text[char_start:char_end] even when it
+    spans a page break. Only the current window is held in memory.
+    """
+    chunk_size = max(1, chunk_size)
+    overlap = max(0, min(overlap, chunk_size // 2))
+    soft_limit = max(1, int(chunk_size * min_fill))
+
+    window: Deque[_Piece] = deque()
+    tokens = 0
+    fresh = 0           # pieces added since the last emitted chunk
+    seq = 0
+    offset = 0          # absolute offset of the current page
+    carry = ""          # whitespace pending before the next piece
+
+    def emit() -> Dict[str, Any]:
+        first, last = window[0], window[-1]
+        text = first.body + "".join(p.gap + p.body for p in islice(window, 1, None))
+        return {
+            "seq": seq,
+            "text": text,
+            "page_start": first.page_no,
+            "page_end": last.page_no,
+            "char_start": first.start,
+            "char_end": last.end,
+            "token_len": tokens,
+        }
+
+    for page_idx, page in enumerate(pages):
+        text = page.get("text") or ""
+        page_no = page.get("page_no", page_idx + 1)
+        if page_idx:
+            carry += "\n"
+        pos = 0
+        new_page = True
+        for m in _PIECE_RE.finditer(text):
+            gap = carry + text[pos:m.start()]
+            carry = ""
+            pos = m.end()
+            body = m.group()
+            ntok = count_tokens((" " if gap else "") + body)
+            boundary = bool(window) and (new_page or bool(_SENTENCE_END_RE.search(window[-1].body)))
+            new_page = False
+
+            if fresh and (tokens + ntok > chunk_size or (boundary and tokens >= soft_limit)):
+                yield emit()
+                seq += 1
+                fresh = 0
+                while window and tokens > overlap:
+                    tokens -= window.popleft().tokens
+
+            window.append(_Piece(offset + m.start(), offset + m.end(), page_no, ntok, gap, body))
+            tokens += ntok
+            fresh += 1
+        carry += text[pos:]
+        offset += len(text) + 1
+
+    if fresh:
+        yield emit()
+
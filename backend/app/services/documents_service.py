@@ -1,19 +1,32 @@
 # backend/app/services/documents_service.py
 from __future__ import annotations
 
+import asyncio
 import logging
 import uuid
 import hashlib
 import os
-import fitz # PyMuPDF
+import tempfile
+import time
 
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 from psycopg.rows import dict_row
 
 from backend.app.db.connection import get_conn
+from backend.app.services import blob_store, chunking, events_service, extraction, jobs_service, page_store, telemetry
 
 log = logging.getLogger("documents_service")
 
+# Spooled uploads land here and are renamed into place, so keep both on one filesystem.
+DOCUMENT_STORAGE_DIR = os.getenv("DOCUMENT_STORAGE_DIR", "/tmp")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    pass
+
 # --- Helpers ---
 
 def _sha256_bytes(data: bytes) -> str:
@@ -24,8 +37,177 @@ def _sha256_bytes(data: bytes) -> str:
     h.update(data)
     return h.hexdigest()
 
+
+async def spool_upload(chunks: AsyncIterator[bytes]) -> Tuple[str, str, int]:
+    """
+    Streams an upload to a temp file in DOCUMENT_STORAGE_DIR, hashing as it goes.
+    Returns (spool_path, sha256, size). Peak memory is one chunk.
+    Raises UploadTooLarge (and removes the spool file) past UPLOAD_MAX_BYTES.
+    """
+    h = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=DOCUMENT_STORAGE_DIR)
+    f = os.fdopen(fd, "wb")
+
+    def _write(chunk: bytes) -> None:
+        h.update(chunk)
+        f.write(chunk)
+
+    try:
+        pending = bytearray()
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise UploadTooLarge(f"upload exceeds {UPLOAD_MAX_BYTES} bytes")
+            pending += chunk
+            # Batch small network reads so each thread hop writes ~UPLOAD_CHUNK_SIZE.
+            if len(pending) >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(_write, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(_write, bytes(pending))
+        f.close()
+    except BaseException:
+        f.close()
+        _remove_quietly(path)
+        raise
+    return path, h.hexdigest(), size
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
 # --- Public API ---
 
+_FIND_IN_WORKSPACE_SQL = """
+SELECT DISTINCT ON (dv.sha256) dv.sha256, dv.id AS version_id, dv.document_id, d.title, dv.page_count, dv.created_at
+FROM document_versions dv
+JOIN documents d ON d.id = dv.document_id
+WHERE d.playground_id = %s AND dv.sha256 = ANY(%s)
+ORDER BY dv.sha256, dv.created_at
+"""
+
+
+def _lock_hashes(cur, workspace_id: str, hashes: List[str]) -> None:
+    """
+    Serializes transactions creating documents with these hashes in the
+    workspace, until commit. Taken in sorted order so batches can't deadlock.
+    """
+    for sha256 in sorted(set(hashes)):
+        cur.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (f"document:{workspace_id}:{sha256}",))
+
+
+def find_version_by_sha256(workspace_id: uuid.UUID, sha256: str) -> Optional[Dict[str, Any]]:
+    """
+    Finds an existing document version in the workspace with the same content hash.
+    Database errors propagate: a failed lookup must not read as "not a duplicate".
+    """
+    row = find_versions_by_sha256(workspace_id, [sha256]).get(sha256)
+    if row is not None:
+        del row["sha256"]
+    return row
+
+
+def find_versions_by_sha256(workspace_id: uuid.UUID, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Batched find_version_by_sha256: maps each hash already present in the
+    workspace to its earliest version.
+    """
+    with get_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_FIND_IN_WORKSPACE_SQL, (str(workspace_id), list(hashes)))
+            return {r["sha256"]: r for r in cur.fetchall()}
+
+
+def create_documents_bulk(workspace_id: uuid.UUID, items: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Creates documents, their first versions and playground links for many
+    already-extracted files in one transaction, one multi-row INSERT per table.
+    Each item has title, kind, spool_path, sha256 and pages. Spool files are
+    moved into the blob store inside the transaction; on failure nothing is
+    inserted and the caller still owns the remaining spool files.
+    Items whose hash another upload added to the workspace meanwhile are not
+    inserted; they come back with "duplicate": True and their spool removed.
+    """
+    if not items:
+        return []
+    ws = str(workspace_id)
+    store = blob_store.get_store()
+    duplicates: List[Dict[str, Any]] = []
+
+    try:
+        with get_conn() as conn:
+            with conn.transaction():
+                with conn.cursor(row_factory=dict_row) as cur:
+                    _lock_hashes(cur, ws, [i["sha256"] for i in items])
+                    cur.execute(_FIND_IN_WORKSPACE_SQL, (ws, [i["sha256"] for i in items]))
+                    existing = {r["sha256"]: r for r in cur.fetchall()}
+                rows = []
+                for item in items:
+                    if item["sha256"] in existing:
+                        duplicates.append(item)
+                        continue
+                    doc_id, version_id = str(uuid.uuid4()), str(uuid.uuid4())
+                    rows.append((doc_id, version_id, store.url(item["sha256"]), item))
+                if not rows:
+                    return _bulk_duplicates(duplicates, existing)
+                conn.execute(
+                    """
+                    INSERT INTO documents (id, playground_id, title, kind, latest_version_id)
+                    SELECT d.id, %s, d.title, d.kind, d.version_id
+                    FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[]) AS d(id, title, kind, version_id)
+                    """,
+                    (ws, [r[0] for r in rows], [r[3]["title"] for r in rows], [r[3]["kind"] for r in rows], [r[1] for r in rows]),
+                )
+                conn.execute(
+                    """
+                    INSERT INTO document_versions (id, document_id, sha256, bytes_url, page_count)
+                    SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::int[])
+                    """,
+                    (
+                        [r[1] for r in rows], [r[0] for r in rows], [r[3]["sha256"] for r in rows],
+                        [r[2] for r in rows], [len(r[3]["pages"]) for r in rows],
+                    ),
+                )
+                with conn.cursor() as cur:
+                    page_store.write_pages_many(cur, [(r[1], r[3]["pages"]) for r in rows])
+                conn.execute(
+                    """
+                    INSERT INTO playground_docs (pg_id, doc_id)
+                    SELECT %s, unnest(%s::text[])
+                    ON CONFLICT DO NOTHING
+                    """,
+                    (ws, [r[0] for r in rows]),
+                )
+                blob_store.lock(conn, [item["sha256"] for _, _, _, item in rows])
+                for _, _, _, item in rows:
+                    store.put_file(item["spool_path"], item["sha256"])
+        log.info("Bulk-created %s documents in workspace %s", len(rows), ws)
+        return [
+            {"document_id": doc_id, "version_id": version_id, "title": item["title"], "page_count": len(item["pages"])}
+            for doc_id, version_id, _, item in rows
+        ] + _bulk_duplicates(duplicates, existing)
+    except Exception as e:
+        log.error("Failed to bulk-create documents in workspace %s: %s", ws, e)
+        return None
+
+
+def _bulk_duplicates(items: List[Dict[str, Any]], existing: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for item in items:
+        _remove_quietly(item["spool_path"])
+        found = existing[item["sha256"]]
+        out.append({
+            "document_id": found["document_id"], "version_id": found["version_id"],
+            "title": found["title"], "page_count": found["page_count"], "duplicate": True,
+        })
+    return out
+
+
 def create_document_and_version(
     workspace_id: uuid.UUID,
     title: str,
@@ -33,32 +215,56 @@ def create_document_and_version(
     file_kind: str,
 ) -> Optional[Dict[str, Any]]:
     """
-    Creates a new document record and an initial version.
+    Creates a new document record and an initial version from in-memory bytes.
+    Prefer create_document_and_version_from_path for uploads.
+    """
+    fd, spool_path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=DOCUMENT_STORAGE_DIR)
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_bytes)
+    return create_document_and_version_from_path(
+        workspace_id, title, spool_path, _sha256_bytes(file_bytes), file_kind
+    )
+
+
+def create_document_and_version_from_path(
+    workspace_id: uuid.UUID,
+    title: str,
+    spool_path: str,
+    file_hash: str,
+    file_kind: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Creates a new document record and an initial version from a spooled file.
+    The file is parsed from the spool, then moved into the blob store in the
+    same transaction that references it (see blob_store.gc for why).
+    If a concurrent upload already added the same bytes to the workspace, that
+    document is returned instead, with "duplicate": True. Extraction errors,
+    extraction.UnsupportedFormat included, are raised and nothing is stored.
     """
     doc_id = str(uuid.uuid4())
     version_id = str(uuid.uuid4())
-    file_hash = _sha256_bytes(file_bytes)
+    store = blob_store.get_store()
 
-    # TODO: Implement file storage to disk (e.g., S3/local)
-    # This is a placeholder for saving the file, we can discuss the path later
-    file_path = os.path.join("/tmp", f"{version_id}__{doc_id}")
-    with open(file_path, "wb") as f:
-        f.write(file_bytes)
-    
-    # Extract text and page count using PyMuPDF (fitz)
-    try:
-        pdf = fitz.open(stream=file_bytes, filetype="pdf")
-        pages_json = [{"page_no": i, "text": page.get_text("text")} for i, page in enumerate(pdf, 1)]
-        page_count = len(pages_json)
-        pdf.close()
-    except Exception as e:
-        log.error("Failed to extract text from PDF: %s", e)
-        pages_json = []
-        page_count = 0
+    # Extract text and page count with the extractor for the file's detected type
+    pages = extraction.extract_pages(spool_path, file_kind)
+    page_count = len(pages)
 
     try:
         with get_conn() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
+            with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+                # The caller's duplicate check ran before this transaction; repeat it under the lock
+                _lock_hashes(cur, str(workspace_id), [file_hash])
+                cur.execute(_FIND_IN_WORKSPACE_SQL, (str(workspace_id), [file_hash]))
+                existing = cur.fetchone()
+                if existing is not None:
+                    _remove_quietly(spool_path)
+                    return {
+                        "document": {"id": existing["document_id"], "title": existing["title"]},
+                        "version": {"id": existing["version_id"], "document_id": existing["document_id"]},
+                        "page_count": existing["page_count"],
+                        "duplicate": True,
+                    }
+
                 # Insert into documents table
                 doc_sql = """
                 INSERT INTO documents (id, playground_id, title, kind, latest_version_id)
@@ -68,27 +274,101 @@ def create_document_and_version(
                 cur.execute(doc_sql, (doc_id, str(workspace_id), title, file_kind, version_id))
                 document = cur.fetchone()
 
-                # Insert into document_versions table
+                # Insert into document_versions table (takes a blob reference via trigger)
                 version_sql = """
-                INSERT INTO document_versions (id, document_id, sha256, bytes_url, pages_json)
+                INSERT INTO document_versions (id, document_id, sha256, bytes_url, page_count)
                 VALUES (%s, %s, %s, %s, %s)
                 RETURNING id, document_id, created_at
                 """
-                cur.execute(version_sql, (version_id, doc_id, file_hash, file_path, pages_json))
+                cur.execute(version_sql, (version_id, doc_id, file_hash, store.url(file_hash), page_count))
                 version = cur.fetchone()
-                
-                # Update latest_version_id
-                update_sql = "UPDATE documents SET latest_version_id = %s WHERE id = %s"
-                cur.execute(update_sql, (version_id, doc_id))
+                page_store.write_pages(cur, version_id, pages)
+
+                # Make the document visible to workspace queries
+                link_sql = "INSERT INTO playground_docs (pg_id, doc_id) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+                cur.execute(link_sql, (str(workspace_id), doc_id))
 
-                log.info("Document %s created with version %s", doc_id, version_id)
-                return {"document": document, "version": version}
+                blob_store.lock(cur, [file_hash])
+                store.put_file(spool_path, file_hash)
+
+        log.info("Document %s created with version %s", doc_id, version_id)
+        return {"document": document, "version": version, "page_count": page_count}
 
     except Exception as e:
         log.error("Failed to insert document and version into DB: %s", e)
-        # TODO: Handle cleanup of the saved file if DB insert fails
+        _remove_quietly(spool_path)
+        return None
+
+def create_version_from_path(
+    document_id: uuid.UUID,
+    spool_path: str,
+    file_hash: str,
+    file_kind: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Adds a new version to an existing document from a spooled file and makes
+    it the latest. Chunks are left alone; chunk_document_version diffs them.
+    Extraction errors are raised, as for create_document_and_version_from_path.
+    """
+    doc_id = str(document_id)
+    version_id = str(uuid.uuid4())
+    store = blob_store.get_store()
+
+    pages = extraction.extract_pages(spool_path, file_kind)
+
+    try:
+        with get_conn() as conn:
+            with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    """
+                    INSERT INTO document_versions (id, document_id, sha256, bytes_url, page_count)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (document_id, sha256) DO NOTHING
+                    RETURNING id, document_id, created_at
+                    """,
+                    (version_id, doc_id, file_hash, store.url(file_hash), len(pages)),
+                )
+                version = cur.fetchone()
+                if version is None:
+                    # A concurrent upload of the same bytes committed this version first.
+                    cur.execute(
+                        "SELECT id, document_id, created_at, page_count FROM document_versions"
+                        " WHERE document_id = %s AND sha256 = %s",
+                        (doc_id, file_hash),
+                    )
+                    version = cur.fetchone()
+                    _remove_quietly(spool_path)
+                    return {"version": version, "page_count": version.pop("page_count"), "duplicate": True}
+                page_store.write_pages(cur, version_id, pages)
+                cur.execute("UPDATE documents SET latest_version_id = %s, kind = %s WHERE id = %s", (version_id, file_kind, doc_id))
+                blob_store.lock(cur, [file_hash])
+                store.put_file(spool_path, file_hash)
+
+        log.info("Document %s has new version %s", doc_id, version_id)
+        return {"version": version, "page_count": len(pages)}
+
+    except Exception as e:
+        log.error("Failed to insert version of document %s: %s", doc_id, e)
+        _remove_quietly(spool_path)
         return None
 
+
+def find_document_version_by_sha256(doc_id: uuid.UUID, sha256: str) -> Optional[Dict[str, Any]]:
+    """
+    Finds the version of this document with the given content hash (at most
+    one, see migration 012). Database errors propagate.
+    """
+    sql = """
+    SELECT id AS version_id, document_id, created_at
+    FROM document_versions
+    WHERE document_id = %s AND sha256 = %s
+    """
+    with get_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(sql, (str(doc_id), sha256))
+            return cur.fetchone()
+
+
 def find_document_by_id(doc_id: uuid.UUID) -> Optional[Dict[str, Any]]:
     """
     Finds a document by its ID.
@@ -108,6 +388,47 @@ def find_document_by_id(doc_id: uuid.UUID) -> Optional[Dict[str, Any]]:
         return None
 
 
+def find_original(workspace_id: uuid.UUID, doc_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+    """
+    The latest version's stored original for a document in the workspace.
+    """
+    sql = """
+    SELECT d.id AS document_id, d.title, d.kind, dv.id AS version_id, dv.sha256, dv.bytes_url
+    FROM documents d
+    JOIN document_versions dv ON dv.id = d.latest_version_id
+    WHERE d.id = %s AND d.playground_id = %s
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, (str(doc_id), str(workspace_id)))
+                return cur.fetchone()
+    except Exception as e:
+        log.error("Failed to find original of document %s: %s", doc_id, e)
+        return None
+
+
+def find_version(workspace_id: uuid.UUID, doc_id: uuid.UUID, version_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    A version of a document in the workspace; the latest unless `version_id` is given.
+    """
+    sql = """
+    SELECT dv.id AS version_id, dv.document_id, dv.page_count, dv.created_at
+    FROM documents d
+    JOIN document_versions dv ON dv.document_id = d.id
+    WHERE d.id = %(d)s AND d.playground_id = %(ws)s
+      AND dv.id = coalesce(%(v)s::text, d.latest_version_id)
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, {"d": str(doc_id), "ws": str(workspace_id), "v": version_id})
+                return cur.fetchone()
+    except Exception as e:
+        log.error("Failed to find version of document %s: %s", doc_id, e)
+        return None
+
+
 def rechunk_document_version(
     document_id: uuid.UUID,
     version_id: uuid.UUID,
@@ -115,19 +436,180 @@ def rechunk_document_version(
     overlap: int,
 ) -> Optional[Dict[str, Any]]:
     """
-    Re-chunks a specific document version.
+    Enqueues a re-chunk of a specific document version; see chunk_document_version.
     """
     log.info("Rechunking document %s version %s", document_id, version_id)
 
+    job_id = jobs_service.enqueue("rechunk_version", {
+        "document_id": str(document_id),
+        "version_id": str(version_id),
+        "chunk_size": chunk_size,
+        "overlap": overlap,
+    })
+    if job_id is None:
+        return None
+    return {"status": "ok", "message": "Rechunking job enqueued.", "job_id": job_id}
+
+
+def chunk_id_for(doc_id: str, text: str) -> str:
+    """
+    Stable chunk ID: the document plus a hash of the chunk text, so the same
+    text gets the same ID in every version.
+    """
+    return f"{doc_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _page_diff(conn, doc_id: str, version_id: str) -> Dict[str, int]:
+    """Pages of `version_id` whose text does not appear in the previous version."""
+    sql = """
+    WITH v AS (SELECT id, created_at FROM document_versions WHERE id = %(v)s AND document_id = %(d)s),
+    prev AS (
+      SELECT dv.id FROM document_versions dv, v
+      WHERE dv.document_id = %(d)s AND dv.id <> v.id AND dv.created_at <= v.created_at
+      ORDER BY dv.created_at DESC
+      LIMIT 1
+    )
+    SELECT p.version_id = %(v)s AS is_new, p.text_md5
+    FROM document_pages p
+    WHERE p.version_id = %(v)s OR p.version_id IN (SELECT id FROM prev)
+    """
+    new_pages: List[str] = []
+    old_pages: Counter = Counter()
+    for is_new, h in conn.execute(sql, {"v": version_id, "d": doc_id}):
+        if is_new:
+            new_pages.append(h)
+        else:
+            old_pages[h] += 1
+    changed = 0
+    for h in new_pages:
+        if old_pages[h] > 0:
+            old_pages[h] -= 1
+        else:
+            changed += 1
+    return {"pages": len(new_pages), "pages_changed": changed}
+
+
+def chunk_document_version(
+    document_id: uuid.UUID,
+    version_id: uuid.UUID,
+    chunk_size: int,
+    overlap: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Chunks a specific document version (runs in the worker).
+
+    Pages are streamed from the page store through a server-side cursor into
+    the chunker. Chunk IDs are content hashes (chunk_id_for), so the document's
+    existing chunks are diffed rather than replaced: chunks whose text is
+    unchanged keep their row and their vector (only page/offset metadata is
+    updated if it moved), new ones are COPYed in, and the rest are deleted,
+    all in one transaction. Only inserted chunks need embedding afterwards.
+    """
+    t0 = time.perf_counter()
+    doc_id, version_id = str(document_id), str(version_id)
+    tenant_sql = """
+    SELECT p.tenant_id
+    FROM documents d
+    JOIN playgrounds p ON p.id = d.playground_id
+    JOIN document_versions dv ON dv.document_id = d.id
+    WHERE d.id = %s AND dv.id = %s
+    """
+    existing_sql = """
+    SELECT chunk_id, page_start, page_end, lower(char_span), upper(char_span)
+    FROM chunks WHERE doc_id = %s
+    """
+    copy_sql = """
+    COPY chunks (chunk_id, doc_id, tenant_id, page_start, page_end, char_span, token_len, text)
+    FROM STDIN
+    """
+    move_sql = """
+    UPDATE chunks c
+       SET page_start = u.page_start, page_end = u.page_end,
+           char_span = int4range(u.char_start, u.char_end)
+      FROM unnest(%s::text[], %s::int[], %s::int[], %s::int[], %s::int[])
+           AS u(chunk_id, page_start, page_end, char_start, char_end)
+     WHERE c.chunk_id = u.chunk_id
+    """
+    move_vectors_sql = """
+    UPDATE chunk_vectors v SET page = u.page
+      FROM unnest(%s::text[], %s::int[]) AS u(chunk_id, page)
+     WHERE v.chunk_id = u.chunk_id
+    """
+    n_chunks = 0
+    n_tokens = 0
+    reused = 0
+    moved: List[Tuple[str, int, int, int, int]] = []
     try:
-        with get_conn() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                # TODO: Retrieve pages_json from document_versions table
-                # TODO: Implement logic to chunk the text and create embeddings
-                # TODO: Insert new chunks into the chunks table
-                # TODO: Delete old chunks for this document version
-                pass
-        return {"status": "ok", "message": "Rechunking job enqueued."}
+        with get_conn() as read_conn, get_conn() as write_conn:
+            row = read_conn.execute(tenant_sql, (doc_id, version_id)).fetchone()
+            if row is None:
+                raise LookupError(f"version {version_id} of document {doc_id} not found in a workspace")
+            tenant_id = row[0]
+            page_stats = _page_diff(read_conn, doc_id, version_id)
+
+            with read_conn.transaction(), write_conn.transaction():
+                existing = {r[0]: r[1:] for r in write_conn.execute(existing_sql, (doc_id,))}
+                seen: Dict[str, int] = {}
+                keep: set = set()
+
+                pages = page_store.iter_version_pages(read_conn, version_id)
+
+                with write_conn.cursor() as cur:
+                    with cur.copy(copy_sql) as copy:
+                        # Includes fetching pages from the server-side cursor.
+                        for c in telemetry.timed_iter("chunk", chunking.iter_chunks(pages, chunk_size, overlap)):
+                            n_chunks += 1
+                            n_tokens += c["token_len"]
+                            # Repeated text within the document gets .1, .2, ... suffixes.
+                            chunk_id = chunk_id_for(doc_id, c["text"])
+                            occurrence = seen.get(chunk_id, 0)
+                            seen[chunk_id] = occurrence + 1
+                            if occurrence:
+                                chunk_id = f"{chunk_id}.{occurrence}"
+                            position = (c["page_start"], c["page_end"], c["char_start"], c["char_end"])
+
+                            old = existing.get(chunk_id)
+                            if old is not None:
+                                keep.add(chunk_id)
+                                reused += 1
+                                if tuple(old) != position:
+                                    moved.append((chunk_id, *position))
+                                continue
+                            copy.write_row((
+                                chunk_id, doc_id, tenant_id,
+                                c["page_start"], c["page_end"],
+                                f"[{c['char_start']},{c['char_end']})",
+                                c["token_len"], c["text"],
+                            ))
+
+                stale = [cid for cid in existing if cid not in keep]
+                if stale:
+                    write_conn.execute("DELETE FROM chunks WHERE chunk_id = ANY(%s)", (stale,))
+                if moved:
+                    cols = list(zip(*moved))
+                    write_conn.execute(move_sql, [list(col) for col in cols])
+                    write_conn.execute(move_vectors_sql, (list(cols[0]), list(cols[1])))
+                    # Citations changed without a chunk insert/delete, so bump explicitly.
+                    write_conn.execute(
+                        "SELECT bump_corpus_versions(ARRAY(SELECT pg_id FROM playground_docs WHERE doc_id = %s))",
+                        (doc_id,),
+                    )
+
+        elapsed = time.perf_counter() - t0
+        stats = {
+            "status": "ok",
+            "chunks": n_chunks,
+            "tokens": n_tokens,
+            "reused": reused,
+            "inserted": n_chunks - reused,
+            "deleted": len(stale),
+            "moved": len(moved),
+            "reuse_ratio": round(reused / n_chunks, 3) if n_chunks else 0.0,
+            **page_stats,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        log.info("Chunked document %s version %s: %s", doc_id, version_id, stats)
+        return stats
     except Exception as e:
         log.error("Failed to rechunk document %s: %s", document_id, e)
         return None
@@ -139,15 +621,10 @@ def add_event(
     payload: Optional[Dict] = None,
 ) -> None:
     """
-    Adds an event to the audit trail.
-    """
-    sql = """
-    INSERT INTO events (playground_id, kind, actor, payload)
-    VALUES (%s, %s, %s, %s)
+    Adds an event to the audit trail. The write is buffered and flushed in
+    batches by events_service, so this never waits on the database.
     """
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, (str(workspace_id), event_kind, actor, payload))
+        events_service.record(workspace_id, event_kind, actor, payload)
     except Exception as e:
-        log.error("Failed to add event for workspace %s: %s", workspace_id, e)
\ No newline at end of file
+        log.error("Failed to add event for workspace %s: %s", workspace_id, e)
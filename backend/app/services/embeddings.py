@@ -0,0 +1,282 @@
+# backend/app/services/embeddings.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg.rows import dict_row
+
+from backend.app.db.connection import get_conn
+from backend.app.services import chunking, openai_client, telemetry, tenant_settings, vector_index
+
+log = logging.getLogger("embeddings")
+
+EMBEDDING_DIM = 1536  # chunk_vectors.vec vector(1536)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# "openai" or "local"; defaults to openai when a key is configured.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai" if openai_client.OPENAI_API_KEY else "local")
+# The embeddings API accepts up to 2048 inputs and ~300k tokens per request.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "512"))
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "250000"))
+EMBED_MAX_INPUT_TOKENS = 8191
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Chunks loaded, embedded and written per round trip, to bound worker memory.
+EMBED_PIPELINE_SLICE = int(os.getenv("EMBED_PIPELINE_SLICE", "4096"))
+
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for the cache key: NFKC, collapsed whitespace."""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# ---------- Backends ----------
+
+class EmbeddingBackend:
+    """Turns a batch of texts into EMBEDDING_DIM-dimensional vectors."""
+
+    name = "base"
+    model = ""
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        j = await openai_client.post_json("/embeddings", {"model": self.model, "input": list(texts)})
+        data = sorted(j["data"], key=lambda d: d["index"])
+        return [np.asarray(d["embedding"], dtype=np.float32) for d in data]
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic, offline feature-hashing embedding (words + word bigrams).
+    Texts sharing vocabulary land close together, which is enough for
+    tests and local development; it is not a semantic model.
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.model = f"local-hash-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(normalize_text(text).casefold())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_one(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            v[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = float(np.linalg.norm(v))
+        if norm == 0.0:
+            v[0] = 1.0
+            return v
+        return v / norm
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return [self.embed_one(t) for t in texts]
+
+
+_backend: Optional[EmbeddingBackend] = None
+
+
+def get_backend() -> EmbeddingBackend:
+    global _backend
+    if _backend is None:
+        _backend = OpenAIEmbeddingBackend() if EMBEDDING_BACKEND == "openai" else LocalEmbeddingBackend()
+    return _backend
+
+
+# ---------- Batching ----------
+
+def make_batches(
+    items: Sequence[Tuple[str, int]],
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    max_size: int = EMBED_BATCH_SIZE,
+) -> List[List[int]]:
+    """
+    Greedily packs (text, token_len) items into batches of indexes that stay
+    under both the per-request token and input-count limits.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    tokens = 0
+    for i, (_, n) in enumerate(items):
+        n = min(n, EMBED_MAX_INPUT_TOKENS)
+        if current and (tokens + n > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def embed_texts(
+    texts: Sequence[str],
+    token_lens: Optional[Sequence[int]] = None,
+    backend: Optional[EmbeddingBackend] = None,
+) -> List[np.ndarray]:
+    """
+    Embeds `texts` in provider-sized batches, EMBED_CONCURRENCY batches at a time.
+    Results are returned in input order.
+    """
+    backend = backend or get_backend()
+    if token_lens is None:
+        token_lens = [sum(chunking.count_tokens(" " + w) for w in t.split()) for t in texts]
+    batches = make_batches(list(zip(texts, token_lens)))
+    out: List[Optional[np.ndarray]] = [None] * len(texts)
+    sem = asyncio.Semaphore(max(1, EMBED_CONCURRENCY))
+
+    async def run(batch: List[int]) -> None:
+        async with sem:
+            with telemetry.span("embed", backend=backend.name, texts=len(batch)):
+                vecs = await backend.embed([texts[i] for i in batch])
+        for i, v in zip(batch, vecs):
+            out[i] = v
+
+    await asyncio.gather(*(run(b) for b in batches))
+    return out  # type: ignore[return-value]
+
+
+# ---------- Cache ----------
+
+def _cached_vectors(cur, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+    cur.execute(
+        "SELECT text_hash, vec FROM embedding_cache WHERE model = %s AND text_hash = ANY(%s)",
+        (model, list(hashes)),
+    )
+    return {h: v for h, v in cur.fetchall()}
+
+
+def _store_cached_vectors(cur, model: str, vectors: Dict[str, np.ndarray]) -> None:
+    cur.executemany(
+        """
+        INSERT INTO embedding_cache (model, text_hash, vec) VALUES (%s, %s, %s)
+        ON CONFLICT (model, text_hash) DO NOTHING
+        """,
+        [(model, h, v) for h, v in vectors.items()],
+    )
+
+
+# ---------- Pipeline ----------
+
+def embed_document_chunks(doc_id: str, backend: Optional[EmbeddingBackend] = None) -> Dict[str, Any]:
+    """
+    Embeds every chunk of `doc_id` that has no row in chunk_vectors yet.
+    Vectors for text seen before (any document, same model) come from
+    embedding_cache; only the rest are sent to the backend. Results are
+    bulk-loaded into chunk_vectors with binary COPY.
+    """
+    backend = backend or get_backend()
+    return asyncio.run(_embed_document_chunks(str(doc_id), backend))
+
+
+async def _embed_document_chunks(doc_id: str, backend: EmbeddingBackend) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    stats = {"chunks": 0, "cache_hits": 0, "embedded": 0, "batches": 0}
+    pending_sql = """
+    SELECT c.chunk_id, c.tenant_id, c.page_start, c.token_len, c.text, d.title
+    FROM chunks c
+    JOIN documents d ON d.id = c.doc_id
+    LEFT JOIN chunk_vectors v ON v.chunk_id = c.chunk_id
+    WHERE c.doc_id = %s AND v.chunk_id IS NULL
+    ORDER BY c.chunk_id
+    LIMIT %s
+    """
+    copy_sql = """
+    COPY chunk_vectors (chunk_id, tenant_id, doc_id, filename, page, vec, quantization)
+    FROM STDIN WITH (FORMAT BINARY)
+    """
+    try:
+        while True:
+            with get_conn() as conn:
+                with conn.cursor(row_factory=dict_row) as cur:
+                    cur.execute(pending_sql, (doc_id, EMBED_PIPELINE_SLICE))
+                    rows = cur.fetchall()
+                if not rows:
+                    break
+
+                hashes = [text_hash(r["text"]) for r in rows]
+                with conn.cursor() as cur:
+                    cached = _cached_vectors(cur, backend.model, set(hashes))
+
+                # Embed each distinct uncached text once.
+                todo: Dict[str, Tuple[str, int]] = {}
+                for h, r in zip(hashes, rows):
+                    if h not in cached and h not in todo:
+                        todo[h] = (r["text"], r["token_len"] or 0)
+                fresh: Dict[str, np.ndarray] = {}
+                if todo:
+                    keys = list(todo)
+                    vecs = await embed_texts([todo[k][0] for k in keys], [todo[k][1] for k in keys], backend)
+                    fresh = dict(zip(keys, vecs))
+                    stats["batches"] += len(make_batches([todo[k] for k in keys]))
+
+                with conn.transaction():
+                    # Rows go straight into the index of the tenant's quantization mode.
+                    modes = tenant_settings.quantization_for(conn, (r["tenant_id"] for r in rows))
+                    with conn.cursor() as cur:
+                        if fresh:
+                            _store_cached_vectors(cur, backend.model, fresh)
+                        with cur.copy(copy_sql) as copy:
+                            copy.set_types(["text", "text", "text", "text", "int4", "vector", "text"])
+                            for h, r in zip(hashes, rows):
+                                vec = cached.get(h)
+                                if vec is None:
+                                    vec = fresh[h]
+                                copy.write_row((
+                                    r["chunk_id"], r["tenant_id"], doc_id, r["title"] or "", r["page_start"], vec,
+                                    modes[r["tenant_id"]],
+                                ))
+
+                if vector_index.VECTOR_BACKEND == "local":
+                    # After commit, so the index never holds rows chunk_vectors lacks.
+                    # The rows are stored either way; vector_index.sync_all() picks
+                    # up whatever a failed add missed.
+                    for tenant_id in {r["tenant_id"] for r in rows}:
+                        try:
+                            vector_index.add(tenant_id, [
+                                (r["chunk_id"], doc_id, r["title"] or "", cached.get(h, fresh.get(h)))
+                                for h, r in zip(hashes, rows) if r["tenant_id"] == tenant_id
+                            ])
+                        except Exception as e:
+                            log.error("Failed to add document %s to the vector index of tenant %s: %s", doc_id, tenant_id, e)
+
+                stats["chunks"] += len(rows)
+                stats["cache_hits"] += sum(1 for h in hashes if h in cached)
+                stats["embedded"] += len(fresh)
+                if len(rows) < EMBED_PIPELINE_SLICE:
+                    break
+    finally:
+        if backend.name == "openai":
+            # This run's event loop ends here; close the client it opened.
+            await openai_client.shutdown()
+
+    stats["model"] = backend.model
+    stats["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    log.info("Embedded document %s: %s", doc_id, stats)
+    return stats
@@ -0,0 +1,210 @@
+# backend/app/services/events_service.py
+from __future__ import annotations
+
+import atexit
+import base64
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+
+from backend.app.db.connection import get_async_conn, get_conn
+
+log = logging.getLogger("events_service")
+
+# Pending events are flushed when this many accumulate, and at least every EVENTS_FLUSH_INTERVAL_S.
+EVENTS_BATCH_SIZE = int(os.getenv("EVENTS_BATCH_SIZE", "500"))
+EVENTS_FLUSH_INTERVAL_S = float(os.getenv("EVENTS_FLUSH_INTERVAL_S", "1.0"))
+# Past this many pending events (e.g. the DB is down) new events are dropped and counted; record() never blocks.
+EVENTS_BUFFER_MAX = int(os.getenv("EVENTS_BUFFER_MAX", "50000"))
+# Monthly partitions older than this are dropped by maintain_partitions(); 0 keeps everything.
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", "365"))
+EVENTS_PARTITIONS_AHEAD = int(os.getenv("EVENTS_PARTITIONS_AHEAD", "2"))
+
+_Row = Tuple[str, str, str, Optional[Dict[str, Any]], datetime]
+
+
+class EventBuffer:
+    """
+    In-process write buffer for the audit trail. record() only appends, so
+    it is safe to call from async routes; a background thread COPYs pending
+    events in batches. Events keep the time they were recorded, not the
+    time they were flushed. When the buffer is full, events are dropped and
+    counted in stats()["dropped"].
+    """
+
+    def __init__(self, batch_size: int, interval_s: float, max_pending: int):
+        self.batch_size = max(1, batch_size)
+        self.interval_s = interval_s
+        self.max_pending = max(self.batch_size, max_pending)
+        self._pending: List[_Row] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters: Dict[str, int] = {"recorded": 0, "flushed": 0, "batches": 0, "flush_errors": 0, "dropped": 0}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="events-flusher", daemon=True)
+            self._thread.start()
+
+    def record(self, workspace_id: str, kind: str, actor: str, payload: Optional[Dict[str, Any]] = None) -> None:
+        row = (str(workspace_id), kind, actor, payload, datetime.now().astimezone())
+        with self._lock:
+            self._ensure_thread()
+            if len(self._pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                n = len(self._pending)
+            else:
+                self._pending.append(row)
+                self.counters["recorded"] += 1
+                n = len(self._pending)
+        if n >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:  # keep the flusher alive
+                log.error("Event flusher error: %s", e)
+
+    def flush(self) -> int:
+        """
+        Writes all pending events. On failure they are kept for the next
+        attempt, as far as max_pending allows; the rest count as dropped.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            sql = "COPY events (playground_id, kind, actor, payload, created_at) FROM STDIN"
+            try:
+                with get_conn() as conn:
+                    with conn.cursor() as cur:
+                        with cur.copy(sql) as copy:
+                            for ws, kind, actor, payload, ts in batch:
+                                copy.write_row((ws, kind, actor, Jsonb(payload) if payload is not None else None, ts))
+            except Exception as e:
+                self.counters["flush_errors"] += 1
+                log.error("Failed to flush %s events: %s", len(batch), e)
+                with self._lock:
+                    # Events recorded during the attempt already hold part of the capacity.
+                    room = max(0, self.max_pending - len(self._pending))
+                    keep = batch[max(0, len(batch) - room):] if room else []
+                    self._pending[:0] = keep
+                    self.counters["dropped"] += len(batch) - len(keep)
+                return 0
+            self.counters["flushed"] += len(batch)
+            self.counters["batches"] += 1
+            return len(batch)
+
+    def close(self) -> None:
+        """Stops the flusher and writes whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "pending": len(self._pending)}
+
+
+buffer = EventBuffer(EVENTS_BATCH_SIZE, EVENTS_FLUSH_INTERVAL_S, EVENTS_BUFFER_MAX)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        buffer.close()
+    except Exception as e:
+        log.error("Failed to flush events at exit: %s", e)
+
+
+def record(workspace_id: Any, kind: str, actor: str, payload: Optional[Dict[str, Any]] = None) -> None:
+    buffer.record(str(workspace_id), kind, actor, payload)
+
+
+# ---------- Reading ----------
+
+def encode_cursor(created_at: datetime, event_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{event_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    ts, event_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(ts), int(event_id)
+
+
+async def list_events(
+    workspace_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    kind: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Newest-first page of a workspace's events. `cursor` is the next_cursor
+    of the previous page; each page is one index range scan on
+    idx_events_playground_keyset, however deep the caller has paged.
+    """
+    where = ["playground_id = %(ws)s"]
+    params: Dict[str, Any] = {"ws": str(workspace_id), "limit": limit + 1}
+    if cursor:
+        params["ts"], params["id"] = decode_cursor(cursor)
+        where.append("(created_at, event_id) < (%(ts)s, %(id)s)")
+    if kind:
+        where.append("kind = %(kind)s")
+        params["kind"] = kind
+    sql = f"""
+    SELECT event_id, playground_id, kind, actor, payload, created_at
+    FROM events
+    WHERE {" AND ".join(where)}
+    ORDER BY created_at DESC, event_id DESC
+    LIMIT %(limit)s
+    """
+    async with get_async_conn() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["event_id"])
+    return {"events": rows, "next_cursor": next_cursor}
+
+
+# ---------- Partition maintenance ----------
+
+def maintain_partitions() -> Dict[str, int]:
+    """
+    Pre-creates monthly partitions and drops those past EVENTS_RETENTION_DAYS.
+    Safe to call from several workers: an advisory lock lets one run at a time.
+    """
+    with get_conn() as conn:
+        with conn.transaction():
+            got = conn.execute("SELECT pg_try_advisory_xact_lock(hashtext('events_maintenance'))").fetchone()[0]
+            if not got:
+                return {"created": 0, "dropped": 0}
+            created = conn.execute("SELECT ensure_event_partitions(%s)", (EVENTS_PARTITIONS_AHEAD,)).fetchone()[0]
+            dropped = 0
+            if EVENTS_RETENTION_DAYS > 0:
+                dropped = conn.execute(
+                    "SELECT drop_event_partitions(make_interval(days => %s))", (EVENTS_RETENTION_DAYS,)
+                ).fetchone()[0]
+    if created or dropped:
+        log.info("Event partitions: %s created, %s dropped", created, dropped)
+    return {"created": created, "dropped": dropped}
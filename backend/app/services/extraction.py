@@ -0,0 +1,286 @@
+# backend/app/services/extraction.py
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from xml.etree import ElementTree
+
+import fitz  # PyMuPDF
+
+from backend.app.services import telemetry
+
+log = logging.getLogger("extraction")
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many pages the process hop costs more than it saves.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+# Bulk import parses on a thread pool; only one thread may create or resize the pool.
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                # Another thread may still be mapping over the old pool: let its tasks finish.
+                _executor.shutdown(wait=False)
+            # spawn: MuPDF state must not be inherited through fork.
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+@atexit.register
+def _shutdown_executor() -> None:
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_range(file_path: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    """Runs in a pool process: extracts pages [start, stop) (0-based)."""
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return [{"page_no": i + 1, "text": pdf[i].get_text("text")} for i in range(start, stop)]
+
+
+def pdf_page_count(file_path: str) -> int:
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def iter_pdf_pages(file_path: str, workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields {"page_no", "text"} for every page, in page order.
+    Large PDFs are split into PDF_PAGES_PER_TASK page ranges and extracted
+    across a process pool; results are yielded as soon as the next range in
+    order is ready. Small PDFs, or workers <= 1, are extracted serially.
+    """
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    n = pdf_page_count(file_path)
+    if workers <= 1 or n < PDF_PARALLEL_MIN_PAGES:
+        yield from _extract_range(file_path, 0, n)
+        return
+
+    step = max(1, PDF_PAGES_PER_TASK)
+    starts = list(range(0, n, step))
+    stops = [min(n, s + step) for s in starts]
+    executor = _get_executor(workers)
+    # map() preserves input order, so pages come back in sequence.
+    for pages in executor.map(_extract_range, [file_path] * len(starts), starts, stops):
+        yield from pages
+
+
+def extract_pdf_pages(file_path: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Extracts page text from a PDF on disk; see iter_pdf_pages.
+    """
+    return list(iter_pdf_pages(file_path, workers))
+
+
+# ---------- Extractor registry ----------
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+PageIter = Iterator[Dict[str, Any]]
+
+MIME_PDF = "application/pdf"
+MIME_TEXT = "text/plain"
+MIME_MARKDOWN = "text/markdown"
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Plain text, Markdown and DOCX have no real pages; they are cut into virtual
+# pages of about this many characters, at line (or paragraph) boundaries.
+TEXT_PAGE_CHARS = int(os.getenv("TEXT_PAGE_CHARS", "4000"))
+_SNIFF_BYTES = 8192
+
+_KIND_MIME = {
+    "pdf": MIME_PDF,
+    "txt": MIME_TEXT,
+    "text": MIME_TEXT,
+    "log": MIME_TEXT,
+    "md": MIME_MARKDOWN,
+    "markdown": MIME_MARKDOWN,
+    "docx": MIME_DOCX,
+}
+
+_EXTRACTORS: Dict[str, Callable[[str, Optional[int]], PageIter]] = {}
+
+
+def register_extractor(*mimes: str):
+    """Decorator: registers fn(file_path, workers) -> page iterator for the given MIME types."""
+    def wrap(fn: Callable[[str, Optional[int]], PageIter]):
+        for mime in mimes:
+            _EXTRACTORS[mime] = fn
+        return fn
+    return wrap
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine.
+        return e.start >= len(head) - 3
+    return True
+
+
+def detect_mime(file_path: str, file_kind: Optional[str] = None) -> str:
+    """
+    MIME type from the file's leading bytes, using `file_kind` (the upload's
+    extension) only to tell apart formats the bytes cannot, e.g. Markdown
+    from plain text.
+    """
+    hinted = _KIND_MIME.get((file_kind or "").lower().lstrip("."))
+    with open(file_path, "rb") as f:
+        head = f.read(_SNIFF_BYTES)
+    if b"%PDF-" in head[:1024]:
+        return MIME_PDF
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                if "word/document.xml" in zf.namelist():
+                    return MIME_DOCX
+        except zipfile.BadZipFile:
+            pass
+        return "application/zip"
+    if _looks_like_text(head):
+        return hinted if hinted in (MIME_TEXT, MIME_MARKDOWN) else MIME_TEXT
+    return hinted or "application/octet-stream"
+
+
+def _pack(blocks: Iterable[str], page_chars: int, prefer_break: Optional[Callable[[str], bool]] = None) -> PageIter:
+    """
+    Packs text blocks (lines, paragraphs) into virtual pages of at most
+    `page_chars`, holding one page in memory. A block starting with a form
+    feed always starts a new page; with `prefer_break`, a page that is at
+    least half full also ends before a block it matches (e.g. a Markdown
+    heading). Blocks longer than a page are split.
+    """
+    page_chars = max(1, page_chars)
+    buf: List[str] = []
+    size = 0
+    page_no = 1
+    for block in blocks:
+        hard = block.startswith("\f")
+        if hard:
+            block = block[1:]
+        for i in range(0, max(1, len(block)), page_chars):
+            piece = block[i:i + page_chars]
+            soft = prefer_break is not None and size >= page_chars // 2 and prefer_break(piece)
+            if buf and (size + len(piece) > page_chars or (i == 0 and (hard or soft))):
+                yield {"page_no": page_no, "text": "".join(buf).rstrip("\n")}
+                page_no += 1
+                buf, size = [], 0
+            buf.append(piece)
+            size += len(piece)
+    if buf:
+        yield {"page_no": page_no, "text": "".join(buf).rstrip("\n")}
+
+
+def _iter_lines(file_path: str) -> Iterator[str]:
+    # utf-8-sig drops a BOM; bad bytes are replaced rather than failing the upload.
+    with open(file_path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        yield from f
+
+
+@register_extractor(MIME_PDF)
+def _extract_pdf(file_path: str, workers: Optional[int]) -> PageIter:
+    return iter_pdf_pages(file_path, workers)
+
+
+@register_extractor(MIME_TEXT)
+def _extract_text(file_path: str, workers: Optional[int]) -> PageIter:
+    return _pack(_iter_lines(file_path), TEXT_PAGE_CHARS)
+
+
+@register_extractor(MIME_MARKDOWN)
+def _extract_markdown(file_path: str, workers: Optional[int]) -> PageIter:
+    return _pack(_iter_lines(file_path), TEXT_PAGE_CHARS, prefer_break=lambda line: line.startswith("#"))
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _docx_paragraphs(file_path: str) -> Iterator[str]:
+    """
+    Streams paragraph text from word/document.xml with iterparse, clearing
+    each paragraph once read. Explicit page breaks become form feeds.
+    """
+    with zipfile.ZipFile(file_path) as zf, zf.open("word/document.xml") as xml:
+        parts: List[str] = []
+        body = None
+        for event, el in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = el.tag
+            if event == "start":
+                if tag == f"{_W}body":
+                    body = el
+                elif tag == f"{_W}br" and el.get(f"{_W}type") == "page":
+                    parts.append("\f")
+                continue
+            if tag == f"{_W}t":
+                parts.append(el.text or "")
+            elif tag == f"{_W}tab":
+                parts.append("\t")
+            elif tag in (f"{_W}br", f"{_W}cr") and el.get(f"{_W}type") != "page":
+                parts.append("\n")
+            elif tag == f"{_W}p":
+                yield "".join(parts) + "\n"
+                parts = []
+                # Drop finished elements so memory stays flat on long documents.
+                el.clear()
+                if body is not None:
+                    body.clear()
+
+
+@register_extractor(MIME_DOCX)
+def _extract_docx(file_path: str, workers: Optional[int]) -> PageIter:
+    def blocks() -> Iterator[str]:
+        for para in _docx_paragraphs(file_path):
+            # Split at page breaks so the packer can honour them.
+            head, *rest = para.split("\f")
+            yield head
+            for tail in rest:
+                yield "\f" + tail
+
+    return _pack(blocks(), TEXT_PAGE_CHARS)
+
+
+def supported_mime(file_path: str, file_kind: Optional[str] = None) -> str:
+    """
+    The detected MIME type of a file that has a registered extractor.
+    Raises UnsupportedFormat.
+    """
+    mime = detect_mime(file_path, file_kind)
+    if mime not in _EXTRACTORS:
+        raise UnsupportedFormat(f"no extractor for {mime} (kind {file_kind!r})")
+    return mime
+
+
+def iter_pages(file_path: str, file_kind: Optional[str] = None, workers: Optional[int] = None) -> PageIter:
+    """
+    Yields {"page_no", "text"} for a stored file, using the extractor
+    registered for its detected MIME type. Raises UnsupportedFormat.
+    """
+    extractor = _EXTRACTORS[supported_mime(file_path, file_kind)]
+    return telemetry.timed_iter("extract", extractor(file_path, workers))
+
+
+def extract_pages(file_path: str, file_kind: Optional[str] = None, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Page text for a stored file; see iter_pages.
+    """
+    return list(iter_pages(file_path, file_kind, workers))
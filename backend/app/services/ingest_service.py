@@ -0,0 +1,166 @@
+# backend/app/services/ingest_service.py
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from backend.app.services import bulk_import, documents_service, embeddings, extraction, jobs_service, tenant_settings
+
+log = logging.getLogger("ingest_service")
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("CHUNK_SIZE_TOKENS", "512"))
+DEFAULT_CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+
+
+def enqueue_ingest(
+    workspace_id: uuid.UUID,
+    title: str,
+    spool_path: str,
+    sha256: str,
+    file_kind: str,
+    document_id: Optional[uuid.UUID] = None,
+) -> str:
+    """
+    Queues extraction/chunking/embedding for a spooled upload. With
+    `document_id` the upload becomes a new version of that document, and
+    only its changed chunks are re-embedded.
+    The spool file must be on storage the workers can read (DOCUMENT_STORAGE_DIR).
+    """
+    job_id = jobs_service.enqueue("ingest_document", {
+        "workspace_id": str(workspace_id),
+        "title": title,
+        "spool_path": spool_path,
+        "sha256": sha256,
+        "file_kind": file_kind,
+        "document_id": str(document_id) if document_id else None,
+    })
+    if job_id is None:
+        raise RuntimeError("failed to enqueue ingest job")
+    return job_id
+
+
+def _extracted(job_id: str, created: Dict[str, Any]) -> None:
+    if created.get("duplicate"):
+        # Lost a race with an identical upload; index the version it created.
+        jobs_service.set_progress(job_id, "extract", status="skipped", reason="uploaded concurrently")
+    else:
+        jobs_service.set_progress(job_id, "extract", status="done", pages=created["page_count"])
+
+
+def _unsupported(p: Dict[str, Any], e: extraction.UnsupportedFormat) -> jobs_service.PermanentJobError:
+    # A retry would fail the same way; drop the spooled upload and fail for good.
+    try:
+        os.remove(p["spool_path"])
+    except OSError:
+        pass
+    return jobs_service.PermanentJobError(str(e))
+
+
+def run_ingest_document(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler for "ingest_document". Stages are idempotent so a retry after
+    a partial failure resumes instead of creating a second document.
+    """
+    job_id = job["job_id"]
+    p = job["payload"]
+
+    jobs_service.set_progress(job_id, "extract", status="running")
+    if p.get("document_id"):
+        existing = documents_service.find_document_version_by_sha256(p["document_id"], p["sha256"])
+    else:
+        existing = documents_service.find_version_by_sha256(p["workspace_id"], p["sha256"])
+    if existing:
+        document_id, version_id = str(existing["document_id"]), str(existing["version_id"])
+        jobs_service.set_progress(job_id, "extract", status="skipped", reason="already extracted")
+    elif p.get("document_id"):
+        if not os.path.exists(p["spool_path"]):
+            raise FileNotFoundError(f"spooled upload missing: {p['spool_path']}")
+        try:
+            created = documents_service.create_version_from_path(
+                p["document_id"], p["spool_path"], p["sha256"], p["file_kind"],
+            )
+        except extraction.UnsupportedFormat as e:
+            raise _unsupported(p, e) from e
+        if created is None:
+            raise RuntimeError("version insert failed")
+        document_id, version_id = p["document_id"], str(created["version"]["id"])
+        _extracted(job_id, created)
+    else:
+        if not os.path.exists(p["spool_path"]):
+            raise FileNotFoundError(f"spooled upload missing: {p['spool_path']}")
+        try:
+            created = documents_service.create_document_and_version_from_path(
+                p["workspace_id"], p["title"], p["spool_path"], p["sha256"], p["file_kind"],
+            )
+        except extraction.UnsupportedFormat as e:
+            raise _unsupported(p, e) from e
+        if created is None:
+            raise RuntimeError("document insert failed")
+        document_id = str(created["document"]["id"])
+        version_id = str(created["version"]["id"])
+        _extracted(job_id, created)
+
+    jobs_service.set_progress(job_id, "chunk", status="running")
+    chunked = documents_service.chunk_document_version(
+        document_id, version_id, DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP,
+    )
+    if chunked is None:
+        raise RuntimeError("chunking failed")
+    jobs_service.set_progress(job_id, "chunk", **{**chunked, "status": "done"})
+
+    embedded = _embed(job_id, document_id)
+    documents_service.add_event(p["workspace_id"], "document.ingested", "worker", {
+        "job_id": job_id, "document_id": document_id, "version_id": version_id, "chunks": chunked["chunks"],
+        "reused": chunked["reused"], "reuse_ratio": chunked["reuse_ratio"], "pages_changed": chunked["pages_changed"],
+    })
+    return {
+        "document_id": document_id, "version_id": version_id,
+        "reuse_ratio": chunked["reuse_ratio"], "embed": embedded,
+    }
+
+
+def _embed(job_id: str, document_id: str) -> Dict[str, Any]:
+    jobs_service.set_progress(job_id, "embed", status="running")
+    embedded = embeddings.embed_document_chunks(document_id)
+    jobs_service.set_progress(job_id, "embed", **{**embedded, "status": "done"})
+    return embedded
+
+
+def run_rechunk_version(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler for "rechunk_version".
+    """
+    job_id = job["job_id"]
+    p = job["payload"]
+    jobs_service.set_progress(job_id, "chunk", status="running")
+    chunked = documents_service.chunk_document_version(
+        p["document_id"], p["version_id"], p["chunk_size"], p["overlap"],
+    )
+    if chunked is None:
+        raise RuntimeError("chunking failed")
+    jobs_service.set_progress(job_id, "chunk", **{**chunked, "status": "done"})
+    embedded = _embed(job_id, p["document_id"])
+    return {"document_id": p["document_id"], "version_id": p["version_id"], **chunked, "embed": embedded}
+
+
+def run_index_version(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler for "index_version": chunks and embeds an already-extracted
+    version with the default chunking settings (used by bulk imports).
+    """
+    p = job["payload"]
+    return run_rechunk_version({
+        **job,
+        "payload": {**p, "chunk_size": DEFAULT_CHUNK_SIZE, "overlap": DEFAULT_CHUNK_OVERLAP},
+    })
+
+
+HANDLERS = {
+    "ingest_document": run_ingest_document,
+    "rechunk_version": run_rechunk_version,
+    "index_version": run_index_version,
+    "bulk_import": bulk_import.run_bulk_import,
+    "requantize_vectors": tenant_settings.run_requantize,
+}
@@ -0,0 +1,308 @@
+# backend/app/services/jobs_service.py
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+
+from backend.app.db.connection import get_conn
+
+log = logging.getLogger("jobs_service")
+
+JOBS_CHANNEL = "jobs"
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_BACKOFF_BASE_S = float(os.getenv("JOBS_BACKOFF_BASE_S", "5"))
+JOBS_BACKOFF_CAP_S = float(os.getenv("JOBS_BACKOFF_CAP_S", "600"))
+# A running job whose worker has not reported progress for this long is re-queued.
+JOBS_STALE_AFTER_S = float(os.getenv("JOBS_STALE_AFTER_S", "900"))
+# How often a worker refreshes locked_at while a handler runs; well below JOBS_STALE_AFTER_S.
+JOBS_HEARTBEAT_INTERVAL_S = float(os.getenv("JOBS_HEARTBEAT_INTERVAL_S", str(JOBS_STALE_AFTER_S / 5)))
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure that retrying cannot fix; the job fails at once."""
+
+
+_JOB_COLUMNS = """
+    job_id, kind, payload, status, attempts, max_attempts, run_after,
+    locked_by, locked_at, stage, progress, result, error,
+    created_at, updated_at, finished_at
+"""
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the next attempt."""
+    delay = min(JOBS_BACKOFF_CAP_S, JOBS_BACKOFF_BASE_S * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def enqueue(
+    kind: str,
+    payload: Dict[str, Any],
+    *,
+    max_attempts: int = JOBS_MAX_ATTEMPTS,
+    conn=None,
+) -> Optional[str]:
+    """
+    Adds a job to the queue and wakes idle workers. Pass `conn` to enqueue
+    inside a caller's transaction.
+    """
+    job_id = str(uuid.uuid4())
+    sql = """
+    INSERT INTO jobs (job_id, kind, payload, max_attempts)
+    VALUES (%s, %s, %s, %s)
+    """
+    try:
+        if conn is not None:
+            conn.execute(sql, (job_id, kind, Jsonb(payload), max_attempts))
+            conn.execute(f"NOTIFY {JOBS_CHANNEL}")
+        else:
+            with get_conn() as conn:
+                conn.execute(sql, (job_id, kind, Jsonb(payload), max_attempts))
+                conn.execute(f"NOTIFY {JOBS_CHANNEL}")
+        return job_id
+    except Exception as e:
+        log.error("Failed to enqueue %s job: %s", kind, e)
+        return None
+
+
+def enqueue_many(
+    kind: str,
+    payloads: Sequence[Dict[str, Any]],
+    *,
+    max_attempts: int = JOBS_MAX_ATTEMPTS,
+) -> List[str]:
+    """
+    Adds many jobs of one kind with a single multi-row INSERT and one NOTIFY.
+    Returns the new job ids (empty on failure).
+    """
+    if not payloads:
+        return []
+    job_ids = [str(uuid.uuid4()) for _ in payloads]
+    sql = """
+    INSERT INTO jobs (job_id, kind, payload, max_attempts)
+    SELECT j.job_id, %s, j.payload, %s
+    FROM unnest(%s::text[], %s::jsonb[]) AS j(job_id, payload)
+    """
+    try:
+        with get_conn() as conn:
+            with conn.transaction():
+                conn.execute(sql, (kind, max_attempts, job_ids, [Jsonb(p) for p in payloads]))
+                conn.execute(f"NOTIFY {JOBS_CHANNEL}")
+        return job_ids
+    except Exception as e:
+        log.error("Failed to enqueue %s %s jobs: %s", len(payloads), kind, e)
+        return []
+
+
+def claim(worker_id: str, kinds: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Atomically takes the oldest runnable job. Concurrent workers skip rows
+    another worker has locked instead of waiting on them.
+    """
+    kind_filter = "AND kind = ANY(%(kinds)s)" if kinds else ""
+    sql = f"""
+    UPDATE jobs
+       SET status = 'running', attempts = attempts + 1,
+           locked_by = %(worker)s, locked_at = now(), updated_at = now(), error = NULL
+     WHERE job_id = (
+        SELECT job_id FROM jobs
+         WHERE status = 'queued' AND run_after <= now() {kind_filter}
+         ORDER BY run_after
+         FOR UPDATE SKIP LOCKED
+         LIMIT 1
+     )
+    RETURNING {_JOB_COLUMNS}
+    """
+    with get_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(sql, {"worker": worker_id, "kinds": list(kinds or [])})
+            return cur.fetchone()
+
+
+def set_progress(job_id: str, stage: str, **progress: Any) -> None:
+    """
+    Records the current stage and merges `progress` into the job's progress
+    object. Also acts as the worker heartbeat.
+    """
+    sql = """
+    UPDATE jobs
+       SET stage = %s, progress = progress || %s, locked_at = now(), updated_at = now()
+     WHERE job_id = %s
+    """
+    try:
+        with get_conn() as conn:
+            conn.execute(sql, (stage, Jsonb({stage: progress} if progress else {}), job_id))
+    except Exception as e:
+        log.warning("Failed to record progress for job %s: %s", job_id, e)
+
+
+def heartbeat(job_id: str, worker_id: str) -> bool:
+    """
+    Refreshes locked_at for a job this worker still holds. False means the
+    job was requeued (or finished) under it.
+    """
+    sql = """
+    UPDATE jobs SET locked_at = now()
+     WHERE job_id = %s AND locked_by = %s AND status = 'running'
+    """
+    try:
+        with get_conn() as conn:
+            return conn.execute(sql, (job_id, worker_id)).rowcount > 0
+    except Exception as e:
+        log.warning("Failed to heartbeat job %s: %s", job_id, e)
+        return True
+
+
+@contextmanager
+def keep_alive(job_id: str, worker_id: str, interval_s: float = JOBS_HEARTBEAT_INTERVAL_S) -> Iterator[None]:
+    """
+    Heartbeats the job from a background thread while the body runs, so a
+    long handler stage is not mistaken for a dead worker by requeue_stale.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(interval_s):
+            if not heartbeat(job_id, worker_id):
+                log.warning("Job %s is no longer held by %s; stopping heartbeat", job_id, worker_id)
+                return
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def complete(job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Marks the job succeeded if this worker still holds it. Returns False when
+    it was requeued in the meantime (another worker owns the outcome now).
+    """
+    sql = """
+    UPDATE jobs
+       SET status = 'succeeded', result = %s, stage = 'done',
+           locked_by = NULL, finished_at = now(), updated_at = now()
+     WHERE job_id = %s AND locked_by = %s
+    """
+    with get_conn() as conn:
+        return conn.execute(sql, (Jsonb(result or {}), job_id, worker_id)).rowcount > 0
+
+
+def fail(job_id: str, worker_id: str, error: str, attempts: int, max_attempts: int) -> str:
+    """
+    Re-queues the job with backoff, or marks it failed once attempts are used up.
+    Returns the new status, or "lost" if this worker no longer held the job.
+    """
+    if attempts < max_attempts:
+        sql = """
+        UPDATE jobs
+           SET status = 'queued', error = %s, locked_by = NULL,
+               run_after = now() + make_interval(secs => %s), updated_at = now()
+         WHERE job_id = %s AND locked_by = %s
+        """
+        params = (error, _retry_delay(attempts), job_id, worker_id)
+        status = "queued"
+    else:
+        sql = """
+        UPDATE jobs
+           SET status = 'failed', error = %s, locked_by = NULL,
+               finished_at = now(), updated_at = now()
+         WHERE job_id = %s AND locked_by = %s
+        """
+        params = (error, job_id, worker_id)
+        status = "failed"
+    with get_conn() as conn:
+        if conn.execute(sql, params).rowcount == 0:
+            return "lost"
+    return status
+
+
+def requeue_stale() -> int:
+    """
+    Returns jobs held by dead workers to the queue, or fails them if they have
+    used up their attempts (claim counts the lost run as one). Safe to call
+    from every worker.
+    """
+    sql = """
+    UPDATE jobs
+       SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+           finished_at = CASE WHEN attempts >= max_attempts THEN now() ELSE finished_at END,
+           locked_by = NULL, updated_at = now(),
+           error = 'worker heartbeat lost'
+     WHERE status = 'running' AND locked_at < now() - make_interval(secs => %s)
+    """
+    try:
+        with get_conn() as conn:
+            cur = conn.execute(sql, (JOBS_STALE_AFTER_S,))
+            return cur.rowcount
+    except Exception as e:
+        log.warning("Failed to requeue stale jobs: %s", e)
+        return 0
+
+
+def get(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Finds a job by its ID.
+    """
+    sql = f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = %s"
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, (job_id,))
+                return cur.fetchone()
+    except Exception as e:
+        log.error("Failed to find job %s: %s", job_id, e)
+        return None
+
+
+def list_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Lists recent jobs, newest first.
+    """
+    sql = f"""
+    SELECT {_JOB_COLUMNS} FROM jobs
+    WHERE (%(status)s::text IS NULL OR status = %(status)s)
+      AND (%(kind)s::text IS NULL OR kind = %(kind)s)
+    ORDER BY created_at DESC
+    LIMIT %(limit)s
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, {"status": status, "kind": kind, "limit": limit})
+                return cur.fetchall()
+    except Exception as e:
+        log.error("Failed to list jobs: %s", e)
+        return []
+
+
+def children_summary(parent_job_id: str) -> Dict[str, int]:
+    """
+    Counts jobs spawned by `parent_job_id` (payload.parent_job_id) by status.
+    """
+    sql = """
+    SELECT status, count(*) FROM jobs
+    WHERE payload->>'parent_job_id' = %s
+    GROUP BY status
+    """
+    try:
+        with get_conn() as conn:
+            counts = {status: n for status, n in conn.execute(sql, (parent_job_id,)).fetchall()}
+    except Exception as e:
+        log.error("Failed to summarize child jobs of %s: %s", parent_job_id, e)
+        return {}
+    return {"total": sum(counts.values()), **counts}
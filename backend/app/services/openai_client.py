@@ -0,0 +1,265 @@
+# backend/app/services/openai_client.py
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from backend.app.services import telemetry
+
+log = logging.getLogger("openai_client")
+
+OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
+# Point at a local stub (see backend/bench/stub_openai.py) to run without network.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# Longest Retry-After honoured; a longer (or garbled) hint falls back to jittered backoff.
+OPENAI_MAX_RETRY_DELAY_S = float(os.getenv("OPENAI_MAX_RETRY_DELAY_S", "30"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+# Client-side rate limit; 0 disables it.
+OPENAI_RATE_LIMIT_RPS = float(os.getenv("OPENAI_RATE_LIMIT_RPS", "8"))
+OPENAI_RATE_LIMIT_BURST = int(os.getenv("OPENAI_RATE_LIMIT_BURST", "16"))
+
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 20.0
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens/second refill, at most `capacity` stored.
+    acquire() sleeps (without blocking the loop) until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class _LoopState:
+    """The client and rate-limit bucket of one event loop."""
+
+    def __init__(self) -> None:
+        self.client: Optional[httpx.AsyncClient] = None
+        self.bucket: Optional[TokenBucket] = None
+
+
+# Pooled connections and asyncio locks only work on the loop that created them.
+# The app runs one loop, but the worker starts one per document (asyncio.run in
+# embeddings), so each loop gets its own; entries go away with their loop.
+_loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+
+def _state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loops.get(loop)
+    if state is None:
+        state = _loops[loop] = _LoopState()
+    return state
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=OPENAI_BASE_URL,
+        timeout=OPENAI_TIMEOUT,
+        http2=_HTTP2,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+    )
+
+
+async def startup() -> None:
+    """Creates the running loop's client (called from the app lifespan)."""
+    get_client()
+
+
+async def shutdown() -> None:
+    """Closes the running loop's client (called from the app lifespan and after worker runs)."""
+    state = _loops.pop(asyncio.get_running_loop(), None)
+    if state is not None and state.client is not None:
+        await state.client.aclose()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the running loop's long-lived client, creating it lazily."""
+    state = _state()
+    if state.client is None or state.client.is_closed:
+        state.client = _new_client()
+    return state.client
+
+
+def _get_bucket() -> TokenBucket:
+    state = _state()
+    if state.bucket is None:
+        state.bucket = TokenBucket(OPENAI_RATE_LIMIT_RPS, OPENAI_RATE_LIMIT_BURST)
+    return state.bucket
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Seconds to wait from Retry-After (delta-seconds or HTTP-date), if present."""
+    value = resp.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = email.utils.parsedate_to_datetime(value)
+        return max(0.0, dt.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _stage(path: str) -> str:
+    return "openai" + path.replace("/", ".")
+
+
+def _record_usage(path: str, body: Dict[str, Any]) -> None:
+    usage = body.get("usage") or {}
+    for key in ("prompt_tokens", "completion_tokens"):
+        n = usage.get(key)
+        if n:
+            telemetry.OPENAI_TOKENS.inc(n, path, key.split("_")[0])
+            telemetry.count(f"tokens.{key.split('_')[0]}", n)
+
+
+def _record_retry(path: str, e: Exception) -> None:
+    reason = str(e.response.status_code) if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+    telemetry.OPENAI_RETRIES.inc(1, path, reason)
+    telemetry.count("openai.retries")
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(_BACKOFF_CAP, OPENAI_MAX_RETRY_DELAY_S, _BACKOFF_BASE * (2 ** attempt)))
+
+
+def _retry_delay(retry_after: Optional[float], attempt: int) -> float:
+    """The server's Retry-After when present and within OPENAI_MAX_RETRY_DELAY_S, else _backoff."""
+    if retry_after is not None and retry_after <= OPENAI_MAX_RETRY_DELAY_S:
+        return retry_after
+    return _backoff(attempt)
+
+
+async def post_json(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    POST `payload` to `path` on the OpenAI API and return the JSON body.
+    Retries transport errors, 429 and 5xx with jittered backoff (honouring
+    Retry-After up to OPENAI_MAX_RETRY_DELAY_S); other 4xx responses raise immediately.
+    """
+    client = get_client()
+    bucket = _get_bucket()
+    attempts = max(1, OPENAI_MAX_RETRIES)
+    for attempt in range(attempts):
+        with telemetry.span("openai.rate_limit_wait"):
+            await bucket.acquire()
+        delay: Optional[float] = None
+        try:
+            with telemetry.span(_stage(path), attempt=attempt + 1):
+                r = await client.post(path, json=payload)
+            if r.status_code in _RETRY_STATUSES:
+                delay = _retry_after(r)
+            r.raise_for_status()
+            body = r.json()
+            _record_usage(path, body)
+            return body
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in _RETRY_STATUSES
+            if not retryable or attempt == attempts - 1:
+                raise
+            wait = _retry_delay(delay, attempt)
+            log.warning("OpenAI %s failed (attempt %s), retrying in %.2fs: %s", path, attempt + 1, wait, e)
+            _record_retry(path, e)
+            with telemetry.span("openai.backoff"):
+                await asyncio.sleep(wait)
+    raise RuntimeError("unreachable")
+
+
+async def stream_json(path: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    POST `payload` with `"stream": true` and yield each SSE `data:` object.
+    Retries like post_json, but only until the first event has been yielded;
+    a failure mid-stream is raised to the caller.
+    """
+    client = get_client()
+    bucket = _get_bucket()
+    attempts = max(1, OPENAI_MAX_RETRIES)
+    body = {**payload, "stream": True}
+    for attempt in range(attempts):
+        with telemetry.span("openai.rate_limit_wait"):
+            await bucket.acquire()
+        delay: Optional[float] = None
+        started = False
+        # Time to the first event; the rest of the stream is paced by the consumer.
+        t0 = time.perf_counter()
+        try:
+            async with client.stream("POST", path, json=body) as r:
+                if r.status_code in _RETRY_STATUSES:
+                    delay = _retry_after(r)
+                if r.status_code >= 400:
+                    await r.aread()
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    event = json.loads(data)
+                    if not started:
+                        started = True
+                        telemetry.observe(_stage(path) + ".first_event", time.perf_counter() - t0)
+                    _record_usage(path, event)
+                    yield event
+                return
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in _RETRY_STATUSES
+            if started or not retryable or attempt == attempts - 1:
+                raise
+            wait = _retry_delay(delay, attempt)
+            log.warning("OpenAI stream %s failed (attempt %s), retrying in %.2fs: %s", path, attempt + 1, wait, e)
+            _record_retry(path, e)
+            with telemetry.span("openai.backoff"):
+                await asyncio.sleep(wait)
@@ -0,0 +1,229 @@
+# backend/app/services/page_store.py
+"""
+Extracted page text, one compressed row per page (document_pages).
+
+Each row carries its page's offset in the document text (pages joined with
+"\\n", the coordinates of chunks.char_span), so a citation or a page range is
+read without touching the rest of the document. Bodies are compressed with
+PAGE_CODEC; the codec is stored per row, so rows written with another codec
+(or copied raw by the 009 migration) stay readable.
+
+    PAGE_CODEC=zstd   default when the zstandard package is installed
+    PAGE_CODEC=zlib   standard library fallback
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.app.db.connection import get_conn
+
+log = logging.getLogger("page_store")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PAGE_CODEC = os.getenv("PAGE_CODEC", "zstd" if zstandard is not None else "zlib")
+PAGE_ZSTD_LEVEL = int(os.getenv("PAGE_ZSTD_LEVEL", "3"))
+PAGE_ZLIB_LEVEL = int(os.getenv("PAGE_ZLIB_LEVEL", "6"))
+# Shorter pages are stored uncompressed; longer ones always go through PAGE_CODEC.
+PAGE_COMPRESS_MIN_BYTES = int(os.getenv("PAGE_COMPRESS_MIN_BYTES", "128"))
+PAGE_COMPACT_BATCH = int(os.getenv("PAGE_COMPACT_BATCH", "2000"))
+# Most pages (or span characters) one API read may return.
+PAGE_READ_MAX_PAGES = int(os.getenv("PAGE_READ_MAX_PAGES", "50"))
+PAGE_READ_MAX_CHARS = int(os.getenv("PAGE_READ_MAX_CHARS", "200000"))
+
+if PAGE_CODEC == "zstd" and zstandard is None:
+    raise RuntimeError("PAGE_CODEC=zstd requires zstandard (pip install zstandard)")
+if PAGE_CODEC not in ("zstd", "zlib"):
+    raise RuntimeError(f"unknown PAGE_CODEC {PAGE_CODEC!r}")
+
+_COPY_SQL = """
+COPY document_pages (version_id, page_no, char_start, char_len, text_md5, codec, body)
+FROM STDIN
+"""
+
+
+def encode(text: str) -> Tuple[str, bytes]:
+    """(codec, body) for one page's text."""
+    raw = text.encode("utf-8")
+    if len(raw) < PAGE_COMPRESS_MIN_BYTES:
+        return "raw", raw
+    if PAGE_CODEC == "zstd":
+        # ZstdCompressor is not thread-safe; creating one is cheap next to compressing a page.
+        return "zstd", zstandard.ZstdCompressor(level=PAGE_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, PAGE_ZLIB_LEVEL)
+
+
+def decode(codec: str, body: bytes) -> str:
+    if codec == "raw":
+        raw = bytes(body)
+    elif codec == "zlib":
+        raw = zlib.decompress(body)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("page is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raise ValueError(f"unknown page codec {codec!r}")
+    return raw.decode("utf-8")
+
+
+def page_rows(version_id: str, pages: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+    """COPY rows for extracted pages of {"page_no", "text"}, with running offsets."""
+    offset = 0
+    for i, page in enumerate(pages):
+        text = page.get("text") or ""
+        codec, body = encode(text)
+        yield (
+            version_id, page.get("page_no", i + 1), offset, len(text),
+            hashlib.md5(text.encode("utf-8")).digest(), codec, body,
+        )
+        offset += len(text) + 1
+
+
+def write_pages(cur, version_id: str, pages: Iterable[Dict[str, Any]]) -> int:
+    """
+    Stores the pages of a new version with COPY, on the caller's cursor (and
+    so in its transaction). Returns the page count.
+    """
+    n = 0
+    with cur.copy(_COPY_SQL) as copy:
+        for row in page_rows(version_id, pages):
+            copy.write_row(row)
+            n += 1
+    return n
+
+
+def write_pages_many(cur, versions: Sequence[Tuple[str, Iterable[Dict[str, Any]]]]) -> List[int]:
+    """write_pages for several (version_id, pages) in one COPY; returns page counts."""
+    counts = []
+    with cur.copy(_COPY_SQL) as copy:
+        for version_id, pages in versions:
+            n = 0
+            for row in page_rows(version_id, pages):
+                copy.write_row(row)
+                n += 1
+            counts.append(n)
+    return counts
+
+
+def iter_version_pages(
+    conn,
+    version_id: str,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    itersize: int = 32,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams {"page_no", "char_start", "text"} in page order through a
+    server-side cursor. Must be called inside a transaction on `conn`.
+    """
+    sql = """
+    SELECT page_no, char_start, codec, body
+    FROM document_pages
+    WHERE version_id = %(v)s
+      AND (%(first)s::int IS NULL OR page_no >= %(first)s)
+      AND (%(last)s::int IS NULL OR page_no <= %(last)s)
+    ORDER BY page_no
+    """
+    with conn.cursor(name=f"pages_{version_id}") as cur:
+        cur.itersize = itersize
+        cur.execute(sql, {"v": version_id, "first": first, "last": last})
+        for page_no, char_start, codec, body in cur:
+            yield {"page_no": page_no, "char_start": char_start, "text": decode(codec, body)}
+
+
+def page_hashes(conn, version_ids: Sequence[str]) -> List[Tuple[str, bytes]]:
+    """(version_id, md5 of page text) for every page, read without decompressing."""
+    sql = "SELECT version_id, text_md5 FROM document_pages WHERE version_id = ANY(%s) ORDER BY version_id, page_no"
+    return [(v, bytes(h)) for v, h in conn.execute(sql, (list(version_ids),))]
+
+
+def get_pages(version_id: str, first: int, last: int) -> List[Dict[str, Any]]:
+    """Pages first..last (inclusive) of a version."""
+    sql = """
+    SELECT page_no, char_start, codec, body
+    FROM document_pages
+    WHERE version_id = %s AND page_no BETWEEN %s AND %s
+    ORDER BY page_no
+    """
+    try:
+        with get_conn() as conn:
+            rows = conn.execute(sql, (str(version_id), first, last)).fetchall()
+        return [{"page_no": p, "char_start": s, "text": decode(c, b)} for p, s, c, b in rows]
+    except Exception as e:
+        log.error("Failed to read pages %s-%s of version %s: %s", first, last, version_id, e)
+        return []
+
+
+def get_text_span(version_id: str, char_start: int, char_end: int) -> Optional[str]:
+    """
+    document_text[char_start:char_end] of a version (e.g. a chunk's
+    char_span), read from just the pages it overlaps.
+    """
+    sql = """
+    SELECT char_start, codec, body
+    FROM document_pages
+    WHERE version_id = %(v)s
+      AND char_start < %(end)s
+      AND char_start + char_len >= %(start)s
+    ORDER BY char_start
+    """
+    try:
+        with get_conn() as conn:
+            rows = conn.execute(sql, {"v": str(version_id), "start": char_start, "end": char_end}).fetchall()
+    except Exception as e:
+        log.error("Failed to read span %s-%s of version %s: %s", char_start, char_end, version_id, e)
+        return None
+    if not rows:
+        return None
+    text = "\n".join(decode(c, b) for _, c, b in rows)
+    base = rows[0][0]
+    return text[char_start - base:char_end - base]
+
+
+# ---------- Background compaction ----------
+
+def compact(limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Recompresses rows stored raw (pages copied by the 009 migration) with
+    PAGE_CODEC, PAGE_COMPACT_BATCH rows per transaction. Rows are locked
+    SKIP LOCKED, so several workers can run it at once.
+    """
+    select_sql = """
+    SELECT version_id, page_no, body FROM document_pages
+    WHERE codec = 'raw' AND octet_length(body) >= %s
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+    """
+    update_sql = """
+    UPDATE document_pages d SET codec = u.codec, body = u.body
+      FROM unnest(%s::text[], %s::int[], %s::text[], %s::bytea[]) AS u(version_id, page_no, codec, body)
+     WHERE d.version_id = u.version_id AND d.page_no = u.page_no
+    """
+    pages = 0
+    saved = 0
+    with get_conn() as conn:
+        while limit is None or pages < limit:
+            with conn.transaction():
+                rows = conn.execute(select_sql, (PAGE_COMPRESS_MIN_BYTES, PAGE_COMPACT_BATCH)).fetchall()
+                if not rows:
+                    break
+                encoded = [encode(bytes(body).decode("utf-8")) for _, _, body in rows]
+                conn.execute(update_sql, (
+                    [r[0] for r in rows], [r[1] for r in rows], [c for c, _ in encoded], [b for _, b in encoded],
+                ))
+            pages += len(rows)
+            saved += sum(len(r[2]) for r in rows) - sum(len(b) for _, b in encoded)
+            if len(rows) < PAGE_COMPACT_BATCH:
+                break
+    if pages:
+        log.info("Compacted %s pages with %s (%s bytes saved)", pages, PAGE_CODEC, saved)
+    return {"pages": pages, "bytes_saved": saved}
+
@@ -0,0 +1,170 @@
+# backend/app/services/query_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.app.db.connection import get_async_conn
+from backend.app.services import embeddings
+
+log = logging.getLogger("query_cache")
+
+QUERY_EMBED_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBED_CACHE_MAX_ENTRIES", "4096"))
+QUERY_EMBED_CACHE_MAX_BYTES = int(os.getenv("QUERY_EMBED_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+QUERY_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_RESULT_CACHE_MAX_ENTRIES", "1024"))
+QUERY_RESULT_CACHE_MAX_BYTES = int(os.getenv("QUERY_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class SizedLRU:
+    """
+    LRU map bounded by entry count and by an approximate byte size
+    (computed once per value by `sizeof`).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, sizeof: Callable[[Any], int]):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._entries: "OrderedDict[Any, Tuple[int, Any]]" = OrderedDict()
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def get(self, key: Any) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return item[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        self._entries[key] = (size, value)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (old_size, _) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.counters["evictions"] += 1
+
+    def pop(self, key: Any) -> None:
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.bytes -= item[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def _result_size(value: Dict[str, Any]) -> int:
+    return len(json.dumps(value, default=str))
+
+
+def _vector_size(vec: np.ndarray) -> int:
+    return int(vec.nbytes) + sys.getsizeof(vec)
+
+
+def normalize_question(question: str) -> str:
+    return embeddings.normalize_text(question).casefold()
+
+
+class QueryCache:
+    """
+    Two levels for /workspaces/{id}/query:
+      - question text -> query embedding (per embedding model)
+      - (playground, question, top_k, corpus version) -> response body
+
+    The corpus version of a playground is bumped by triggers whenever its
+    playground_docs, chunks or chunk_vectors change (migration 006), so a
+    cached result can never outlive the corpus it was computed from. Entries
+    for superseded versions are dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self):
+        self.embeddings = SizedLRU(QUERY_EMBED_CACHE_MAX_ENTRIES, QUERY_EMBED_CACHE_MAX_BYTES, _vector_size)
+        self.results = SizedLRU(QUERY_RESULT_CACHE_MAX_ENTRIES, QUERY_RESULT_CACHE_MAX_BYTES, _result_size)
+        self._versions: Dict[str, int] = {}
+        self._keys_by_playground: Dict[str, Set[str]] = {}
+        self.invalidations = 0
+
+    # --- embeddings ---
+
+    async def embed_query(self, question: str) -> np.ndarray:
+        backend = embeddings.get_backend()
+        key = (backend.model, embeddings.normalize_text(question))
+        vec = self.embeddings.get(key)
+        if vec is None:
+            vec = (await embeddings.embed_texts([question], backend=backend))[0]
+            self.embeddings.put(key, vec)
+        return vec
+
+    # --- results ---
+
+    async def corpus_version(self, workspace_id: str) -> int:
+        async with get_async_conn() as conn:
+            cur = await conn.execute(
+                "SELECT version FROM playground_corpus_versions WHERE pg_id = %s", (workspace_id,)
+            )
+            row = await cur.fetchone()
+        version = row[0] if row else 0
+        if self._versions.get(workspace_id, version) != version:
+            self._invalidate(workspace_id)
+        self._versions[workspace_id] = version
+        return version
+
+    def _invalidate(self, workspace_id: str) -> None:
+        for key in self._keys_by_playground.pop(workspace_id, set()):
+            self.results.pop(key)
+        self.invalidations += 1
+
+    @staticmethod
+    def result_key(workspace_id: str, question: str, top_k: int, version: int) -> str:
+        raw = json.dumps([workspace_id, normalize_question(question), top_k, version], separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_result(self, workspace_id: str, question: str, top_k: int, version: int) -> Optional[Dict[str, Any]]:
+        return self.results.get(self.result_key(workspace_id, question, top_k, version))
+
+    def put_result(self, workspace_id: str, question: str, top_k: int, version: int, value: Dict[str, Any]) -> None:
+        if self._versions.get(workspace_id) != version:
+            return  # corpus changed while this result was computed
+        key = self.result_key(workspace_id, question, top_k, version)
+        self.results.put(key, value)
+        keys = self._keys_by_playground.setdefault(workspace_id, set())
+        keys.add(key)
+        # Drop bookkeeping for keys the LRU has already evicted.
+        if len(keys) > 2 * len(self.results):
+            self._keys_by_playground[workspace_id] = {k for k in keys if k in self.results}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "playgrounds": len(self._versions),
+            "invalidations": self.invalidations,
+        }
+
+
+cache = QueryCache()
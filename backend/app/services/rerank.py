@@ -0,0 +1,276 @@
+# backend/app/services/rerank.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.services import chunking
+
+log = logging.getLogger("rerank")
+
+# "lexical" (BM25 over the candidates) or "none" (keep retrieval order).
+RERANK_SCORER = os.getenv("RERANK_SCORER", "lexical")
+# Weight of the scorer vs. the retrieval rank in the final order (0..1).
+RERANK_WEIGHT = float(os.getenv("RERANK_WEIGHT", "0.5"))
+# Candidates retrieved per requested snippet, so dedupe still leaves top_k.
+RERANK_OVERFETCH = float(os.getenv("RERANK_OVERFETCH", "2"))
+# SimHash fingerprints within this many bits are treated as duplicates.
+RERANK_DEDUPE_BITS = int(os.getenv("RERANK_DEDUPE_BITS", "3"))
+# Total snippet tokens sent to answer synthesis, and per snippet.
+RERANK_TOKEN_BUDGET = int(os.getenv("RERANK_TOKEN_BUDGET", "2000"))
+RERANK_SNIPPET_TOKENS = int(os.getenv("RERANK_SNIPPET_TOKENS", "300"))
+# Time allowed for the stage; past it, remaining snippets are only truncated.
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "25"))
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+_TOKEN_RE = re.compile(r"\S+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it of on or that the this to was were what when "
+    "where which who why will with do does can i you we our your my".split()
+)
+
+
+def terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.casefold()) if w not in _STOPWORDS]
+
+
+def count_text_tokens(text: str) -> int:
+    return sum(chunking.count_tokens(" " + w) for w in text.split())
+
+
+# ---------- Scorers ----------
+
+class Scorer:
+    """Scores candidate texts against a query; higher is more relevant."""
+
+    name = "base"
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        raise NotImplementedError
+
+
+class LexicalScorer(Scorer):
+    """BM25 with document frequencies taken from the candidate set itself."""
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        q = set(terms(query))
+        docs = [Counter(terms(t)) for t in texts]
+        if not q or not docs:
+            return [0.0] * len(texts)
+        n = len(docs)
+        avg_len = sum(sum(d.values()) for d in docs) / n or 1.0
+        df = {w: sum(1 for d in docs if w in d) for w in q}
+        out = []
+        for d in docs:
+            length = sum(d.values())
+            s = 0.0
+            for w in q:
+                tf = d.get(w, 0)
+                if tf:
+                    idf = math.log(1 + (n - df[w] + 0.5) / (df[w] + 0.5))
+                    s += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+            out.append(s)
+        return out
+
+
+class NoopScorer(Scorer):
+    name = "none"
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        return [0.0] * len(texts)
+
+
+SCORERS = {"lexical": LexicalScorer, "none": NoopScorer}
+
+_scorer: Optional[Scorer] = None
+
+
+def get_scorer() -> Scorer:
+    global _scorer
+    if _scorer is None:
+        _scorer = SCORERS.get(RERANK_SCORER, LexicalScorer)()
+    return _scorer
+
+
+# ---------- Near-duplicate detection ----------
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles."""
+    words = _WORD_RE.findall(text.casefold())
+    grams = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    digests = b"".join(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest() for g in grams)
+    # One row of 64 bits per shingle, bit i of the little-endian hash in column i.
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(grams), 8), axis=1, bitorder="little")
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(grams)
+    return int.from_bytes(np.packbits(votes > 0, bitorder="little").tobytes(), "little")
+
+
+def dedupe(
+    hits: Sequence[Dict[str, Any]],
+    max_bits: int = RERANK_DEDUPE_BITS,
+    deadline: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Drops hits whose text is a near-duplicate of a better-ranked hit. Past
+    `deadline` (a time.perf_counter() value) the remaining hits are kept
+    unchecked.
+    """
+    kept: List[Dict[str, Any]] = []
+    prints: List[int] = []
+    for i, h in enumerate(hits):
+        if deadline is not None and time.perf_counter() > deadline:
+            kept.extend(hits[i:])
+            break
+        fp = simhash(h["text"])
+        if any(bin(fp ^ p).count("1") <= max_bits for p in prints):
+            continue
+        kept.append(h)
+        prints.append(fp)
+    return kept, len(hits) - len(kept)
+
+
+# ---------- Compression ----------
+
+def _truncate(text: str, max_tokens: int) -> Tuple[str, int, int]:
+    words, used, end = [], 0, 0
+    for m in _TOKEN_RE.finditer(text):
+        n = chunking.count_tokens(" " + m.group())
+        if used + n > max_tokens:
+            break
+        words.append(m.group())
+        used += n
+        end = m.end()
+    start = _TOKEN_RE.search(text).start() if words else 0
+    return " ".join(words), start, end
+
+
+def trim_to_query(query: str, text: str, max_tokens: int, scorer: Scorer) -> Tuple[str, int, int]:
+    """
+    Keeps the sentences most relevant to `query`, in document order, up to
+    `max_tokens`. Omitted stretches are marked with an ellipsis. Returns
+    (excerpt, start, end): text[start:end] is the stretch it was cut from.
+    """
+    spans = []
+    for m in _SENTENCE_RE.finditer(text):
+        raw = m.group()
+        stripped = raw.strip()
+        if stripped:
+            start = m.start() + len(raw) - len(raw.lstrip())
+            spans.append((stripped, start, start + len(stripped)))
+    if len(spans) <= 1:
+        return _truncate(text, max_tokens)
+    sentences = [s for s, _, _ in spans]
+    scores = scorer.score(query, sentences)
+    if max(scores) <= 0:
+        return _truncate(text, max_tokens)
+    order = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    chosen, used = set(), 0
+    for i in order:
+        if scores[i] <= 0:
+            break
+        n = count_text_tokens(sentences[i])
+        if used + n > max_tokens:
+            if not chosen:
+                cut, lo, hi = _truncate(sentences[i], max_tokens)
+                return cut, spans[i][1] + lo, spans[i][1] + hi
+            continue
+        chosen.add(i)
+        used += n
+    parts, prev = [], -1
+    for i in sorted(chosen):
+        if prev >= 0 and i != prev + 1:
+            parts.append("…")
+        parts.append(sentences[i])
+        prev = i
+    return " ".join(parts), spans[min(chosen)][1], spans[max(chosen)][2]
+
+
+# ---------- Stage ----------
+
+def candidate_count(top_k: int, max_k: int) -> int:
+    return min(max_k, max(top_k, int(math.ceil(top_k * RERANK_OVERFETCH))))
+
+
+def rerank(
+    query: str,
+    hits: Sequence[Dict[str, Any]],
+    top_k: int,
+    *,
+    scorer: Optional[Scorer] = None,
+    token_budget: int = RERANK_TOKEN_BUDGET,
+    time_budget_ms: float = RERANK_TIME_BUDGET_MS,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Dedupes, reorders and compresses retrieved hits for answer synthesis.
+    Returns (hits, stats); hit texts are replaced by query-relevant excerpts,
+    char_start/char_end narrowed to the stretch each was cut from, and the
+    total stays within `token_budget`. `time_budget_ms` covers the whole
+    stage: once it runs out, hits keep retrieval order and are truncated
+    instead of sentence-scored.
+    """
+    t0 = time.perf_counter()
+    scorer = scorer or get_scorer()
+    deadline = t0 + time_budget_ms / 1000.0
+
+    kept, dropped = dedupe(hits, deadline=deadline)
+    n = len(kept)
+    over_time = time.perf_counter() > deadline
+    if over_time:
+        ranked = kept[:top_k]
+    else:
+        scores = scorer.score(query, [h["text"] for h in kept])
+        top = max(scores, default=0.0) or 1.0
+        blended = [
+            RERANK_WEIGHT * (s / top) + (1 - RERANK_WEIGHT) * (1 - i / max(1, n))
+            for i, s in enumerate(scores)
+        ]
+        ranked = [kept[i] for i in sorted(range(n), key=lambda i: -blended[i])][:top_k]
+
+    out: List[Dict[str, Any]] = []
+    remaining = token_budget
+    tokens_in = tokens_out = 0
+    for h in ranked:
+        if remaining <= 0:
+            break
+        per = min(RERANK_SNIPPET_TOKENS, remaining)
+        text = h["text"]
+        tokens_in += count_text_tokens(text)
+        over_time = over_time or time.perf_counter() > deadline
+        cut, lo, hi = _truncate(text, per) if over_time else trim_to_query(query, text, per, scorer)
+        used = count_text_tokens(cut)
+        if not used:
+            continue
+        remaining -= used
+        tokens_out += used
+        hit = {**h, "text": cut, "trimmed": cut != text}
+        if h.get("char_start") is not None:
+            hit["char_start"] = h["char_start"] + lo
+            hit["char_end"] = h["char_start"] + hi
+        out.append(hit)
+
+    stats = {
+        "scorer": scorer.name,
+        "candidates": len(hits),
+        "deduped": dropped,
+        "returned": len(out),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "time_budget_exceeded": over_time,
+        "rerank_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+    return out, stats
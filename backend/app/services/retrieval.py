@@ -0,0 +1,360 @@
+# backend/app/services/retrieval.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from psycopg.rows import dict_row
+
+from backend.app.db.connection import get_async_conn
+from backend.app.services import query_cache, vector_index
+from backend.app.services.tenant_settings import QUANTIZATION_MODES
+
+log = logging.getLogger("retrieval")
+
+# HNSW candidate list size; higher = better recall, slower queries.
+RETRIEVAL_EF_SEARCH = int(os.getenv("RETRIEVAL_EF_SEARCH", "100"))
+# Scopes with at most this many vectors are scanned exactly: the doc_id index
+# narrows the rows and an exact sort is cheaper than a filtered graph walk.
+RETRIEVAL_EXACT_MAX_ROWS = int(os.getenv("RETRIEVAL_EXACT_MAX_ROWS", "20000"))
+# Upper bound on tuples visited by an iterative HNSW scan (pgvector >= 0.8).
+RETRIEVAL_MAX_SCAN_TUPLES = int(os.getenv("RETRIEVAL_MAX_SCAN_TUPLES", "20000"))
+RETRIEVAL_MAX_TOP_K = 50
+# Candidates per result taken from a quantized HNSW index before exact re-scoring.
+RETRIEVAL_RESCORE_FACTOR_HALFVEC = int(os.getenv("RETRIEVAL_RESCORE_FACTOR_HALFVEC", "2"))
+RETRIEVAL_RESCORE_FACTOR_BINARY = int(os.getenv("RETRIEVAL_RESCORE_FACTOR_BINARY", "8"))
+# Candidates taken from each of the vector and lexical searches before fusion.
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "30"))
+# Reciprocal-rank fusion constant; larger values flatten the rank weighting.
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+# Answer short keyword lookups (SKUs, names) from the full-text index alone.
+RETRIEVAL_LEXICAL_FAST_PATH = os.getenv("RETRIEVAL_LEXICAL_FAST_PATH", "1") not in ("0", "false", "no")
+RETRIEVAL_KEYWORD_MAX_WORDS = int(os.getenv("RETRIEVAL_KEYWORD_MAX_WORDS", "3"))
+# Must match the configuration of the chunks.tsv generated column.
+FTS_CONFIG = "english"
+
+_pgvector_version: Optional[tuple] = None
+
+
+async def _vector_version(conn) -> tuple:
+    global _pgvector_version
+    if _pgvector_version is None:
+        cur = await conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = await cur.fetchone()
+        _pgvector_version = tuple(int(x) for x in (row[0] if row else "0").split(".")[:3])
+    return _pgvector_version
+
+
+async def scope_doc_ids(conn, workspace_id: str) -> List[str]:
+    """Documents visible in a playground."""
+    cur = await conn.execute("SELECT doc_id FROM playground_docs WHERE pg_id = %s", (workspace_id,))
+    return [r[0] for r in await cur.fetchall()]
+
+
+def _ann_candidates(mode: str, dim: int) -> str:
+    """
+    Nearest rows of one quantization mode. The ORDER BY expression and the
+    quantization literal match that mode's partial HNSW index (migration 011).
+    """
+    if mode == "halfvec":
+        order = f"vec::halfvec({dim}) <=> %(q)s::halfvec({dim})"
+    elif mode == "binary":
+        order = f"binary_quantize(vec)::bit({dim}) <~> binary_quantize(%(q)s::vector)"
+    else:
+        order = "vec <=> %(q)s"
+    return f"""(
+            SELECT chunk_id, vec FROM chunk_vectors
+            WHERE doc_id = ANY(%(docs)s) AND quantization = '{mode}'
+            ORDER BY {order}
+            LIMIT %(n_{mode})s
+        )"""
+
+
+_SNIPPET_COLUMNS = """
+    c.chunk_id, c.doc_id, d.title, c.page_start, c.page_end,
+    lower(c.char_span) AS char_start, upper(c.char_span) AS char_end, c.text
+"""
+
+
+async def search_vectors(
+    conn,
+    doc_ids: Sequence[str],
+    query_vec: np.ndarray,
+    top_k: int,
+    *,
+    strategy: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    rescore_factor: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Nearest chunks to `query_vec` restricted to `doc_ids`.
+
+    Strategies:
+      exact     - doc_id index scan + exact sort (small scopes; perfect recall)
+      iterative - HNSW with hnsw.iterative_scan, which keeps walking the graph
+                  until enough rows pass the filter (pgvector >= 0.8)
+      hnsw      - plain HNSW with a raised ef_search; older pgvector fallback
+    By default the strategy is picked from the scope size.
+
+    The HNSW strategies search the index of every quantization mode present
+    in the scope (see tenant_settings). Halfvec and binary indexes return
+    top_k * rescore_factor candidates (RETRIEVAL_RESCORE_FACTOR_* by
+    default), which are re-ranked by exact distance on the float vectors.
+    """
+    if not doc_ids:
+        return {"hits": [], "strategy": "empty", "scope_rows": 0}
+    top_k = max(1, min(top_k, RETRIEVAL_MAX_TOP_K))
+    ef = max(ef_search or RETRIEVAL_EF_SEARCH, top_k)
+    doc_ids = list(doc_ids)
+
+    scope_rows: Optional[int] = None
+    modes: List[str] = []
+    if strategy != "exact":
+        cur = await conn.execute(
+            "SELECT quantization, count(*) FROM chunk_vectors WHERE doc_id = ANY(%s) GROUP BY quantization", (doc_ids,)
+        )
+        counts = dict(await cur.fetchall())
+        scope_rows = sum(counts.values())
+        modes = [m for m in QUANTIZATION_MODES if counts.get(m)]
+        if strategy is None:
+            if scope_rows <= RETRIEVAL_EXACT_MAX_ROWS:
+                strategy = "exact"
+            elif await _vector_version(conn) >= (0, 8, 0):
+                strategy = "iterative"
+            else:
+                strategy = "hnsw"
+        if strategy != "exact" and not modes:
+            return {"hits": [], "strategy": strategy, "scope_rows": 0}
+
+    if strategy == "exact":
+        # MATERIALIZED keeps the planner from pushing ORDER BY into the global HNSW index.
+        sql = f"""
+        WITH scoped AS MATERIALIZED (
+            SELECT chunk_id, vec FROM chunk_vectors WHERE doc_id = ANY(%(docs)s)
+        ), ranked AS (
+            SELECT chunk_id, vec <=> %(q)s AS distance FROM scoped
+            ORDER BY distance LIMIT %(k)s
+        )
+        SELECT {_SNIPPET_COLUMNS}, r.distance
+        FROM ranked r
+        JOIN chunks c ON c.chunk_id = r.chunk_id
+        JOIN documents d ON d.id = c.doc_id
+        ORDER BY r.distance
+        """
+        settings: List[str] = []
+        params: Dict[str, Any] = {}
+    else:
+        factors = {
+            "none": 1,
+            "halfvec": rescore_factor or RETRIEVAL_RESCORE_FACTOR_HALFVEC,
+            "binary": rescore_factor or RETRIEVAL_RESCORE_FACTOR_BINARY,
+        }
+        params = {f"n_{m}": top_k * max(1, factors[m]) for m in modes}
+        ef = max([ef, *params.values()])
+        candidates = "\n            UNION ALL\n            ".join(_ann_candidates(m, len(query_vec)) for m in modes)
+        sql = f"""
+        WITH candidates AS MATERIALIZED (
+            {candidates}
+        ), ranked AS (
+            SELECT chunk_id, vec <=> %(q)s AS distance FROM candidates
+            ORDER BY distance LIMIT %(k)s
+        )
+        SELECT {_SNIPPET_COLUMNS}, r.distance
+        FROM ranked r
+        JOIN chunks c ON c.chunk_id = r.chunk_id
+        JOIN documents d ON d.id = c.doc_id
+        ORDER BY r.distance
+        """
+        settings = [f"SET LOCAL hnsw.ef_search = {int(min(ef, 1000))}"]
+        if strategy == "iterative":
+            settings += [
+                "SET LOCAL hnsw.iterative_scan = relaxed_order",
+                f"SET LOCAL hnsw.max_scan_tuples = {int(RETRIEVAL_MAX_SCAN_TUPLES)}",
+            ]
+
+    t0 = time.perf_counter()
+    async with conn.transaction():
+        for stmt in settings:
+            await conn.execute(stmt)
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(sql, {"docs": doc_ids, "q": np.asarray(query_vec, dtype=np.float32), "k": top_k, **params})
+            rows = await cur.fetchall()
+    for r in rows:
+        r["score"] = round(1.0 - float(r.pop("distance")), 6)
+    return {
+        "hits": rows,
+        "strategy": strategy,
+        "scope_rows": scope_rows,
+        "ef_search": ef if strategy != "exact" else None,
+        "quantization": modes or None,
+        "search_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+# Vector search implementations; each takes search_vectors' arguments and returns its result shape.
+VECTOR_BACKENDS = {
+    "pgvector": search_vectors,
+    "local": vector_index.search,
+}
+
+
+async def lexical_search(
+    conn,
+    doc_ids: Sequence[str],
+    query: str,
+    top_k: int,
+    *,
+    match: str = "any",
+) -> Dict[str, Any]:
+    """
+    Full-text search over chunks.tsv restricted to `doc_ids`, ranked by ts_rank_cd.
+    match="all" requires every term (web-search syntax: quotes, -term);
+    match="any" ORs the terms so long natural-language questions still match.
+    """
+    if not doc_ids:
+        return {"hits": []}
+    if match == "all":
+        tsquery = "websearch_to_tsquery(%(cfg)s, %(q)s)"
+    else:
+        tsquery = "to_tsquery(%(cfg)s, replace(plainto_tsquery(%(cfg)s, %(q)s)::text, ' & ', ' | '))"
+    sql = f"""
+    WITH q AS (SELECT {tsquery} AS query)
+    SELECT {_SNIPPET_COLUMNS}, ts_rank_cd(c.tsv, q.query) AS rank
+    FROM chunks c
+    CROSS JOIN q
+    JOIN documents d ON d.id = c.doc_id
+    WHERE c.doc_id = ANY(%(docs)s) AND c.tsv @@ q.query
+    ORDER BY rank DESC, c.chunk_id
+    LIMIT %(k)s
+    """
+    t0 = time.perf_counter()
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(sql, {"cfg": FTS_CONFIG, "q": query, "docs": list(doc_ids), "k": top_k})
+        rows = await cur.fetchall()
+    for r in rows:
+        r["score"] = round(float(r.pop("rank")), 6)
+    return {"hits": rows, "search_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+_QUESTION_WORDS = {
+    "who", "what", "when", "where", "why", "how", "which", "is", "are", "do", "does",
+    "can", "should", "could", "would", "explain", "describe", "summarize", "list", "compare",
+}
+# Identifier-like tokens: letters and digits mixed (SG001, RB-2140).
+_IDENT_RE = re.compile(r"\b(?=[\w-]*\d)(?=[\w-]*[^\W\d])[\w-]{3,}\b")
+
+
+def is_keyword_query(query: str) -> bool:
+    """
+    Heuristic for exact-term lookups that the full-text index answers well:
+    quoted phrases, queries containing identifiers, and very short queries
+    that are not phrased as a question.
+    """
+    q = query.strip()
+    if not q or "?" in q:
+        return False
+    if len(q) > 2 and q[0] == q[-1] == '"':
+        return True
+    words = q.split()
+    if words[0].casefold() in _QUESTION_WORDS:
+        return False
+    if _IDENT_RE.search(q) and len(words) <= 2 * RETRIEVAL_KEYWORD_MAX_WORDS:
+        return True
+    return len(words) <= RETRIEVAL_KEYWORD_MAX_WORDS
+
+
+def rrf_merge(rankings: Sequence[Sequence[Dict[str, Any]]], top_k: int, k: int = RETRIEVAL_RRF_K) -> List[Dict[str, Any]]:
+    """
+    Reciprocal-rank fusion: each hit scores sum(1 / (k + rank)) over the
+    rankings it appears in. Ties keep first-ranking order.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, 1):
+            entry = fused.get(hit["chunk_id"])
+            if entry is None:
+                entry = fused[hit["chunk_id"]] = {**hit, "score": 0.0}
+            entry["score"] += 1.0 / (k + rank)
+    out = sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:top_k]
+    for h in out:
+        h["score"] = round(h["score"], 6)
+    return out
+
+
+def citations_for(hits: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Numbered citations matching the [n] markers used in answers."""
+    return [
+        {
+            "n": i,
+            "chunk_id": h["chunk_id"],
+            "doc_id": h["doc_id"],
+            "title": h["title"],
+            "page_start": h["page_start"],
+            "page_end": h["page_end"],
+        }
+        for i, h in enumerate(hits, 1)
+    ]
+
+
+async def _vector_leg(doc_ids: List[str], question: str, k: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    query_vec = await query_cache.cache.embed_query(question)
+    embed_ms = round((time.perf_counter() - t0) * 1000, 2)
+    async with get_async_conn() as conn:
+        result = await VECTOR_BACKENDS[vector_index.VECTOR_BACKEND](conn, doc_ids, query_vec, k)
+    result["embed_ms"] = embed_ms
+    return result
+
+
+async def _lexical_leg(doc_ids: List[str], question: str, k: int, match: str) -> Dict[str, Any]:
+    async with get_async_conn() as conn:
+        return await lexical_search(conn, doc_ids, question, k, match=match)
+
+
+async def retrieve(workspace_id: str, question: str, top_k: int) -> Dict[str, Any]:
+    """
+    Top-k snippets for a question within one playground.
+
+    Keyword lookups are served by the full-text index alone when it finds
+    anything (no embedding call). Otherwise the vector and lexical searches
+    run concurrently on separate connections and are merged with RRF.
+    """
+    top_k = max(1, min(top_k, RETRIEVAL_MAX_TOP_K))
+    async with get_async_conn() as conn:
+        doc_ids = await scope_doc_ids(conn, workspace_id)
+    if not doc_ids:
+        return {"hits": [], "citations": [], "mode": "empty", "strategy": "empty", "scope_rows": 0}
+
+    if RETRIEVAL_LEXICAL_FAST_PATH and is_keyword_query(question):
+        lexical = await _lexical_leg(doc_ids, question, top_k, "all")
+        if lexical["hits"]:
+            return {
+                "hits": lexical["hits"],
+                "citations": citations_for(lexical["hits"]),
+                "mode": "lexical",
+                "strategy": "fts",
+                "scope_rows": None,
+                "lexical_ms": lexical["search_ms"],
+            }
+
+    k = min(max(top_k, RETRIEVAL_CANDIDATES), RETRIEVAL_MAX_TOP_K)
+    vector, lexical = await asyncio.gather(
+        _vector_leg(doc_ids, question, k),
+        _lexical_leg(doc_ids, question, k, "any"),
+    )
+    hits = rrf_merge([vector["hits"], lexical["hits"]], top_k)
+    return {
+        "hits": hits,
+        "citations": citations_for(hits),
+        "mode": "hybrid",
+        "strategy": vector["strategy"],
+        "scope_rows": vector["scope_rows"],
+        "embed_ms": vector["embed_ms"],
+        "vector_ms": vector.get("search_ms"),
+        "lexical_ms": lexical["search_ms"],
+    }
@@ -0,0 +1,263 @@
+# backend/app/services/synth_cache.py
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+
+from backend.app.db.connection import DATABASE_URL, get_async_conn
+
+log = logging.getLogger("synth_cache")
+
+SYNTH_CACHE_MAX_ENTRIES = int(os.getenv("SYNTH_CACHE_MAX_ENTRIES", "256"))
+SYNTH_CACHE_TTL_S = float(os.getenv("SYNTH_CACHE_TTL_S", "3600"))
+# Persistent tier (synth_docs) TTL; 0 disables reads and writes to the table.
+SYNTH_CACHE_DB_TTL_S = float(os.getenv("SYNTH_CACHE_DB_TTL_S", str(7 * 24 * 3600)))
+
+
+def request_key(
+    topic: str, num_sections: int, temperature: float, model: str, tenant_id: Optional[str] = None
+) -> str:
+    """
+    Content address of a synthesis request. Topics are compared after
+    whitespace collapsing and case folding; temperature to two decimals.
+    The tenant is part of the address, so tenants never share documents.
+    """
+    normalized = {
+        "tenant_id": tenant_id,
+        "topic": " ".join(topic.split()).casefold(),
+        "num_sections": int(num_sections),
+        "temperature": round(float(temperature), 2),
+        "model": model,
+    }
+    raw = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """
+    A caller's share of a single-flight (see SynthCache.flight). `value` is
+    set when the document came from the cache or another caller's generation;
+    otherwise this caller is the leader and must hand its result to resolve().
+    """
+
+    def __init__(
+        self,
+        cache: "SynthCache",
+        key: str,
+        fut: Optional[asyncio.Future],
+        tenant_id: Optional[str],
+        cacheable: Callable[[Dict[str, Any]], bool],
+    ):
+        self.value: Optional[Dict[str, Any]] = None
+        self.source = "miss"
+        self._cache = cache
+        self._key = key
+        self._fut = fut
+        self._tenant_id = tenant_id
+        self._cacheable = cacheable
+
+    async def resolve(self, value: Dict[str, Any]) -> None:
+        """Publish the leader's result to waiters and, if cacheable, to both tiers."""
+        self.value = value
+        keep = self._cacheable(value)
+        if keep:
+            self._cache._put_memory(self._key, value)
+        if self._fut is not None and not self._fut.done():
+            self._fut.set_result(value)
+        if keep:
+            await self._cache._put_db(self._key, value, self._tenant_id)
+
+
+class SynthCache:
+    """
+    Two-tier cache for generated documents:
+      1. in-process LRU with TTL
+      2. the synth_docs table, with synth_id = request key
+    Concurrent misses for the same key share a single generation.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, db_ttl_s: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.db_ttl_s = db_ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counters: Dict[str, int] = {
+            "hits_memory": 0,
+            "hits_db": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "db_errors": 0,
+        }
+
+    # --- memory tier ---
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    # --- persistent tier ---
+
+    async def _get_db(self, key: str, tenant_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not DATABASE_URL or self.db_ttl_s <= 0 or not tenant_id:
+            return None
+        sql = """
+        SELECT topic, outline, content_md, provider
+        FROM synth_docs
+        WHERE synth_id = %s AND tenant_id = %s
+          AND created_at > now() - make_interval(secs => %s)
+        """
+        try:
+            async with get_async_conn() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(sql, (key, tenant_id, self.db_ttl_s))
+                    return await cur.fetchone()
+        except Exception as e:
+            self.counters["db_errors"] += 1
+            log.warning("synth_docs lookup failed for %s: %s", key, e)
+            return None
+
+    async def _put_db(self, key: str, value: Dict[str, Any], tenant_id: Optional[str]) -> None:
+        # synth_docs.tenant_id is a required FK, so anonymous requests stay memory-only.
+        if not DATABASE_URL or self.db_ttl_s <= 0 or not tenant_id:
+            return
+        sql = """
+        INSERT INTO synth_docs (synth_id, tenant_id, topic, outline, content_md, provider)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (synth_id) DO UPDATE
+          SET tenant_id = EXCLUDED.tenant_id,
+              topic = EXCLUDED.topic,
+              outline = EXCLUDED.outline,
+              content_md = EXCLUDED.content_md,
+              provider = EXCLUDED.provider,
+              created_at = now()
+        """
+        try:
+            async with get_async_conn() as conn:
+                await conn.execute(sql, (
+                    key, tenant_id, value["topic"], Jsonb(value["outline"]),
+                    value["content_md"], value["provider"],
+                ))
+        except Exception as e:
+            self.counters["db_errors"] += 1
+            log.warning("synth_docs write failed for %s: %s", key, e)
+
+    # --- public API ---
+
+    async def lookup(self, key: str, tenant_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Returns (value, "memory"|"db") or (None, "miss") without generating."""
+        value = self._get_memory(key)
+        if value is not None:
+            self.counters["hits_memory"] += 1
+            return value, "memory"
+        value = await self._get_db(key, tenant_id)
+        if value is not None:
+            self.counters["hits_db"] += 1
+            self._put_memory(key, value)
+            return value, "db"
+        self.counters["misses"] += 1
+        return None, "miss"
+
+    @contextlib.asynccontextmanager
+    async def flight(
+        self,
+        key: str,
+        *,
+        tenant_id: Optional[str] = None,
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda v: True,
+    ) -> AsyncIterator[Flight]:
+        """
+        Single-flight around one key. The first caller looks the key up and,
+        on a miss, is the leader: it generates and calls flight.resolve().
+        Later callers wait for the leader and get its value ("coalesced"), or
+        its exception. If the leader is cancelled, or leaves without a value,
+        one waiter takes over instead of inheriting the cancellation.
+        """
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            value = await asyncio.shield(pending)
+            if value is not None:
+                self.counters["coalesced"] += 1
+                coalesced = Flight(self, key, None, tenant_id, cacheable)
+                coalesced.value, coalesced.source = value, "coalesced"
+                yield coalesced
+                return
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        flight = Flight(self, key, fut, tenant_id, cacheable)
+        try:
+            flight.value, flight.source = await self.lookup(key, tenant_id)
+            if flight.value is not None:
+                fut.set_result(flight.value)
+            yield flight
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+                # Nobody may be waiting; avoid "exception was never retrieved" noise.
+                fut.exception()
+            raise
+        finally:
+            # Cancelled, closed (client went away) or returned empty-handed:
+            # None sends the waiters back round the loop above.
+            if not fut.done():
+                fut.set_result(None)
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    async def get_or_create(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        *,
+        tenant_id: Optional[str] = None,
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda v: True,
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Returns (value, source) where source is "memory", "db", "coalesced" or "miss".
+        Only the first caller for a key runs `factory`; the rest await its result.
+        """
+        async with self.flight(key, tenant_id=tenant_id, cacheable=cacheable) as flight:
+            if flight.value is None:
+                await flight.resolve(await factory())
+            return flight.value, flight.source
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits_memory"] + self.counters["hits_db"] + self.counters["misses"]
+        hits = self.counters["hits_memory"] + self.counters["hits_db"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+cache = SynthCache(SYNTH_CACHE_MAX_ENTRIES, SYNTH_CACHE_TTL_S, SYNTH_CACHE_DB_TTL_S)
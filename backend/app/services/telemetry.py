@@ -0,0 +1,334 @@
+# backend/app/services/telemetry.py
+"""
+Per-stage timing for requests and jobs, exported as Prometheus metrics.
+
+    with telemetry.span("extract", kind="pdf"):
+        ...
+
+A span adds its duration to the stage_duration_seconds histogram and to the
+current trace: the HTTP request (TimingMiddleware) or job (worker) being
+handled. The trace lives in a ContextVar, so spans in asyncio tasks and
+threadpool calls started by the request are attributed to it. Stage times
+are summed, so concurrent stages can add up to more than the wall time.
+
+    GET /metrics                    Prometheus text format (this process only)
+    SLOW_REQUEST_MS                 log requests slower than this, with their stage breakdown
+    OTEL_EXPORTER_OTLP_ENDPOINT     also export spans via OTLP/HTTP; needs opentelemetry-sdk
+                                    and opentelemetry-exporter-otlp-proto-http
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.app.db import timing as db_timing
+
+log = logging.getLogger("telemetry")
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+SLOW_JOB_MS = float(os.getenv("SLOW_JOB_MS", "60000"))
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "fifteenpercent-core")
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ---------- Metrics ----------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = _DEFAULT_BUCKETS):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> [bucket counts..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {_num(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_num(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {_num(cumulative)}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `collect`, which returns (label values, value) pairs."""
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str], collect: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name, self.doc, self.label_names, self.collect = name, doc, tuple(labels), collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        try:
+            lines += [f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in self.collect()]
+        except Exception as e:
+            log.warning("Failed to collect %s: %s", self.name, e)
+        return lines
+
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, to the end of the response body.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent per service/provider stage.", ("stage",))
+OPENAI_RETRIES = Counter("openai_retries_total", "OpenAI calls retried, by reason.", ("path", "reason"))
+OPENAI_TOKENS = Counter("openai_tokens_total", "Tokens reported in OpenAI usage.", ("path", "type"))
+SLOW_REQUESTS = Counter("slow_requests_total", "Requests slower than SLOW_REQUEST_MS.", ("route",))
+
+
+def _pool_gauges() -> Iterable[Tuple[Sequence[str], float]]:
+    from backend.app.db.connection import pool_stats
+
+    for pool, s in pool_stats().items():
+        if s.get("open"):
+            for key in ("size", "available", "requests_waiting"):
+                yield (pool, key), float(s[key])
+
+
+METRICS: List[Any] = [
+    HTTP_SECONDS,
+    STAGE_SECONDS,
+    OPENAI_RETRIES,
+    OPENAI_TOKENS,
+    SLOW_REQUESTS,
+    Gauge("db_pool_connections", "Connection pool state.", ("pool", "state"), _pool_gauges),
+]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for m in METRICS:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+
+# ---------- OpenTelemetry (optional) ----------
+
+_tracer = None
+if OTEL_EXPORTER_OTLP_ENDPOINT:
+    try:
+        from opentelemetry import trace as _otel_trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        _provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+        # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT itself and appends /v1/traces.
+        _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        _otel_trace.set_tracer_provider(_provider)
+        _tracer = _otel_trace.get_tracer("backend.app")
+    except ImportError:
+        log.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk/exporter are not installed")
+
+
+def _otel_span(name: str, attrs: Dict[str, Any]):
+    if _tracer is None:
+        return contextlib.nullcontext()
+    return _tracer.start_as_current_span(name, attributes={k: v for k, v in attrs.items() if v is not None})
+
+
+# ---------- Traces and spans ----------
+
+class Trace:
+    """Stage totals and counters for one request or job."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # stage -> [count, seconds]
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            row = self.stages.get(stage)
+            if row is None:
+                row = self.stages[stage] = [0, 0.0]
+            row[0] += 1
+            row[1] += seconds
+
+    def count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {k: {"n": int(n), "ms": round(s * 1000, 1)} for k, (n, s) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])}
+            return {"stages": stages, **({"counters": dict(self.counters)} if self.counters else {})}
+
+    def breakdown(self) -> str:
+        """One-line form for logs: 'openai.chat.completions=812.4ms/2 db.query=40.1ms/9 ...'."""
+        s = self.summary()
+        parts = [f"{k}={v['ms']}ms/{v['n']}" for k, v in s["stages"].items()]
+        parts += [f"{k}={v:g}" for k, v in s.get("counters", {}).items()]
+        return " ".join(parts) or "-"
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("telemetry_trace", default=None)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Trace]:
+    """Makes a new Trace current for the block (one per request or job)."""
+    tr = Trace(name)
+    token = _current.set(tr)
+    try:
+        with _otel_span(name, attrs):
+            yield tr
+    finally:
+        _current.reset(token)
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Records an already-measured stage duration."""
+    STAGE_SECONDS.observe(seconds, stage)
+    tr = _current.get()
+    if tr is not None:
+        tr.add(stage, seconds)
+
+
+def count(name: str, amount: float = 1) -> None:
+    """Adds to a per-trace counter (tokens, retries, ...); Prometheus counters are separate."""
+    tr = _current.get()
+    if tr is not None:
+        tr.count(name, amount)
+
+
+@contextlib.contextmanager
+def span(stage: str, **attrs: Any) -> Iterator[None]:
+    """Times the block as `stage`; usable around awaits as well as sync code."""
+    t0 = time.perf_counter()
+    try:
+        with _otel_span(stage, attrs):
+            yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+# Pooled connections report "db.query" and "db.connect" through these.
+db_timing.set_hooks(span, observe)
+
+
+def timed_iter(stage: str, items: Iterable[Any]) -> Iterator[Any]:
+    """
+    Yields from `items`, recording the time spent producing them (not the
+    consumer's time between items) as one `stage` observation at the end.
+    """
+    total = 0.0
+    it = iter(items)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                total += time.perf_counter() - t0
+            yield item
+    finally:
+        observe(stage, total)
+
+
+# ---------- HTTP middleware ----------
+
+class TimingMiddleware:
+    """
+    ASGI middleware: one trace per HTTP request, timed to the end of the
+    response body (so streaming responses count in full). Requests slower
+    than SLOW_REQUEST_MS are logged with their stage breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with trace(f"{scope['method']} {scope['path']}", method=scope["method"], path=scope["path"]) as tr:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = tr.elapsed_ms()
+                # The route template, not the raw path, keeps label cardinality bounded.
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                HTTP_SECONDS.observe(elapsed / 1000, scope["method"], route, str(status))
+                if elapsed >= SLOW_REQUEST_MS and route != "/metrics":
+                    SLOW_REQUESTS.inc(1, route)
+                    log.warning("Slow request %s %s -> %s in %.0f ms: %s", scope["method"], scope["path"], status, elapsed, tr.breakdown())
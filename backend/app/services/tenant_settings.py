@@ -0,0 +1,129 @@
+# backend/app/services/tenant_settings.py
+"""
+Per-tenant settings (tenant_settings table).
+
+vector_quantization selects the HNSW index a tenant's chunk vectors live in:
+
+    none     float32 vectors (vector_cosine_ops), ~6 KB per 1536-d vector
+    halfvec  float16 copies (halfvec_cosine_ops), half the index size
+    binary   one bit per dimension (bit_hamming_ops), 1/32 of the index size
+
+Full-precision vectors stay in chunk_vectors.vec either way; retrieval
+re-scores the quantized index's candidates against them exactly. halfvec
+and binary need pgvector >= 0.7.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from psycopg.rows import dict_row
+
+from backend.app.db.connection import get_conn
+from backend.app.services import jobs_service
+
+log = logging.getLogger("tenant_settings")
+
+QUANTIZATION_MODES = ("none", "halfvec", "binary")
+VECTOR_QUANTIZATION_DEFAULT = os.getenv("VECTOR_QUANTIZATION_DEFAULT", "none")
+# Rows moved per transaction when a tenant switches modes.
+REQUANTIZE_BATCH = int(os.getenv("REQUANTIZE_BATCH", "2000"))
+
+if VECTOR_QUANTIZATION_DEFAULT not in QUANTIZATION_MODES:
+    raise RuntimeError(f"unknown VECTOR_QUANTIZATION_DEFAULT {VECTOR_QUANTIZATION_DEFAULT!r}")
+
+
+class SettingsError(Exception):
+    pass
+
+
+def get(tenant_id: str) -> Dict[str, Any]:
+    """A tenant's settings, with defaults for tenants that have no row."""
+    sql = "SELECT tenant_id, vector_quantization, updated_at FROM tenant_settings WHERE tenant_id = %s"
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, (tenant_id,))
+                row = cur.fetchone()
+    except Exception as e:
+        log.error("Failed to read settings of tenant %s: %s", tenant_id, e)
+        row = None
+    return row or {"tenant_id": tenant_id, "vector_quantization": VECTOR_QUANTIZATION_DEFAULT, "updated_at": None}
+
+
+def quantization_for(conn, tenant_ids: Iterable[str]) -> Dict[str, str]:
+    """vector_quantization for each tenant, on the caller's connection."""
+    ids = list(set(tenant_ids))
+    rows = conn.execute(
+        "SELECT tenant_id, vector_quantization FROM tenant_settings WHERE tenant_id = ANY(%s)", (ids,)
+    ).fetchall()
+    modes = {t: VECTOR_QUANTIZATION_DEFAULT for t in ids}
+    modes.update(dict(rows))
+    return modes
+
+
+def _supports_quantization(conn) -> bool:
+    row = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()
+    return row is not None and tuple(int(x) for x in row[0].split(".")[:2]) >= (0, 7)
+
+
+def set_vector_quantization(tenant_id: str, mode: str) -> Dict[str, Any]:
+    """
+    Stores the tenant's mode and, if it changed, enqueues a "requantize_vectors"
+    job that moves the tenant's existing vectors into the matching index.
+    Raises SettingsError for an unknown or unsupported mode.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise SettingsError(f"vector_quantization must be one of {', '.join(QUANTIZATION_MODES)}")
+    upsert_sql = """
+    INSERT INTO tenant_settings (tenant_id, vector_quantization) VALUES (%s, %s)
+    ON CONFLICT (tenant_id) DO UPDATE
+       SET vector_quantization = EXCLUDED.vector_quantization, updated_at = now()
+    RETURNING tenant_id, vector_quantization, updated_at
+    """
+    with get_conn() as conn:
+        if mode != "none" and not _supports_quantization(conn):
+            raise SettingsError(f"vector_quantization={mode} requires pgvector >= 0.7")
+        with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+            cur.execute("SELECT vector_quantization FROM tenant_settings WHERE tenant_id = %s FOR UPDATE", (tenant_id,))
+            old = cur.fetchone()
+            previous = old["vector_quantization"] if old else VECTOR_QUANTIZATION_DEFAULT
+            cur.execute(upsert_sql, (tenant_id, mode))
+            settings = cur.fetchone()
+            job_id: Optional[str] = None
+            if previous != mode:
+                job_id = jobs_service.enqueue("requantize_vectors", {"tenant_id": tenant_id}, conn=conn)
+    log.info("Tenant %s vector_quantization %s -> %s", tenant_id, previous, mode)
+    return {**settings, "job_id": job_id}
+
+
+def run_requantize(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler for "requantize_vectors": moves the tenant's chunk_vectors
+    rows to its current mode in REQUANTIZE_BATCH-row transactions. Each
+    update re-inserts the row into the new mode's index; retrieval searches
+    every mode present in a scope, so results stay complete meanwhile.
+    """
+    job_id = job["job_id"]
+    tenant_id = job["payload"]["tenant_id"]
+    mode = get(tenant_id)["vector_quantization"]
+    sql = """
+    UPDATE chunk_vectors SET quantization = %(mode)s
+     WHERE chunk_id IN (
+        SELECT chunk_id FROM chunk_vectors
+         WHERE tenant_id = %(tenant)s AND quantization <> %(mode)s
+         LIMIT %(n)s
+         FOR UPDATE SKIP LOCKED
+     )
+    """
+    moved = 0
+    with get_conn() as conn:
+        while True:
+            n = conn.execute(sql, {"mode": mode, "tenant": tenant_id, "n": REQUANTIZE_BATCH}).rowcount
+            moved += n
+            jobs_service.set_progress(job_id, "requantize", mode=mode, moved=moved)
+            if n < REQUANTIZE_BATCH:
+                break
+    log.info("Requantized %s vectors of tenant %s to %s", moved, tenant_id, mode)
+    return {"tenant_id": tenant_id, "mode": mode, "moved": moved}
@@ -0,0 +1,391 @@
+# backend/app/services/vector_index.py
+"""
+In-process vector search, an alternative to pgvector's HNSW indexes.
+
+    VECTOR_BACKEND=pgvector   search chunk_vectors in Postgres (default)
+    VECTOR_BACKEND=local      search the per-tenant indexes below
+
+Each tenant has a directory under VECTOR_INDEX_DIR (default
+$DOCUMENT_STORAGE_DIR/vector_index, on the volume the API and workers share):
+
+    vectors.f32   unit-normalized float32 rows, append-only, memory-mapped
+    rows.jsonl    [chunk_id, doc_id, title] of each row, same order
+    deleted.npy   tombstones (chunks deleted since the row was written)
+    hnsw.bin      hnswlib graph over the rows, kept once the tenant has
+                  VECTOR_INDEX_HNSW_MIN_ROWS rows (needs hnswlib)
+    meta.json     dim, row count and generation; replaced last, so readers
+                  only see rows a writer has finished
+
+chunk_vectors remains the source of truth. The worker appends each
+embedding pass (add) and periodically reconciles every index with the table
+(sync_all), which also rebuilds a lost index directory. search() has the
+signature and result shape of retrieval.search_vectors.
+"""
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg.rows import dict_row
+
+from backend.app.db.connection import get_conn
+
+log = logging.getLogger("vector_index")
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pgvector")
+# Must be shared by the API and the workers (the workers write, the API reads);
+# DOCUMENT_STORAGE_DIR already is.
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(os.getenv("DOCUMENT_STORAGE_DIR", "/tmp"), "vector_index"))
+# Tenants with fewer rows are only ever scanned exactly.
+VECTOR_INDEX_HNSW_MIN_ROWS = int(os.getenv("VECTOR_INDEX_HNSW_MIN_ROWS", "20000"))
+# Graph parameters; the defaults match pgvector's HNSW (m=16, ef_construction=64).
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "16"))
+VECTOR_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", "64"))
+VECTOR_INDEX_SYNC_BATCH = int(os.getenv("VECTOR_INDEX_SYNC_BATCH", "2000"))
+# Same knobs as the pgvector backend (see retrieval.py).
+RETRIEVAL_EF_SEARCH = int(os.getenv("RETRIEVAL_EF_SEARCH", "100"))
+RETRIEVAL_EXACT_MAX_ROWS = int(os.getenv("RETRIEVAL_EXACT_MAX_ROWS", "20000"))
+
+if VECTOR_BACKEND not in ("pgvector", "local"):
+    raise RuntimeError(f"unknown VECTOR_BACKEND {VECTOR_BACKEND!r}")
+
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class _Snapshot:
+    """One generation of an index as seen by readers; never mutated after load."""
+
+    def __init__(self, generation: int, dim: int, vecs: np.ndarray, rows: List[list], deleted: np.ndarray, graph):
+        self.generation = generation
+        self.dim = dim
+        self.vecs = vecs
+        self.chunk_ids = [r[0] for r in rows]
+        self.titles = [r[2] for r in rows]
+        self.row_of = {cid: i for i, cid in enumerate(self.chunk_ids)}
+        # Documents as small ints, so scope filters are one np.isin over int32.
+        self.doc_codes: Dict[str, int] = {}
+        self.docs = np.fromiter((self.doc_codes.setdefault(r[1], len(self.doc_codes)) for r in rows), np.int32, len(rows))
+        self.deleted = deleted
+        self.graph = graph
+
+
+class TenantIndex:
+    def __init__(self, root: str, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.path = os.path.join(root, _SAFE_RE.sub("_", tenant_id))
+        self.snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file("meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    @contextmanager
+    def _writer(self):
+        """Serializes writers across threads and worker processes."""
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(self._file(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self) -> Optional[_Snapshot]:
+        """The current snapshot, reloaded if a writer published a newer generation."""
+        meta = self._read_meta()
+        snap = self.snapshot
+        if meta is None:
+            return None
+        if snap is None or snap.generation != meta["generation"]:
+            snap = self.snapshot = self._load(meta)
+        return snap
+
+    def _load(self, meta: Dict[str, Any]) -> _Snapshot:
+        n, dim = meta["rows"], meta["dim"]
+        vecs = np.zeros((0, dim), dtype=np.float32)
+        rows = []
+        if n:
+            vecs = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(n, dim))
+            with open(self._file("rows.jsonl"), encoding="utf-8") as f:
+                rows = [json.loads(line) for _, line in zip(range(n), f)]
+        deleted = np.zeros(n, dtype=bool)
+        if os.path.exists(self._file("deleted.npy")):
+            saved = np.load(self._file("deleted.npy"))[:n]
+            deleted[: len(saved)] = saved
+        graph = None
+        if hnswlib is not None and meta.get("graph_rows") == n and n:
+            graph = hnswlib.Index(space="cosine", dim=dim)
+            graph.load_index(self._file("hnsw.bin"), max_elements=n)
+        return _Snapshot(meta["generation"], dim, vecs, rows, deleted, graph)
+
+    # ---------- Writes ----------
+
+    def update(self, items: Sequence[Tuple[str, str, str, np.ndarray]], remove: Sequence[str] = ()) -> Dict[str, int]:
+        """
+        Appends (chunk_id, doc_id, title, vec) rows and tombstones the chunk
+        ids in `remove`. A chunk already in the index is replaced.
+        """
+        with self._writer():
+            snap = self.refresh()
+            meta = self._read_meta() or {"dim": 0, "rows": 0, "rows_bytes": 0, "generation": 0, "graph_rows": 0}
+            n = meta["rows"]
+            if items and not meta["dim"]:
+                meta["dim"] = len(items[0][3])
+            dim = meta["dim"]
+            row_of = snap.row_of if snap else {}
+            deleted = np.zeros(n + len(items), dtype=bool)
+            if snap is not None:
+                deleted[:n] = snap.deleted
+            dead = [row_of[c] for c in remove if c in row_of]
+            dead += [row_of[c] for c, *_ in items if c in row_of]
+            deleted[dead] = True
+
+            added = 0
+            if items:
+                vecs = np.asarray([it[3] for it in items], dtype=np.float32).reshape(len(items), dim)
+                norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+                vecs /= np.where(norms == 0, 1, norms)
+                # Truncate first: bytes past meta belong to a writer that died mid-append.
+                with open(self._file("vectors.f32"), "ab") as f:
+                    f.truncate(n * dim * 4)
+                    f.write(vecs.tobytes())
+                with open(self._file("rows.jsonl"), "ab") as f:
+                    f.truncate(meta["rows_bytes"])
+                    for chunk_id, doc_id, title, _ in items:
+                        f.write((json.dumps([chunk_id, doc_id, title or ""]) + "\n").encode("utf-8"))
+                    meta["rows_bytes"] = f.tell()
+                added = len(items)
+            total = n + added
+            np.save(self._file("deleted.npy.tmp.npy"), deleted)
+            os.replace(self._file("deleted.npy.tmp.npy"), self._file("deleted.npy"))
+
+            meta["graph_rows"] = self._update_graph(meta, total, deleted) if hnswlib is not None else 0
+            meta["rows"] = total
+            meta["generation"] += 1
+            self._write_meta(meta)
+        return {"added": added, "removed": len(dead)}
+
+    def _update_graph(self, meta: Dict[str, Any], total: int, deleted: np.ndarray) -> int:
+        """Extends (or first builds) hnsw.bin to cover rows [0, total); returns its row count."""
+        if total < VECTOR_INDEX_HNSW_MIN_ROWS:
+            return 0
+        dim = meta["dim"]
+        vecs = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(total, dim))
+        graph = hnswlib.Index(space="cosine", dim=dim)
+        start = 0
+        if meta.get("graph_rows") and os.path.exists(self._file("hnsw.bin")):
+            graph.load_index(self._file("hnsw.bin"), max_elements=total)
+            start = meta["graph_rows"]
+        else:
+            graph.init_index(max_elements=total, ef_construction=VECTOR_INDEX_HNSW_EF_CONSTRUCTION, M=VECTOR_INDEX_HNSW_M)
+            log.info("Building HNSW graph over %s vectors of tenant %s", total, self.tenant_id)
+        if start < total:
+            graph.add_items(np.asarray(vecs[start:total]), np.arange(start, total))
+        for row in np.flatnonzero(deleted):
+            try:
+                graph.mark_deleted(int(row))
+            except RuntimeError:
+                pass  # already marked
+        graph.save_index(self._file("hnsw.bin.tmp"))
+        os.replace(self._file("hnsw.bin.tmp"), self._file("hnsw.bin"))
+        return total
+
+    # ---------- Reads ----------
+
+    def search(
+        self,
+        doc_ids: Sequence[str],
+        query_vec: np.ndarray,
+        top_k: int,
+        strategy: Optional[str],
+        ef: int,
+        skip: Sequence[int] = (),
+    ) -> Dict[str, Any]:
+        """Rows (ascending cosine distance) of the nearest live chunks in `doc_ids`."""
+        snap = self.refresh()
+        if snap is None:
+            return {"rows": [], "distances": [], "strategy": strategy or "exact", "scope_rows": 0, "snapshot": None}
+        codes = [snap.doc_codes[d] for d in doc_ids if d in snap.doc_codes]
+        mask = np.isin(snap.docs, codes) & ~snap.deleted
+        if skip:
+            mask[list(skip)] = False
+        scope = np.flatnonzero(mask)
+        if strategy is None:
+            strategy = "exact" if len(scope) <= RETRIEVAL_EXACT_MAX_ROWS or snap.graph is None else "hnsw"
+        if strategy != "exact" and snap.graph is None:
+            strategy = "exact"
+        k = min(top_k, len(scope))
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        rows, dist = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if k and strategy != "exact":
+            snap.graph.set_ef(max(ef, k))
+            try:
+                labels, d = snap.graph.knn_query(q, k=k, num_threads=1, filter=lambda label: bool(mask[label]))
+                rows, dist = labels[0].astype(np.int64), d[0]
+            except RuntimeError:
+                # The filtered walk found fewer than k rows; answer exactly instead.
+                strategy = "exact"
+        if k and strategy == "exact":
+            dist = 1.0 - np.asarray(snap.vecs[scope]) @ q
+            top = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+            top = top[np.argsort(dist[top], kind="stable")]
+            rows, dist = scope[top], dist[top]
+        return {
+            "rows": rows.tolist(),
+            "distances": dist.tolist(),
+            "strategy": strategy,
+            "scope_rows": int(len(scope)),
+            "snapshot": snap,
+        }
+
+
+_indexes: Dict[Tuple[str, str], TenantIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(tenant_id: str, root: Optional[str] = None) -> TenantIndex:
+    key = (root or VECTOR_INDEX_DIR, tenant_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TenantIndex(key[0], tenant_id)
+    return index
+
+
+def add(tenant_id: str, items: Sequence[Tuple[str, str, str, np.ndarray]]) -> None:
+    """Appends freshly embedded (chunk_id, doc_id, title, vec) rows to a tenant's index."""
+    if items:
+        get_index(tenant_id).update(items)
+
+
+def sync(conn, tenant_id: str, root: Optional[str] = None) -> Dict[str, int]:
+    """
+    Reconciles a tenant's index with chunk_vectors on `conn`: rows of deleted
+    chunks are tombstoned and missing chunks appended.
+    """
+    index = get_index(tenant_id, root)
+    live = {r[0] for r in conn.execute("SELECT chunk_id FROM chunk_vectors WHERE tenant_id = %s", (tenant_id,))}
+    snap = index.refresh()
+    have = {cid for i, cid in enumerate(snap.chunk_ids) if not snap.deleted[i]} if snap else set()
+    missing = sorted(live - have)
+    gone = sorted(have - live)
+    stats = {"added": 0, "removed": 0}
+    if gone:
+        stats = index.update([], remove=gone)
+    sql = "SELECT chunk_id, doc_id, filename, vec FROM chunk_vectors WHERE chunk_id = ANY(%s) ORDER BY chunk_id"
+    for i in range(0, len(missing), VECTOR_INDEX_SYNC_BATCH):
+        batch = conn.execute(sql, (missing[i:i + VECTOR_INDEX_SYNC_BATCH],)).fetchall()
+        stats["added"] += index.update([(c, d, f, np.asarray(v, dtype=np.float32)) for c, d, f, v in batch])["added"]
+    return stats
+
+
+def sync_all() -> Dict[str, int]:
+    """sync() for every tenant that has vectors; run periodically by the worker."""
+    totals = {"tenants": 0, "added": 0, "removed": 0}
+    try:
+        with get_conn() as conn:
+            tenants = [r[0] for r in conn.execute("SELECT DISTINCT tenant_id FROM chunk_vectors")]
+            for tenant_id in tenants:
+                s = sync(conn, tenant_id)
+                totals["tenants"] += 1
+                totals["added"] += s["added"]
+                totals["removed"] += s["removed"]
+    except Exception as e:
+        log.error("Failed to sync vector indexes: %s", e)
+    if totals["added"] or totals["removed"]:
+        log.info("Synced vector indexes: %s", totals)
+    return totals
+
+
+async def search(
+    conn,
+    doc_ids: Sequence[str],
+    query_vec: np.ndarray,
+    top_k: int,
+    *,
+    strategy: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    rescore_factor: Optional[int] = None,
+    root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    retrieval.search_vectors over the local indexes. Scopes up to
+    RETRIEVAL_EXACT_MAX_ROWS are scored exactly with NumPy over the
+    memory-mapped rows; larger ones walk the tenant's HNSW graph. Snippets
+    are read from chunks; rows whose chunk has gone since the last sync are
+    skipped. Vectors are always float32 here, so rescore_factor is ignored.
+    """
+    if not doc_ids:
+        return {"hits": [], "strategy": "empty", "scope_rows": 0}
+    doc_ids = list(doc_ids)
+    ef = max(ef_search or RETRIEVAL_EF_SEARCH, top_k)
+    cur = await conn.execute("SELECT DISTINCT tenant_id FROM chunks WHERE doc_id = ANY(%s)", (doc_ids,))
+    tenants = [r[0] for r in await cur.fetchall()]
+
+    t0 = time.perf_counter()
+    skip: Dict[str, List[int]] = {t: [] for t in tenants}
+    for _ in range(3):
+        found = await asyncio.gather(*(
+            asyncio.to_thread(get_index(t, root).search, doc_ids, query_vec, top_k, strategy, ef, skip[t]) for t in tenants
+        ))
+        candidates = sorted(
+            ((d, t, row, res["snapshot"]) for t, res in zip(tenants, found) for row, d in zip(res["rows"], res["distances"])),
+            key=lambda c: c[0],
+        )[:top_k]
+        sql = """
+        SELECT c.chunk_id, c.doc_id, c.page_start, c.page_end,
+               lower(c.char_span) AS char_start, upper(c.char_span) AS char_end, c.text
+        FROM chunks c WHERE c.chunk_id = ANY(%s)
+        """
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(sql, ([s.chunk_ids[row] for _, _, row, s in candidates],))
+            chunks = {r["chunk_id"]: r for r in await cur.fetchall()}
+        stale = [(t, row) for _, t, row, s in candidates if s.chunk_ids[row] not in chunks]
+        if not stale:
+            break
+        for t, row in stale:
+            skip[t].append(row)
+
+    hits = []
+    for d, _, row, s in candidates:
+        chunk = chunks.get(s.chunk_ids[row])
+        if chunk is not None:
+            hits.append({**chunk, "title": s.titles[row], "score": round(1.0 - float(d), 6)})
+    strategies = {res["strategy"] for res in found}
+    return {
+        "hits": hits,
+        "strategy": "hnsw" if "hnsw" in strategies else "exact",
+        "scope_rows": sum(res["scope_rows"] for res in found),
+        "ef_search": ef if "hnsw" in strategies else None,
+        "quantization": None,
+        "backend": "local",
+        "search_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
@@ -15,8 +15,10 @@ log = logging.getLogger("workspaces_service")
 
 def create(tenant_id: str, name: str) -> Optional[Dict[str, Any]]:
     """
-    Creates a new workspace in the database.
+    Creates a new workspace in the database, registering the tenant on
+    first use (playgrounds.tenant_id references tenants).
     """
+    tenant_sql = "INSERT INTO tenants (tenant_id, name) VALUES (%s, %s) ON CONFLICT (tenant_id) DO NOTHING"
     sql = """
     INSERT INTO playgrounds (id, tenant_id, name)
     VALUES (%s, %s, %s)
@@ -24,7 +26,8 @@ def create(tenant_id: str, name: str) -> Optional[Dict[str, Any]]:
     """
     try:
         with get_conn() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
+            with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(tenant_sql, (tenant_id, tenant_id))
                 cur.execute(sql, (str(uuid.uuid4()), tenant_id, name))
                 return cur.fetchone()
     except Exception as e:
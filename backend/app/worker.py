@@ -0,0 +1,169 @@
+# backend/app/worker.py
+"""
+Background job worker.
+
+    python -m backend.app.worker --concurrency 4
+
+Starts N worker processes. Each one claims jobs from the `jobs` table with
+FOR UPDATE SKIP LOCKED and runs the matching handler from
+ingest_service.HANDLERS. Idle workers wake up on NOTIFY jobs, or after
+JOBS_POLL_INTERVAL_S if a notification is missed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Optional
+
+import psycopg
+
+from backend.app.db.connection import DATABASE_URL, close_pools
+from backend.app.services import (
+    blob_store, events_service, ingest_service, jobs_service, page_store, telemetry, vector_index,
+)
+
+log = logging.getLogger("worker")
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+JOBS_POLL_INTERVAL_S = float(os.getenv("JOBS_POLL_INTERVAL_S", "2"))
+JOBS_REAP_INTERVAL_S = float(os.getenv("JOBS_REAP_INTERVAL_S", "60"))
+EVENTS_MAINTENANCE_INTERVAL_S = float(os.getenv("EVENTS_MAINTENANCE_INTERVAL_S", "3600"))
+BLOB_GC_INTERVAL_S = float(os.getenv("BLOB_GC_INTERVAL_S", "3600"))
+PAGE_COMPACT_INTERVAL_S = float(os.getenv("PAGE_COMPACT_INTERVAL_S", "300"))
+# VECTOR_BACKEND=local only: reconcile the on-disk indexes with chunk_vectors.
+VECTOR_INDEX_SYNC_INTERVAL_S = float(os.getenv("VECTOR_INDEX_SYNC_INTERVAL_S", "300"))
+
+
+def _listen_conn() -> Optional[psycopg.Connection]:
+    try:
+        conn = psycopg.connect(DATABASE_URL, autocommit=True)
+        conn.execute(f"LISTEN {jobs_service.JOBS_CHANNEL}")
+        return conn
+    except Exception as e:
+        log.warning("LISTEN unavailable, falling back to polling: %s", e)
+        return None
+
+
+def _wait_for_work(listen: Optional[psycopg.Connection]) -> None:
+    if listen is None:
+        time.sleep(JOBS_POLL_INTERVAL_S)
+        return
+    for _ in listen.notifies(timeout=JOBS_POLL_INTERVAL_S, stop_after=1):
+        pass
+
+
+def run_one(worker_id: str) -> bool:
+    """
+    Claims and runs a single job. Returns False if the queue was empty.
+    """
+    job = jobs_service.claim(worker_id, list(ingest_service.HANDLERS))
+    if job is None:
+        return False
+
+    job_id = job["job_id"]
+    handler = ingest_service.HANDLERS[job["kind"]]
+    t0 = time.perf_counter()
+    log.info("%s: running %s job %s (attempt %s)", worker_id, job["kind"], job_id, job["attempts"])
+    with telemetry.trace(f"job:{job['kind']}", job_id=job_id) as tr:
+        try:
+            with jobs_service.keep_alive(job_id, worker_id):
+                result = handler(job)
+        except Exception as e:
+            attempts = job["max_attempts"] if isinstance(e, jobs_service.PermanentJobError) else job["attempts"]
+            status = jobs_service.fail(
+                job_id, worker_id, f"{e}\n{traceback.format_exc(limit=5)}", attempts, job["max_attempts"],
+            )
+            log.error("%s: job %s failed (%s) [%s]: %s", worker_id, job_id, status, tr.breakdown(), e)
+            return True
+    elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+    if elapsed_ms >= telemetry.SLOW_JOB_MS:
+        log.warning("%s: slow %s job %s (%.0f ms): %s", worker_id, job["kind"], job_id, elapsed_ms, tr.breakdown())
+    if jobs_service.complete(job_id, worker_id, {**(result or {}), "elapsed_ms": elapsed_ms, "trace": tr.summary()}):
+        log.info("%s: job %s succeeded", worker_id, job_id)
+    else:
+        log.warning("%s: job %s finished after it was requeued; result discarded", worker_id, job_id)
+    return True
+
+
+def worker_main(index: int) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stopping = False
+
+    def _stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    listen = _listen_conn()
+    last_reap = 0.0
+    last_maintenance = 0.0
+    last_gc = 0.0
+    last_compact = 0.0
+    last_sync = 0.0
+    log.info("%s: started", worker_id)
+    while not stopping:
+        try:
+            if time.monotonic() - last_reap > JOBS_REAP_INTERVAL_S:
+                if jobs_service.requeue_stale():
+                    log.warning("%s: requeued stale jobs", worker_id)
+                last_reap = time.monotonic()
+            if time.monotonic() - last_maintenance > EVENTS_MAINTENANCE_INTERVAL_S:
+                last_maintenance = time.monotonic()
+                events_service.maintain_partitions()
+            if time.monotonic() - last_gc > BLOB_GC_INTERVAL_S:
+                last_gc = time.monotonic()
+                blob_store.gc()
+            if time.monotonic() - last_compact > PAGE_COMPACT_INTERVAL_S:
+                last_compact = time.monotonic()
+                # Bounded so a large backlog of migrated pages does not starve the queue.
+                page_store.compact(limit=page_store.PAGE_COMPACT_BATCH * 10)
+            if vector_index.VECTOR_BACKEND == "local" and time.monotonic() - last_sync > VECTOR_INDEX_SYNC_INTERVAL_S:
+                last_sync = time.monotonic()
+                vector_index.sync_all()
+            if not run_one(worker_id):
+                _wait_for_work(listen)
+        except Exception as e:
+            log.error("%s: worker loop error: %s", worker_id, e)
+            time.sleep(JOBS_POLL_INTERVAL_S)
+            if listen is not None and listen.closed:
+                listen = _listen_conn()
+    if listen is not None:
+        listen.close()
+    events_service.buffer.close()
+    asyncio.run(close_pools())
+    log.info("%s: stopped", worker_id)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run background ingestion workers.")
+    ap.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="number of worker processes")
+    args = ap.parse_args()
+
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=worker_main, args=(i,), name=f"worker-{i}") for i in range(max(1, args.concurrency))]
+    for p in procs:
+        p.start()
+
+    def _forward(signum, _frame):
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
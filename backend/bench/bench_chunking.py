@@ -0,0 +1,84 @@
+"""
+Chunker throughput on the testdata/*.txt corpus.
+
+    python -m backend.bench.bench_chunking --chunk-size 512 --overlap 64 --repeat 5
+
+Text files are split into virtual pages of --page-chars characters and fed
+through chunking.iter_chunks; prints one JSON object with chunks/second.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+
+from backend.app.services import chunking
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_corpus(pattern: str, page_chars: int):
+    docs = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        pages = [
+            {"page_no": i + 1, "text": text[o:o + page_chars]}
+            for i, o in enumerate(range(0, len(text), page_chars))
+        ]
+        docs.append((os.path.basename(path), pages, len(text)))
+    return docs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--glob", default=os.path.join(ROOT, "testdata", "*.txt"))
+    ap.add_argument("--chunk-size", type=int, default=512)
+    ap.add_argument("--overlap", type=int, default=64)
+    ap.add_argument("--page-chars", type=int, default=3000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    docs = load_corpus(args.glob, args.page_chars)
+    if not docs:
+        raise SystemExit(f"no files match {args.glob}")
+
+    # Cold pass fills the token cache; report it separately from the warm passes.
+    chunking.count_tokens.cache_clear()
+    t0 = time.perf_counter()
+    cold_chunks = sum(1 for _, pages, _ in docs for _ in chunking.iter_chunks(pages, args.chunk_size, args.overlap))
+    cold_s = time.perf_counter() - t0
+
+    n_chunks = n_tokens = 0
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for _, pages, _ in docs:
+            for c in chunking.iter_chunks(pages, args.chunk_size, args.overlap):
+                n_chunks += 1
+                n_tokens += c["token_len"]
+    warm_s = time.perf_counter() - t0
+    chars = sum(n for _, _, n in docs) * args.repeat
+
+    print(json.dumps({
+        "bench": "chunking",
+        "files": [name for name, _, _ in docs],
+        "tokenizer": "tiktoken:" + chunking.CHUNK_TOKENIZER if chunking._encoding() else "approx",
+        "chunk_size": args.chunk_size,
+        "overlap": args.overlap,
+        "cold": {"chunks": cold_chunks, "seconds": round(cold_s, 4), "chunks_per_s": round(cold_chunks / cold_s, 1)},
+        "warm": {
+            "chunks": n_chunks,
+            "seconds": round(warm_s, 4),
+            "chunks_per_s": round(n_chunks / warm_s, 1),
+            "tokens_per_s": round(n_tokens / warm_s, 1),
+            "mb_per_s": round(chars / warm_s / 1e6, 2),
+        },
+        "token_cache": chunking.count_tokens.cache_info()._asdict(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Index size, build time, recall and latency of quantized vector search.
+
+    DATABASE_URL=postgresql://... python -m backend.bench.bench_quantization --vectors 20000 --queries 50
+
+Loads one synthetic clustered corpus once per quantization mode (none,
+halfvec, binary) into its own schema (--schema, dropped and recreated), so
+each mode's partial HNSW index holds the same vectors. Queries go through
+retrieval.search_vectors with strategy="hnsw" and each --rescore factor;
+recall@k is measured against the exact strategy. halfvec and binary need
+pgvector >= 0.7 and are reported as unsupported otherwise. Prints one JSON
+object.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import psycopg
+from pgvector.psycopg import register_vector_async
+
+from backend.app.db.connection import DATABASE_URL
+from backend.app.services import retrieval
+
+
+def index_sql(mode: str, dim: int) -> str:
+    """The partial HNSW index of one mode, as in migration 011."""
+    if mode == "halfvec":
+        expr = f"(vec::halfvec({dim})) halfvec_cosine_ops"
+    elif mode == "binary":
+        expr = f"(binary_quantize(vec)::bit({dim})) bit_hamming_ops"
+    else:
+        expr = "vec vector_cosine_ops"
+    return f"CREATE INDEX idx_hnsw_{mode} ON chunk_vectors USING hnsw ({expr}) WHERE quantization = '{mode}'"
+
+
+def make_corpus(args, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((args.topics, args.dim)).astype(np.float32)
+    vecs = centers[rng.integers(args.topics, size=args.vectors)]
+    vecs = vecs + 0.6 * rng.standard_normal(vecs.shape).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def docs_of(mode: str, args) -> list:
+    return [f"{mode}-d{d}" for d in range(args.docs)]
+
+
+async def load(conn, args, modes, vecs: np.ndarray) -> dict:
+    """Loads `vecs` once per mode; returns index build seconds per mode."""
+    await conn.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {args.schema}")
+    await conn.execute(f"SET search_path = {args.schema}, public")
+    await conn.execute("""
+    CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, tenant_id TEXT NOT NULL,
+      page_start INT, page_end INT, char_span int4range, token_len INT, text TEXT NOT NULL)
+    """)
+    await conn.execute(f"""
+    CREATE TABLE chunk_vectors (chunk_id TEXT PRIMARY KEY, tenant_id TEXT NOT NULL, doc_id TEXT NOT NULL,
+      filename TEXT NOT NULL, page INT, vec vector({args.dim}), quantization TEXT NOT NULL)
+    """)
+    async with conn.cursor() as cur:
+        for mode in modes:
+            async with cur.copy("COPY chunks (chunk_id, doc_id, tenant_id, page_start, page_end, text) FROM STDIN") as cp:
+                for i in range(len(vecs)):
+                    doc = f"{mode}-d{i % args.docs}"
+                    await cp.write_row((f"{mode}:{i}", doc, mode, 1, 1, f"chunk {i}"))
+            async with cur.copy(
+                "COPY chunk_vectors (chunk_id, tenant_id, doc_id, filename, page, vec, quantization)"
+                " FROM STDIN WITH (FORMAT BINARY)"
+            ) as cp:
+                cp.set_types(["text", "text", "text", "text", "int4", "vector", "text"])
+                for i, v in enumerate(vecs):
+                    doc = f"{mode}-d{i % args.docs}"
+                    await cp.write_row((f"{mode}:{i}", mode, doc, doc, 1, v, mode))
+    await conn.execute("CREATE INDEX ON chunk_vectors (doc_id)")
+    build_s = {}
+    for mode in modes:
+        t0 = time.perf_counter()
+        await conn.execute(index_sql(mode, args.dim))
+        build_s[mode] = round(time.perf_counter() - t0, 2)
+    await conn.execute("ANALYZE")
+    return build_s
+
+
+async def run(args) -> dict:
+    async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await register_vector_async(conn)
+        version = await retrieval._vector_version(conn)
+        modes = [m for m in args.modes if m == "none" or version >= (0, 7, 0)]
+        unsupported = [m for m in args.modes if m not in modes]
+
+        rng = np.random.default_rng(args.seed)
+        vecs = make_corpus(args, rng)
+        t0 = time.perf_counter()
+        build_s = await load(conn, args, modes, vecs)
+        load_s = time.perf_counter() - t0
+
+        sizes = {}
+        for mode in modes:
+            row = await (await conn.execute(
+                "SELECT pg_relation_size(%s::regclass)", (f"{args.schema}.idx_hnsw_{mode}",)
+            )).fetchone()
+            sizes[mode] = row[0]
+
+        queries = [
+            vecs[i] + 0.3 * rng.standard_normal(args.dim).astype(np.float32)
+            for i in rng.integers(len(vecs), size=args.queries)
+        ]
+        samples = {}
+        for mode in modes:
+            docs = docs_of(mode, args)
+            factors = [1] if mode == "none" else args.rescore
+            for q in queries:
+                truth = await retrieval.search_vectors(conn, docs, q, args.top_k, strategy="exact")
+                want = {h["chunk_id"] for h in truth["hits"]}
+                for factor in factors:
+                    t0 = time.perf_counter()
+                    res = await retrieval.search_vectors(
+                        conn, docs, q, args.top_k, strategy="hnsw", ef_search=args.ef, rescore_factor=factor
+                    )
+                    ms = (time.perf_counter() - t0) * 1000
+                    got = {h["chunk_id"] for h in res["hits"]}
+                    s = samples.setdefault((mode, factor), {"ms": [], "recall": []})
+                    s["ms"].append(ms)
+                    s["recall"].append(len(got & want) / max(1, len(want)))
+
+    def pct(xs, p):
+        xs = sorted(xs)
+        return round(xs[min(len(xs) - 1, int(p / 100 * len(xs)))], 2)
+
+    results = [
+        {
+            "quantization": mode,
+            "rescore_factor": factor,
+            "queries": len(s["ms"]),
+            "recall_at_k": round(statistics.mean(s["recall"]), 4),
+            "p50_ms": pct(s["ms"], 50),
+            "p95_ms": pct(s["ms"], 95),
+        }
+        for (mode, factor), s in samples.items()
+    ]
+    return {
+        "bench": "quantization",
+        "pgvector": ".".join(map(str, version)),
+        "vectors": len(vecs),
+        "dim": args.dim,
+        "top_k": args.top_k,
+        "ef_search": args.ef,
+        "load_s": round(load_s, 1),
+        "unsupported": unsupported,
+        "indexes": {
+            m: {
+                "bytes": sizes[m],
+                "build_s": build_s[m],
+                "vs_none": round(sizes[m] / sizes["none"], 3) if sizes.get("none") else None,
+            }
+            for m in modes
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--schema", default="bench_quantization")
+    ap.add_argument("--modes", nargs="+", default=["none", "halfvec", "binary"], choices=["none", "halfvec", "binary"])
+    ap.add_argument("--vectors", type=int, default=20000, help="vectors per mode")
+    ap.add_argument("--docs", type=int, default=500, help="documents the vectors are spread over")
+    ap.add_argument("--topics", type=int, default=64, help="topic clusters")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--top-k", type=int, default=8)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--ef", type=int, default=100)
+    ap.add_argument("--rescore", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="rescore factors for halfvec/binary")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is not set")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
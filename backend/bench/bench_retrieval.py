@@ -0,0 +1,211 @@
+"""
+Recall vs. latency of playground-scoped vector search.
+
+    DATABASE_URL=postgresql://... python -m backend.bench.bench_retrieval --tenants 20 --queries 50
+
+Builds a synthetic multi-tenant corpus in its own schema (--schema, dropped
+and recreated), with clustered vectors per tenant and playgrounds covering
+1, 10% and 100% of a tenant's documents. Every query is run through
+retrieval.search_vectors with each strategy; recall@k is measured against
+the exact strategy. With --backends pgvector local the same queries also go
+through the in-process index (services/vector_index.py), built from the
+corpus into a temporary directory. Prints one JSON object.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import psycopg
+from pgvector.psycopg import register_vector, register_vector_async
+
+from backend.app.db.connection import DATABASE_URL
+from backend.app.services import retrieval, vector_index
+
+
+def make_corpus(args, rng: np.random.Generator):
+    """Yields (tenant, doc_id, chunk_id, vec); each tenant draws from its own topic centers."""
+    for t in range(args.tenants):
+        centers = rng.standard_normal((args.topics, args.dim)).astype(np.float32)
+        for d in range(args.docs):
+            topic = centers[rng.integers(args.topics)]
+            vecs = topic + 0.6 * rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+            for c, v in enumerate(vecs):
+                yield f"t{t}", f"t{t}-d{d}", f"t{t}-d{d}:{c}", v
+
+
+async def load(conn, args) -> None:
+    rng = np.random.default_rng(args.seed)
+    await conn.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {args.schema}")
+    await conn.execute(f"SET search_path = {args.schema}, public")
+    await conn.execute("""
+    CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, tenant_id TEXT NOT NULL,
+      page_start INT, page_end INT, char_span int4range, token_len INT, text TEXT NOT NULL);
+    CREATE TABLE playground_docs (pg_id TEXT NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (pg_id, doc_id));
+    """)
+    await conn.execute(f"""
+    CREATE TABLE chunk_vectors (chunk_id TEXT PRIMARY KEY, tenant_id TEXT NOT NULL, doc_id TEXT NOT NULL,
+      filename TEXT NOT NULL, page INT, vec vector({args.dim}), quantization TEXT NOT NULL DEFAULT 'none')
+    """)
+    async with conn.cursor() as cur:
+        async with cur.copy("COPY chunks (chunk_id, doc_id, tenant_id, page_start, page_end, text) FROM STDIN") as cp:
+            for t in range(args.tenants):
+                for d in range(args.docs):
+                    for c in range(args.chunks):
+                        await cp.write_row((f"t{t}-d{d}:{c}", f"t{t}-d{d}", f"t{t}", 1, 1, f"chunk {c} of t{t}-d{d}"))
+        async with cur.copy(
+            "COPY chunk_vectors (chunk_id, tenant_id, doc_id, filename, page, vec) FROM STDIN WITH (FORMAT BINARY)"
+        ) as cp:
+            cp.set_types(["text", "text", "text", "text", "int4", "vector"])
+            for tenant, doc, chunk, vec in make_corpus(args, rng):
+                await cp.write_row((chunk, tenant, doc, doc, 1, vec))
+    await conn.execute("CREATE INDEX ON chunk_vectors (doc_id)")
+    await conn.execute("CREATE INDEX ON chunk_vectors USING hnsw (vec vector_cosine_ops) WHERE quantization = 'none'")
+    await conn.execute("ANALYZE")
+
+
+def build_local_index(args) -> tuple:
+    """Builds the in-process indexes from the bench schema; returns (root, seconds)."""
+    vector_index.VECTOR_INDEX_HNSW_MIN_ROWS = args.hnsw_min_rows
+    root = tempfile.mkdtemp(prefix="bench_vector_index_")
+    t0 = time.perf_counter()
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        register_vector(conn)
+        conn.execute(f"SET search_path = {args.schema}, public")
+        for t in range(args.tenants):
+            vector_index.sync(conn, f"t{t}", root=root)
+    return root, time.perf_counter() - t0
+
+
+def playgrounds(args):
+    """Scopes of increasing size: one doc, ~10% of a tenant, a whole tenant."""
+    rnd = random.Random(args.seed)
+    scopes = []
+    for t in range(args.tenants):
+        docs = [f"t{t}-d{d}" for d in range(args.docs)]
+        scopes.append(("1_doc", [rnd.choice(docs)]))
+        scopes.append(("10pct_tenant", rnd.sample(docs, max(1, args.docs // 10))))
+        scopes.append(("tenant", docs))
+    return scopes
+
+
+async def run(args) -> dict:
+    async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await register_vector_async(conn)
+        if not args.skip_load:
+            t0 = time.perf_counter()
+            await load(conn, args)
+            load_s = time.perf_counter() - t0
+        else:
+            load_s = 0.0
+        await conn.execute(f"SET search_path = {args.schema}, public")
+        total = (await (await conn.execute("SELECT count(*) FROM chunk_vectors")).fetchone())[0]
+        version = await retrieval._vector_version(conn)
+
+        strategies = []
+        if "pgvector" in args.backends:
+            strategies = [("pgvector", "hnsw", ef) for ef in args.ef] + [("pgvector", "exact", None)]
+            if version >= (0, 8, 0):
+                strategies = [("pgvector", "iterative", ef) for ef in args.ef] + strategies
+        index_root, index_s = None, None
+        if "local" in args.backends:
+            index_root, index_s = build_local_index(args)
+            strategies += [("local", "exact", None)]
+            if vector_index.hnswlib is not None:
+                strategies += [("local", "hnsw", ef) for ef in args.ef]
+
+        rng = np.random.default_rng(args.seed + 1)
+        scopes = playgrounds(args)
+        samples = {}
+        for _ in range(args.queries):
+            kind, docs = scopes[rng.integers(len(scopes))]
+            # Query near a random chunk of the scope.
+            row = await (await conn.execute(
+                "SELECT vec FROM chunk_vectors WHERE doc_id = %s ORDER BY random() LIMIT 1", (rng.choice(docs),)
+            )).fetchone()
+            q = row[0] + 0.3 * rng.standard_normal(args.dim).astype(np.float32)
+            truth = await retrieval.search_vectors(conn, docs, q, args.top_k, strategy="exact")
+            want = {h["chunk_id"] for h in truth["hits"]}
+            for backend, name, ef in strategies:
+                t0 = time.perf_counter()
+                if backend == "local":
+                    res = await vector_index.search(conn, docs, q, args.top_k, strategy=name, ef_search=ef, root=index_root)
+                else:
+                    res = await retrieval.search_vectors(conn, docs, q, args.top_k, strategy=name, ef_search=ef)
+                ms = (time.perf_counter() - t0) * 1000
+                got = {h["chunk_id"] for h in res["hits"]}
+                recall = len(got & want) / max(1, len(want))
+                s = samples.setdefault((kind, backend, name, ef), {"ms": [], "recall": [], "short": 0})
+                s["ms"].append(ms)
+                s["recall"].append(recall)
+                s["short"] += len(got) < len(want)
+        if index_root is not None:
+            shutil.rmtree(index_root, ignore_errors=True)
+
+    def pct(xs, p):
+        xs = sorted(xs)
+        return round(xs[min(len(xs) - 1, int(p / 100 * len(xs)))], 2)
+
+    results = [
+        {
+            "scope": kind,
+            "backend": backend,
+            "strategy": name,
+            "ef_search": ef,
+            "queries": len(s["ms"]),
+            "recall_at_k": round(statistics.mean(s["recall"]), 4),
+            "short_results": s["short"],
+            "p50_ms": pct(s["ms"], 50),
+            "p95_ms": pct(s["ms"], 95),
+        }
+        for (kind, backend, name, ef), s in sorted(samples.items(), key=lambda kv: (*kv[0][:3], kv[0][3] or 0))
+    ]
+    return {
+        "bench": "retrieval",
+        "pgvector": ".".join(map(str, version)),
+        "vectors": total,
+        "dim": args.dim,
+        "top_k": args.top_k,
+        "load_s": round(load_s, 1),
+        "local_index_s": round(index_s, 1) if index_s is not None else None,
+        "hnswlib": vector_index.hnswlib is not None,
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--schema", default="bench_retrieval")
+    ap.add_argument("--tenants", type=int, default=20)
+    ap.add_argument("--docs", type=int, default=25, help="documents per tenant")
+    ap.add_argument("--chunks", type=int, default=40, help="chunks per document")
+    ap.add_argument("--topics", type=int, default=8, help="topic clusters per tenant")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--top-k", type=int, default=8)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--ef", type=int, nargs="+", default=[40, 100, 400])
+    ap.add_argument("--backends", nargs="+", default=["pgvector"], choices=["pgvector", "local"])
+    ap.add_argument("--hnsw-min-rows", type=int, default=vector_index.VECTOR_INDEX_HNSW_MIN_ROWS,
+                    help="rows per tenant before the local index builds an HNSW graph")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--skip-load", action="store_true", help="reuse the corpus from a previous run")
+    args = ap.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is not set")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
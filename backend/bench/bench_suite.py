@@ -0,0 +1,541 @@
+"""
+End-to-end load and micro benchmarks, with results in a comparable JSON format.
+
+    DATABASE_URL=postgresql://... python -m backend.bench.bench_suite --docs 10000 --out bench.json
+    python -m backend.bench.bench_suite --compare baseline.json bench.json
+
+Unless --no-stub is given, backend.bench.stub_openai is started and the app
+is pointed at it, so chat and embedding calls are local and deterministic.
+Stages (--stages, in this order):
+
+    micro   in-process: synth._parse_numbered_list, extraction, chunking and
+            documents_service.create_document_and_version_from_path
+    ingest  testdata/*.txt scaled to --docs synthetic documents, uploaded via
+            POST /workspaces/{id}/documents:upload and indexed by --workers
+            worker processes (0: wait for externally running workers)
+    query   retrieval.search_vectors / lexical_search on the ingested
+            workspace, then --requests concurrent POST /workspaces/{id}/query
+    synth   --requests concurrent POST /synth/document
+
+Requests go to the app in-process (httpx ASGI transport, so client overhead
+is included) or to a running server with --base-url. Every latency series
+reports n, p50/p95/p99, mean, max, errors and throughput.
+
+The suite writes a "bench" tenant's rows into the configured database, so
+point it at a scratch database; they are deleted afterwards unless --keep.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FORMAT_VERSION = 1
+BENCH_TENANT = "bench"
+
+_DIGIT_RE = re.compile(r"\d")
+_WORD_RE = re.compile(r"[A-Za-z]{5,}")
+
+
+# ---------- Statistics ----------
+
+def percentile(sorted_xs: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted series."""
+    if not sorted_xs:
+        return 0.0
+    k = max(0, min(len(sorted_xs) - 1, math.ceil(p / 100 * len(sorted_xs)) - 1))
+    return sorted_xs[k]
+
+
+def summarize(ms: Sequence[float], errors: int = 0, elapsed_s: Optional[float] = None) -> Dict[str, Any]:
+    xs = sorted(ms)
+    out: Dict[str, Any] = {
+        "n": len(xs),
+        "errors": errors,
+        "p50_ms": round(percentile(xs, 50), 3),
+        "p95_ms": round(percentile(xs, 95), 3),
+        "p99_ms": round(percentile(xs, 99), 3),
+        "mean_ms": round(sum(xs) / len(xs), 3) if xs else 0.0,
+        "max_ms": round(xs[-1], 3) if xs else 0.0,
+    }
+    if elapsed_s:
+        out["elapsed_s"] = round(elapsed_s, 3)
+        out["throughput_per_s"] = round(len(xs) / elapsed_s, 2)
+    return out
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+# ---------- Corpus ----------
+
+def load_blocks(pattern: str) -> List[str]:
+    """Blank-line separated blocks of the seed corpus."""
+    blocks: List[str] = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            blocks += [b.strip() for b in f.read().split("\n\n") if len(b.strip()) > 40]
+    return blocks
+
+
+def synthetic_doc(blocks: Sequence[str], i: int, n_blocks: int, rng: random.Random) -> bytes:
+    """
+    A document made of random seed blocks with every digit re-drawn, so its
+    chunks (and their embeddings) are distinct from every other document's.
+    """
+    picked = rng.sample(blocks, min(len(blocks), n_blocks))
+    body = "\n\n".join(_DIGIT_RE.sub(lambda _: str(rng.randrange(10)), b) for b in picked)
+    return f"Synthetic document {i:06d}\n\n{body}\n".encode("utf-8")
+
+
+def make_questions(blocks: Sequence[str], n: int, rng: random.Random) -> List[str]:
+    """A mix of natural-language questions and short keyword queries."""
+    out = []
+    for i in range(n):
+        words = _WORD_RE.findall(rng.choice(blocks)) or ["policy"]
+        picked = rng.sample(words, min(len(words), rng.randint(2, 5)))
+        if i % 3 == 0:
+            out.append(" ".join(picked[:2]))
+        else:
+            out.append(f"What does the documentation say about {' '.join(picked)}?")
+    return out
+
+
+# ---------- Setup ----------
+
+def start_stub(port: int, latency_ms: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "backend.bench.stub_openai", "--port", str(port), "--latency-ms", str(latency_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("stub_openai did not start")
+
+
+def create_workspace(name: str) -> str:
+    from backend.app.db.connection import get_conn
+
+    ws = str(uuid.uuid4())
+    with get_conn() as conn:
+        conn.execute("INSERT INTO playgrounds (id, tenant_id, name) VALUES (%s, %s, %s)", (ws, BENCH_TENANT, name))
+    return ws
+
+
+def cleanup(workspaces: Sequence[str]) -> None:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        with conn.transaction():
+            docs = [r[0] for r in conn.execute("SELECT id FROM documents WHERE playground_id = ANY(%s)", (list(workspaces),))]
+            conn.execute("DELETE FROM chunks WHERE doc_id = ANY(%s)", (docs,))
+            conn.execute("DELETE FROM playground_docs WHERE pg_id = ANY(%s)", (list(workspaces),))
+            conn.execute("UPDATE documents SET latest_version_id = NULL WHERE id = ANY(%s)", (docs,))
+            conn.execute("DELETE FROM document_versions WHERE document_id = ANY(%s)", (docs,))
+            conn.execute("DELETE FROM documents WHERE id = ANY(%s)", (docs,))
+            conn.execute("DELETE FROM jobs WHERE payload->>'workspace_id' = ANY(%s)", (list(workspaces),))
+            conn.execute("DELETE FROM playgrounds WHERE id = ANY(%s)", (list(workspaces),))
+
+
+def environment() -> Dict[str, Any]:
+    from backend.app.db.connection import get_conn
+    from backend.app.services import chunking, embeddings, openai_client
+
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    with get_conn() as conn:
+        pg = conn.execute("SHOW server_version").fetchone()[0]
+        row = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()
+    return {
+        "git_rev": rev or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "postgres": pg,
+        "pgvector": row[0] if row else None,
+        "embedding_backend": embeddings.EMBEDDING_BACKEND,
+        "openai_rate_limit_rps": openai_client.OPENAI_RATE_LIMIT_RPS,
+        "tokenizer": "tiktoken:" + chunking.CHUNK_TOKENIZER if chunking._encoding() else "approx",
+    }
+
+
+# ---------- Load generation ----------
+
+async def run_load(
+    request: Callable[[int], Awaitable[Any]],
+    n: int,
+    concurrency: int,
+    check: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
+    """Runs request(i) for i < n, `concurrency` at a time; failures count as errors, not latencies."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                resp = await request(i)
+                resp.raise_for_status()
+                if check is not None:
+                    check(resp)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return summarize(latencies, errors, time.perf_counter() - t0)
+
+
+def _client(base_url: Optional[str]):
+    import httpx
+
+    timeout = httpx.Timeout(300.0)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout)
+    from backend.app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+
+
+# ---------- Stages ----------
+
+def stage_micro(args, blocks: Sequence[str], workspaces: List[str]) -> Dict[str, Any]:
+    from backend.app.routes.synth import _parse_numbered_list
+    from backend.app.services import chunking, documents_service, extraction
+
+    rng = random.Random(args.seed)
+    out: Dict[str, Any] = {}
+
+    outlines = []
+    for _ in range(200):
+        n = rng.randint(3, 20)
+        noise = "Here is the outline you asked for:\n\n" if rng.random() < 0.5 else ""
+        outlines.append(noise + "\n".join(f"{i}{rng.choice('.)')} {rng.choice(blocks)[:60]}" for i in range(1, n + 1)))
+    out["parse_numbered_list"] = summarize(
+        [_timed(lambda t=t: _parse_numbered_list(t)) for _ in range(args.repeat) for t in outlines]
+    )
+
+    files = sorted(glob.glob(os.path.join(ROOT, "testdata", "*")))
+    extract_ms, chunk_ms, pages_by_file = [], [], {}
+    for _ in range(args.repeat):
+        for path in files:
+            kind = os.path.splitext(path)[1].lstrip(".")
+            extract_ms.append(_timed(lambda: pages_by_file.__setitem__(path, extraction.extract_pages(path, kind))))
+    for _ in range(args.repeat):
+        for pages in pages_by_file.values():
+            chunk_ms.append(_timed(lambda: sum(1 for _ in chunking.iter_chunks(pages, args.chunk_size, args.overlap))))
+    out["extract_pages"] = summarize(extract_ms)
+    out["iter_chunks"] = summarize(chunk_ms)
+
+    ws = create_workspace("bench-micro")
+    workspaces.append(ws)
+    create_ms, errors = [], 0
+    for i in range(args.micro_docs):
+        data = synthetic_doc(blocks, i, args.doc_blocks, rng)
+        fd, spool = tempfile.mkstemp(prefix="bench-", suffix=".part", dir=documents_service.DOCUMENT_STORAGE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        sha = documents_service._sha256_bytes(data)
+        t0 = time.perf_counter()
+        created = documents_service.create_document_and_version_from_path(ws, f"micro {i}", spool, sha, "txt")
+        if created is None:
+            errors += 1
+        else:
+            create_ms.append((time.perf_counter() - t0) * 1000)
+    out["create_document_and_version"] = summarize(create_ms, errors)
+    return out
+
+
+def _drain(index: int) -> None:
+    """Worker process: runs jobs until the queue stays empty."""
+    from backend.app import worker
+    from backend.app.services import events_service
+
+    idle = 0
+    while idle < 5:
+        if worker.run_one(f"bench-{os.getpid()}-{index}"):
+            idle = 0
+        else:
+            idle += 1
+            time.sleep(0.2)
+    events_service.buffer.close()
+
+
+def _wait_for_jobs(ws: str, timeout_s: float) -> None:
+    from backend.app.db.connection import get_conn
+
+    deadline = time.monotonic() + timeout_s
+    sql = "SELECT count(*) FROM jobs WHERE payload->>'workspace_id' = %s AND status IN ('queued', 'running')"
+    while time.monotonic() < deadline:
+        with get_conn() as conn:
+            if conn.execute(sql, (ws,)).fetchone()[0] == 0:
+                return
+        time.sleep(1.0)
+
+
+async def stage_ingest(args, blocks: Sequence[str], client, workspaces: List[str]) -> Dict[str, Any]:
+    from backend.app.db.connection import get_conn
+
+    ws = create_workspace("bench-ingest")
+    workspaces.append(ws)
+    rng = random.Random(args.seed + 1)
+    docs = [synthetic_doc(blocks, i, args.doc_blocks, rng) for i in range(args.docs)]
+
+    async def upload(i: int):
+        return await client.post(
+            f"/workspaces/{ws}/documents:upload", params={"filename": f"synthetic-{i:06d}.txt"}, content=docs[i],
+        )
+
+    uploads = await run_load(upload, len(docs), args.concurrency)
+
+    t0 = time.perf_counter()
+    if args.workers > 0:
+        ctx = mp.get_context("spawn")
+        procs = [ctx.Process(target=_drain, args=(i,)) for i in range(args.workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+    else:
+        await asyncio.to_thread(_wait_for_jobs, ws, args.timeout)
+    index_s = time.perf_counter() - t0
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT status,
+                   extract(epoch FROM finished_at - created_at) * 1000,
+                   (result->>'elapsed_ms')::float
+            FROM jobs WHERE kind = 'ingest_document' AND payload->>'workspace_id' = %s
+            """,
+            (ws,),
+        ).fetchall()
+        chunks = conn.execute(
+            "SELECT count(*) FROM chunks c JOIN playground_docs pd ON pd.doc_id = c.doc_id WHERE pd.pg_id = %s", (ws,)
+        ).fetchone()[0]
+    done = [r for r in rows if r[0] == "succeeded"]
+    total_s = (uploads.get("elapsed_s") or 0) + index_s
+    return {
+        "workspace_id": ws,
+        "docs": len(docs),
+        "bytes": sum(len(d) for d in docs),
+        "chunks": chunks,
+        "upload": uploads,
+        "job_end_to_end": summarize([float(r[1]) for r in done], len(rows) - len(done), index_s),
+        "job_run": summarize([float(r[2]) for r in done]),
+        "index_s": round(index_s, 3),
+        "docs_per_s": round(len(done) / total_s, 2) if total_s else 0.0,
+    }
+
+
+async def stage_query(args, blocks: Sequence[str], client, ws: str) -> Dict[str, Any]:
+    from backend.app.db.connection import get_async_conn
+    from backend.app.services import embeddings, retrieval
+
+    rng = random.Random(args.seed + 2)
+    questions = make_questions(blocks, args.requests, rng)
+    out: Dict[str, Any] = {}
+
+    async with get_async_conn() as conn:
+        doc_ids = await retrieval.scope_doc_ids(conn, ws)
+        vec_ms, lex_ms = [], []
+        sample = questions[: min(len(questions), args.micro_queries)]
+        vectors = await embeddings.embed_texts(sample)
+        for q, v in zip(sample, vectors):
+            t0 = time.perf_counter()
+            await retrieval.search_vectors(conn, doc_ids, v, args.top_k)
+            vec_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            await retrieval.lexical_search(conn, doc_ids, q, args.top_k)
+            lex_ms.append((time.perf_counter() - t0) * 1000)
+    out["scope_docs"] = len(doc_ids)
+    out["vector_search"] = summarize(vec_ms)
+    out["lexical_search"] = summarize(lex_ms)
+
+    cache_hits = 0
+
+    def check(resp) -> None:
+        nonlocal cache_hits
+        cache_hits += resp.json().get("timings", {}).get("cache") == "hit"
+
+    async def query(i: int):
+        return await client.post(f"/workspaces/{ws}/query", json={"question": questions[i], "top_k": args.top_k})
+
+    out["http_query"] = await run_load(query, len(questions), args.concurrency, check)
+    out["http_query"]["cache_hits"] = cache_hits
+    return out
+
+
+async def stage_synth(args, blocks: Sequence[str], client) -> Dict[str, Any]:
+    rng = random.Random(args.seed + 3)
+    topics = [" ".join(rng.sample(_WORD_RE.findall(rng.choice(blocks)) or ["retail", "store", "report"], 3)) for _ in range(args.requests)]
+
+    async def synth(i: int):
+        return await client.post("/synth/document", json={
+            "topic": f"Report on {topics[i]} ({i})", "num_sections": args.sections, "use_cache": args.synth_cache,
+        })
+
+    return {"http_synth": await run_load(synth, len(topics), args.concurrency)}
+
+
+async def run(args) -> Dict[str, Any]:
+    blocks = load_blocks(args.glob)
+    if not blocks:
+        raise SystemExit(f"no seed text matches {args.glob}")
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    results: Dict[str, Any] = {}
+    workspaces: List[str] = []
+    ws = args.workspace
+    started = datetime.now(timezone.utc).isoformat()
+    client = _client(args.base_url)
+    try:
+        if "micro" in stages:
+            results["micro"] = await asyncio.to_thread(stage_micro, args, blocks, workspaces)
+        if "ingest" in stages:
+            results["ingest"] = await stage_ingest(args, blocks, client, workspaces)
+            ws = results["ingest"]["workspace_id"]
+        if "query" in stages:
+            if not ws:
+                raise SystemExit("the query stage needs the ingest stage or --workspace")
+            results["query"] = await stage_query(args, blocks, client, ws)
+        if "synth" in stages:
+            results["synth"] = await stage_synth(args, blocks, client)
+    finally:
+        await client.aclose()
+        if workspaces and not args.keep:
+            cleanup(workspaces)
+    return {
+        "bench": "suite",
+        "format_version": FORMAT_VERSION,
+        "started_at": started,
+        "env": environment(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "results": results,
+    }
+
+
+# ---------- Comparison ----------
+
+_LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+_HIGHER_IS_BETTER = ("throughput_per_s", "docs_per_s")
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool) and k in _LOWER_IS_BETTER + _HIGHER_IS_BETTER:
+            out[key] = float(v)
+    return out
+
+
+def compare(base: Dict[str, Any], cur: Dict[str, Any], threshold_pct: float) -> int:
+    """Prints metric deltas between two result files; returns the number of regressions."""
+    a, b = _flatten(base["results"]), _flatten(cur["results"])
+    regressions = 0
+    print(f"{'metric':<48} {'base':>12} {'current':>12} {'delta':>9}")
+    for key in sorted(a.keys() & b.keys()):
+        old, new = a[key], b[key]
+        delta = (new - old) / old * 100 if old else 0.0
+        worse = delta > threshold_pct if key.endswith(_LOWER_IS_BETTER) else -delta > threshold_pct
+        regressions += worse
+        print(f"{key:<48} {old:>12.3f} {new:>12.3f} {delta:>+8.1f}%{'  REGRESSION' if worse else ''}")
+    print(f"{regressions} regression(s) over {threshold_pct:g}%")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stages", default="micro,ingest,query,synth")
+    ap.add_argument("--glob", default=os.path.join(ROOT, "testdata", "*.txt"), help="seed corpus")
+    ap.add_argument("--docs", type=int, default=10000, help="synthetic documents to ingest")
+    ap.add_argument("--doc-blocks", type=int, default=12, help="seed blocks per synthetic document")
+    ap.add_argument("--micro-docs", type=int, default=50)
+    ap.add_argument("--micro-queries", type=int, default=100)
+    ap.add_argument("--requests", type=int, default=500, help="HTTP requests per load stage")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--workers", type=int, default=4, help="worker processes for ingestion; 0 = external")
+    ap.add_argument("--timeout", type=float, default=3600, help="seconds to wait for external workers")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--chunk-size", type=int, default=512)
+    ap.add_argument("--overlap", type=int, default=64)
+    ap.add_argument("--top-k", type=int, default=8)
+    ap.add_argument("--sections", type=int, default=5)
+    ap.add_argument("--synth-cache", action="store_true", help="let /synth/document use its cache")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    ap.add_argument("--workspace", help="existing workspace for the query stage")
+    ap.add_argument("--no-stub", action="store_true", help="use the configured provider instead of stub_openai")
+    ap.add_argument("--stub-port", type=int, default=8099)
+    ap.add_argument("--stub-latency-ms", type=float, default=50.0)
+    ap.add_argument("--keep", action="store_true", help="keep the benchmark workspaces and documents")
+    ap.add_argument("--out", help="also write the JSON result here")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "CURRENT"), help="diff two result files and exit")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent for --compare")
+    args = ap.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f0, open(args.compare[1]) as f1:
+            raise SystemExit(1 if compare(json.load(f0), json.load(f1), args.threshold) else 0)
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is not set")
+
+    stub = None
+    if not args.no_stub:
+        stub = start_stub(args.stub_port, args.stub_latency_ms)
+        # Set before the app is imported: provider settings are read at import time.
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/v1"
+        os.environ.setdefault("EMBEDDING_BACKEND", "openai")
+        # The client-side token bucket (8 rps by default) would otherwise be what gets measured.
+        os.environ.setdefault("OPENAI_RATE_LIMIT_RPS", "0")
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+    raw = json.dumps(result, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(raw + "\n")
+    print(raw)
+
+
+if __name__ == "__main__":
+    main()
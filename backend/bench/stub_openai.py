@@ -0,0 +1,171 @@
+"""
+Local stand-in for the OpenAI HTTP API, for offline testing and benchmarks.
+
+    python -m backend.bench.stub_openai --port 8099 --latency-ms 200 --rate-limit-every 5
+
+Then run the backend with:
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8099/v1
+
+Endpoints:
+    POST /v1/chat/completions   canned markdown (numbered list when asked for an outline);
+                                honours "stream": true with SSE chunk deltas
+    POST /v1/embeddings         deterministic pseudo-random unit vectors per input text
+    GET  /stats                 request/429/500 counters
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+_lock = threading.Lock()
+STATS: Dict[str, int] = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+
+def _chat_text(prompt: str) -> str:
+    m = re.search(r"exactly (\d+) main sections", prompt)
+    if m:
+        return "\n".join(f"{i}. Stub Section {i}" for i in range(1, int(m.group(1)) + 1))
+    return (
+        "Stub provider output.\n\n"
+        "- Point one with a realistic figure (42%)\n"
+        "- Point two with a date (2024-05-01)\n\n"
+        "| Key | Value |\n| --- | --- |\n| Owner | Stub |\n"
+    )
+
+
+def _embedding(text: str, dim: int) -> list:
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    v = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [round(x / norm, 6) for x in v]
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "StubOpenAI/0.1"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # quiet
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] | None = None) -> None:
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _send_stream(self, model: str, text: str, token_delay: float) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for word in re.findall(r"\S+\s*", text):
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            with _lock:
+                self._send_json(200, dict(STATS))
+            return
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        cfg = self.server.cfg  # type: ignore[attr-defined]
+
+        with _lock:
+            STATS["requests"] += 1
+            n = STATS["requests"]
+        if cfg.rate_limit_every and n % cfg.rate_limit_every == 0:
+            with _lock:
+                STATS["rate_limited"] += 1
+            self._send_json(429, {"error": {"message": "rate limited"}}, {"Retry-After": str(cfg.retry_after)})
+            return
+        if cfg.fail_rate and random.random() < cfg.fail_rate:
+            with _lock:
+                STATS["errors"] += 1
+            self._send_json(500, {"error": {"message": "injected failure"}})
+            return
+
+        time.sleep(cfg.latency_ms / 1000.0)
+
+        if self.path.endswith("/chat/completions"):
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+            text = _chat_text(prompt)
+            if payload.get("stream"):
+                self._send_stream(payload.get("model", "stub"), text, cfg.token_delay_ms / 1000.0)
+                return
+            self._send_json(200, {
+                "id": f"stub-{n}",
+                "object": "chat.completion",
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split())},
+            })
+            return
+        if self.path.endswith("/embeddings"):
+            inputs = payload.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dim = int(payload.get("dimensions") or 1536)
+            self._send_json(200, {
+                "object": "list",
+                "model": payload.get("model", "stub"),
+                "data": [{"object": "embedding", "index": i, "embedding": _embedding(t, dim)} for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": sum(len(t.split()) for t in inputs)},
+            })
+            return
+        self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connection bursts under load tests (1 s SYN retries).
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve(host: str, port: int, cfg: argparse.Namespace) -> ThreadingHTTPServer:
+    httpd = _Server((host, port), Handler)
+    httpd.cfg = cfg  # type: ignore[attr-defined]
+    return httpd
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency-ms", type=float, default=100.0)
+    ap.add_argument("--token-delay-ms", type=float, default=5.0, help="delay between streamed deltas")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    ap.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    cfg = ap.parse_args()
+    httpd = serve(cfg.host, cfg.port, cfg)
+    print(f"stub OpenAI listening on http://{cfg.host}:{cfg.port}/v1")
+    httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
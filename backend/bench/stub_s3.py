@@ -0,0 +1,96 @@
+"""
+In-process stand-in for an S3 / MinIO bucket, for offline testing.
+
+    from backend.app.services import blob_store
+    from backend.bench.stub_s3 import StubS3Client
+
+    store = blob_store.S3BlobStore("bucket", "blobs/", client=StubS3Client())
+
+Implements the boto3 client calls S3BlobStore makes (head_object,
+upload_file, get_object, delete_object, generate_presigned_url and the
+list_objects_v2 paginator), keeping objects in memory. Missing keys raise
+ClientError with the codes S3 uses.
+"""
+from __future__ import annotations
+
+import io
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Tuple
+from urllib.parse import quote
+
+
+class ClientError(Exception):
+    """Shaped like botocore.exceptions.ClientError: the error code is in response["Error"]["Code"]."""
+
+    def __init__(self, code: str, operation: str):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation")
+        self.response = {"Error": {"Code": code}}
+
+
+class _Exceptions:
+    ClientError = ClientError
+
+
+class _Paginator:
+    def __init__(self, client: "StubS3Client", page_size: int):
+        self._client = client
+        self._page_size = page_size
+
+    def paginate(self, Bucket: str, Prefix: str = "") -> Iterator[Dict[str, Any]]:
+        with self._client._lock:
+            keys = sorted(k for b, k in self._client.objects if b == Bucket and k.startswith(Prefix))
+            items = [(k, self._client.objects[(Bucket, k)][1]) for k in keys]
+        for i in range(0, len(items), self._page_size):
+            yield {"Contents": [{"Key": k, "LastModified": ts} for k, ts in items[i:i + self._page_size]]}
+        if not items:
+            yield {}
+
+
+class StubS3Client:
+    exceptions = _Exceptions
+
+    def __init__(self, page_size: int = 1000):
+        self.objects: Dict[Tuple[str, str], Tuple[bytes, datetime]] = {}
+        self.calls: Dict[str, int] = {}
+        self._page_size = page_size
+        self._lock = threading.Lock()
+
+    def _get(self, bucket: str, key: str, operation: str) -> Tuple[bytes, datetime]:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        with self._lock:
+            obj = self.objects.get((bucket, key))
+        if obj is None:
+            # HeadObject has no body, so S3 only reports the status code there.
+            raise ClientError("404" if operation == "HeadObject" else "NoSuchKey", operation)
+        return obj
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        body, ts = self._get(Bucket, Key, "HeadObject")
+        return {"ContentLength": len(body), "LastModified": ts}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str) -> None:
+        self.calls["PutObject"] = self.calls.get("PutObject", 0) + 1
+        with open(Filename, "rb") as f:
+            body = f.read()
+        with self._lock:
+            self.objects[(Bucket, Key)] = (body, datetime.now(timezone.utc))
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        body, ts = self._get(Bucket, Key, "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "LastModified": ts}
+
+    def delete_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        # Like S3, deleting a missing key succeeds.
+        self.calls["DeleteObject"] = self.calls.get("DeleteObject", 0) + 1
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, str], ExpiresIn: int = 3600) -> str:
+        return f"http://stub-s3.local/{Params['Bucket']}/{quote(Params['Key'])}?X-Amz-Expires={ExpiresIn}"
+
+    def get_paginator(self, operation_name: str) -> _Paginator:
+        if operation_name != "list_objects_v2":
+            raise NotImplementedError(operation_name)
+        return _Paginator(self, self._page_size)
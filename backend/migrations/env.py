@@ -11,7 +11,8 @@ if config.config_file_name is not None:
 # Pull DATABASE_URL from environment (docker-compose passes it via .env)
 db_url = os.getenv("DATABASE_URL")
 if db_url:
-    config.set_main_option("sqlalchemy.url", db_url)
+    # ConfigParser treats "%" as interpolation; URLs carry it in escapes (e.g. ?host=%2Ftmp).
+    config.set_main_option("sqlalchemy.url", db_url.replace("%", "%%"))
 
 target_metadata = None  # we’re using explicit SQL, not autogenerate
 
@@ -0,0 +1,99 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002_documents_versions"
+down_revision = "001_initial_core"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- The application addresses playgrounds and documents by `id`, scopes a
+    -- document to the playground it was uploaded to, and keeps hash, file and
+    -- pages per version (services/documents_service.py). Reshape the 001
+    -- tables to match; the foreign keys from chunks and playground_docs
+    -- follow the renamed columns.
+    DO $$
+    BEGIN
+      IF EXISTS (SELECT 1 FROM information_schema.columns
+                 WHERE table_schema = current_schema() AND table_name = 'playgrounds' AND column_name = 'pg_id') THEN
+        ALTER TABLE playgrounds RENAME COLUMN pg_id TO id;
+      END IF;
+      IF EXISTS (SELECT 1 FROM information_schema.columns
+                 WHERE table_schema = current_schema() AND table_name = 'documents' AND column_name = 'doc_id') THEN
+        ALTER TABLE documents RENAME COLUMN doc_id TO id;
+        ALTER TABLE documents RENAME COLUMN filename TO title;
+        ALTER TABLE documents RENAME COLUMN uploaded_at TO created_at;
+      END IF;
+    END $$;
+
+    ALTER TABLE documents
+      ADD COLUMN IF NOT EXISTS playground_id     TEXT REFERENCES playgrounds(id) ON DELETE CASCADE,
+      ADD COLUMN IF NOT EXISTS kind              TEXT,
+      -- Written in the same transaction as the version row it names.
+      ADD COLUMN IF NOT EXISTS latest_version_id TEXT;
+    CREATE INDEX IF NOT EXISTS idx_documents_playground ON documents (playground_id);
+
+    CREATE TABLE IF NOT EXISTS document_versions (
+      id          TEXT PRIMARY KEY,
+      document_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+      sha256      TEXT,
+      bytes_url   TEXT,
+      pages_json  JSONB,
+      page_count  INT,
+      created_at  TIMESTAMPTZ DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS idx_document_versions_document ON document_versions (document_id, created_at);
+
+    -- Rows written with the 001 layout: attach each to a playground it was
+    -- shared into (its tenant follows from there), keep its mime as kind and
+    -- move its hash and page count into a first version. A document that was
+    -- never shared into a playground loses its tenant; tags stay as they were.
+    DO $$
+    BEGIN
+      IF EXISTS (SELECT 1 FROM information_schema.columns
+                 WHERE table_schema = current_schema() AND table_name = 'documents' AND column_name = 'file_hash') THEN
+        UPDATE documents d
+           SET playground_id = (SELECT min(pd.pg_id) FROM playground_docs pd WHERE pd.doc_id = d.id)
+         WHERE d.playground_id IS NULL;
+        UPDATE documents SET kind = mime WHERE kind IS NULL;
+        INSERT INTO document_versions (id, document_id, sha256, page_count, created_at)
+        SELECT gen_random_uuid()::text, d.id, d.file_hash, d.page_count, d.created_at
+        FROM documents d WHERE d.latest_version_id IS NULL;
+        UPDATE documents d SET latest_version_id = v.id
+          FROM document_versions v
+         WHERE v.document_id = d.id AND d.latest_version_id IS NULL;
+        ALTER TABLE documents
+          DROP COLUMN tenant_id,
+          DROP COLUMN mime,
+          DROP COLUMN file_hash,
+          DROP COLUMN page_count;
+      END IF;
+    END $$;
+    """)
+
+def downgrade():
+    # Lossy: only each document's latest version survives, as file_hash and page_count.
+    op.execute("""
+    ALTER TABLE documents
+      ADD COLUMN IF NOT EXISTS tenant_id  TEXT REFERENCES tenants(tenant_id) ON DELETE CASCADE,
+      ADD COLUMN IF NOT EXISTS mime       TEXT,
+      ADD COLUMN IF NOT EXISTS file_hash  TEXT,
+      ADD COLUMN IF NOT EXISTS page_count INT DEFAULT 0,
+      ADD COLUMN IF NOT EXISTS tags       JSONB DEFAULT '{}'::jsonb;
+    UPDATE documents d SET tenant_id = p.tenant_id FROM playgrounds p WHERE p.id = d.playground_id;
+    UPDATE documents d SET file_hash = v.sha256, page_count = coalesce(v.page_count, 0)
+      FROM document_versions v WHERE v.id = d.latest_version_id;
+    UPDATE documents SET mime = coalesce(kind, 'application/octet-stream'), file_hash = coalesce(file_hash, '');
+
+    DROP TABLE IF EXISTS document_versions;
+    DROP INDEX IF EXISTS idx_documents_playground;
+    ALTER TABLE documents
+      DROP COLUMN IF EXISTS latest_version_id,
+      DROP COLUMN IF EXISTS kind,
+      DROP COLUMN IF EXISTS playground_id;
+    ALTER TABLE documents RENAME COLUMN created_at TO uploaded_at;
+    ALTER TABLE documents RENAME COLUMN title TO filename;
+    ALTER TABLE documents RENAME COLUMN id TO doc_id;
+    ALTER TABLE playgrounds RENAME COLUMN id TO pg_id;
+    """)
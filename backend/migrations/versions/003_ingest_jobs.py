@@ -0,0 +1,43 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003_ingest_jobs"
+down_revision = "002_documents_versions"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Background work queue; workers claim rows with FOR UPDATE SKIP LOCKED.
+    CREATE TABLE IF NOT EXISTS jobs (
+      job_id       TEXT PRIMARY KEY,
+      kind         TEXT NOT NULL,
+      payload      JSONB NOT NULL DEFAULT '{}'::jsonb,
+      status       TEXT NOT NULL DEFAULT 'queued',  -- queued | running | succeeded | failed
+      attempts     INT  NOT NULL DEFAULT 0,
+      max_attempts INT  NOT NULL DEFAULT 5,
+      run_after    TIMESTAMPTZ NOT NULL DEFAULT now(),
+      locked_by    TEXT,
+      locked_at    TIMESTAMPTZ,
+      stage        TEXT,
+      progress     JSONB NOT NULL DEFAULT '{}'::jsonb,
+      result       JSONB,
+      error        TEXT,
+      created_at   TIMESTAMPTZ DEFAULT now(),
+      updated_at   TIMESTAMPTZ DEFAULT now(),
+      finished_at  TIMESTAMPTZ
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready
+      ON jobs (run_after) WHERE status = 'queued';
+
+    CREATE INDEX IF NOT EXISTS idx_jobs_running
+      ON jobs (locked_at) WHERE status = 'running';
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP INDEX IF EXISTS idx_jobs_running;
+    DROP INDEX IF EXISTS idx_jobs_ready;
+    DROP TABLE IF EXISTS jobs;
+    """)
@@ -0,0 +1,28 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004_embedding_cache"
+down_revision = "003_ingest_jobs"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Vectors keyed by normalized chunk text, so re-chunks and re-uploads reuse them
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+      model      TEXT NOT NULL,
+      text_hash  TEXT NOT NULL,
+      vec        vector(1536) NOT NULL,
+      created_at TIMESTAMPTZ DEFAULT now(),
+      PRIMARY KEY (model, text_hash)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_chunk_vectors_doc
+      ON chunk_vectors (doc_id);
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP INDEX IF EXISTS idx_chunk_vectors_doc;
+    DROP TABLE IF EXISTS embedding_cache;
+    """)
@@ -0,0 +1,28 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "005_chunks_fts"
+down_revision = "004_embedding_cache"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Full-text index for the lexical half of hybrid search (retrieval.FTS_CONFIG)
+    ALTER TABLE chunks
+      ADD COLUMN IF NOT EXISTS tsv tsvector
+      GENERATED ALWAYS AS (to_tsvector('english', text)) STORED;
+
+    CREATE INDEX IF NOT EXISTS idx_chunks_tsv
+      ON chunks USING gin (tsv);
+
+    CREATE INDEX IF NOT EXISTS idx_chunks_doc
+      ON chunks (doc_id);
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP INDEX IF EXISTS idx_chunks_doc;
+    DROP INDEX IF EXISTS idx_chunks_tsv;
+    ALTER TABLE chunks DROP COLUMN IF EXISTS tsv;
+    """)
@@ -0,0 +1,79 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "006_corpus_versions"
+down_revision = "005_chunks_fts"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Bumped whenever what a playground can retrieve changes; query caches key on it
+    CREATE TABLE IF NOT EXISTS playground_corpus_versions (
+      pg_id      TEXT PRIMARY KEY,
+      version    BIGINT NOT NULL DEFAULT 1,
+      updated_at TIMESTAMPTZ DEFAULT now()
+    );
+
+    CREATE OR REPLACE FUNCTION bump_corpus_versions(pg_ids TEXT[]) RETURNS void AS $$
+      INSERT INTO playground_corpus_versions AS v (pg_id, version)
+      SELECT DISTINCT unnest(pg_ids), 1
+      ON CONFLICT (pg_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+    $$ LANGUAGE sql;
+
+    -- Statement-level with transition tables: one bump per COPY/DELETE, not per row.
+    CREATE OR REPLACE FUNCTION playground_docs_bump() RETURNS trigger AS $$
+    BEGIN
+      IF TG_OP = 'DELETE' THEN
+        PERFORM bump_corpus_versions(ARRAY(SELECT DISTINCT pg_id FROM old_rows));
+      ELSE
+        PERFORM bump_corpus_versions(ARRAY(SELECT DISTINCT pg_id FROM new_rows));
+      END IF;
+      RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION doc_content_bump() RETURNS trigger AS $$
+    BEGIN
+      IF TG_OP = 'DELETE' THEN
+        PERFORM bump_corpus_versions(ARRAY(
+          SELECT DISTINCT pd.pg_id FROM playground_docs pd
+          WHERE pd.doc_id IN (SELECT DISTINCT doc_id FROM old_rows)));
+      ELSE
+        PERFORM bump_corpus_versions(ARRAY(
+          SELECT DISTINCT pd.pg_id FROM playground_docs pd
+          WHERE pd.doc_id IN (SELECT DISTINCT doc_id FROM new_rows)));
+      END IF;
+      RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_playground_docs_ins ON playground_docs;
+    CREATE TRIGGER trg_playground_docs_ins AFTER INSERT ON playground_docs
+      REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION playground_docs_bump();
+    DROP TRIGGER IF EXISTS trg_playground_docs_del ON playground_docs;
+    CREATE TRIGGER trg_playground_docs_del AFTER DELETE ON playground_docs
+      REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION playground_docs_bump();
+
+    DROP TRIGGER IF EXISTS trg_chunks_ins ON chunks;
+    CREATE TRIGGER trg_chunks_ins AFTER INSERT ON chunks
+      REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION doc_content_bump();
+    DROP TRIGGER IF EXISTS trg_chunks_del ON chunks;
+    CREATE TRIGGER trg_chunks_del AFTER DELETE ON chunks
+      REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION doc_content_bump();
+
+    DROP TRIGGER IF EXISTS trg_chunk_vectors_ins ON chunk_vectors;
+    CREATE TRIGGER trg_chunk_vectors_ins AFTER INSERT ON chunk_vectors
+      REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION doc_content_bump();
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP TRIGGER IF EXISTS trg_chunk_vectors_ins ON chunk_vectors;
+    DROP TRIGGER IF EXISTS trg_chunks_del ON chunks;
+    DROP TRIGGER IF EXISTS trg_chunks_ins ON chunks;
+    DROP TRIGGER IF EXISTS trg_playground_docs_del ON playground_docs;
+    DROP TRIGGER IF EXISTS trg_playground_docs_ins ON playground_docs;
+    DROP FUNCTION IF EXISTS doc_content_bump();
+    DROP FUNCTION IF EXISTS playground_docs_bump();
+    DROP FUNCTION IF EXISTS bump_corpus_versions(TEXT[]);
+    DROP TABLE IF EXISTS playground_corpus_versions;
+    """)
@@ -0,0 +1,101 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "007_events_partitioned"
+down_revision = "006_corpus_versions"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Keep rows from an unpartitioned events table created before this migration
+    DO $$
+    BEGIN
+      IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'events' AND relkind = 'r'
+                 AND relnamespace = current_schema()::regnamespace) THEN
+        ALTER TABLE events RENAME TO events_legacy;
+      END IF;
+    END $$;
+
+    CREATE SEQUENCE IF NOT EXISTS events_event_id_seq;
+
+    -- Audit trail, range-partitioned by month so retention is a DROP TABLE
+    CREATE TABLE IF NOT EXISTS events (
+      event_id      BIGINT NOT NULL DEFAULT nextval('events_event_id_seq'),
+      playground_id TEXT NOT NULL,
+      kind          TEXT NOT NULL,
+      actor         TEXT NOT NULL,
+      payload       JSONB,
+      created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+      PRIMARY KEY (created_at, event_id)
+    ) PARTITION BY RANGE (created_at);
+
+    ALTER SEQUENCE events_event_id_seq OWNED BY events.event_id;
+
+    -- Keyset pagination: WHERE playground_id = ? AND (created_at, event_id) < (?, ?)
+    CREATE INDEX IF NOT EXISTS idx_events_playground_keyset
+      ON events (playground_id, created_at DESC, event_id DESC);
+
+    -- Catches rows outside the pre-created months if maintenance falls behind
+    CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT;
+
+    CREATE OR REPLACE FUNCTION ensure_event_partitions(months_ahead INT DEFAULT 2) RETURNS INT AS $$
+    DECLARE
+      m DATE;
+      part TEXT;
+      created INT := 0;
+    BEGIN
+      FOR i IN 0..months_ahead LOOP
+        m := (date_trunc('month', now()) + make_interval(months => i))::date;
+        part := format('events_%s', to_char(m, 'YYYYMM'));
+        IF to_regclass(part) IS NULL THEN
+          BEGIN
+            EXECUTE format('CREATE TABLE %I PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+                           part, m, (m + interval '1 month')::date);
+            created := created + 1;
+          EXCEPTION WHEN others THEN
+            -- e.g. events_default already holds rows for this month
+            RAISE WARNING 'could not create partition %: %', part, SQLERRM;
+          END;
+        END IF;
+      END LOOP;
+      RETURN created;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION drop_event_partitions(keep INTERVAL) RETURNS INT AS $$
+    DECLARE
+      r RECORD;
+      dropped INT := 0;
+    BEGIN
+      FOR r IN
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'events'::regclass AND c.relname ~ '^events_[0-9]{6}$'
+      LOOP
+        IF to_date(substr(r.relname, 8), 'YYYYMM') + interval '1 month' <= now() - keep THEN
+          EXECUTE format('DROP TABLE %I', r.relname);
+          dropped := dropped + 1;
+        END IF;
+      END LOOP;
+      RETURN dropped;
+    END $$ LANGUAGE plpgsql;
+
+    SELECT ensure_event_partitions(2);
+
+    DO $$
+    BEGIN
+      IF to_regclass('events_legacy') IS NOT NULL THEN
+        INSERT INTO events (playground_id, kind, actor, payload, created_at)
+        SELECT l.playground_id, l.kind, l.actor, to_jsonb(l) -> 'payload',
+               COALESCE((to_jsonb(l) ->> 'created_at')::timestamptz, now())
+        FROM events_legacy l;
+        DROP TABLE events_legacy;
+      END IF;
+    END $$;
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP FUNCTION IF EXISTS drop_event_partitions(INTERVAL);
+    DROP FUNCTION IF EXISTS ensure_event_partitions(INT);
+    DROP TABLE IF EXISTS events;
+    """)
@@ -0,0 +1,20 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "008_job_parents"
+down_revision = "007_events_partitioned"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Child jobs (e.g. per-document indexing of a bulk import) by parent
+    CREATE INDEX IF NOT EXISTS idx_jobs_parent
+      ON jobs ((payload->>'parent_job_id'))
+      WHERE payload ? 'parent_job_id';
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP INDEX IF EXISTS idx_jobs_parent;
+    """)
@@ -0,0 +1,61 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "009_blobs"
+down_revision = "008_job_parents"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- One row per stored original (content-addressed by SHA-256), with the
+    -- number of document versions using it. Unreferenced blobs are garbage
+    -- collected once unreferenced_since is older than the GC grace period.
+    CREATE TABLE IF NOT EXISTS blobs (
+      sha256             TEXT PRIMARY KEY,
+      refcount           INTEGER NOT NULL DEFAULT 0,
+      created_at         TIMESTAMPTZ DEFAULT now(),
+      unreferenced_since TIMESTAMPTZ
+    );
+    CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced
+      ON blobs (unreferenced_since) WHERE refcount <= 0;
+
+    CREATE OR REPLACE FUNCTION blobs_ref() RETURNS trigger AS $$
+    BEGIN
+      IF TG_OP = 'DELETE' THEN
+        UPDATE blobs b
+           SET refcount = b.refcount - d.n,
+               unreferenced_since = CASE WHEN b.refcount - d.n <= 0 THEN now() END
+          FROM (SELECT sha256, count(*) AS n FROM old_rows WHERE sha256 IS NOT NULL GROUP BY sha256) d
+         WHERE b.sha256 = d.sha256;
+      ELSE
+        -- The upsert also locks the row, so gc() (FOR UPDATE SKIP LOCKED) cannot
+        -- delete a blob that a still-open transaction is about to reference.
+        INSERT INTO blobs AS b (sha256, refcount)
+        SELECT sha256, count(*) FROM new_rows WHERE sha256 IS NOT NULL GROUP BY sha256
+        ON CONFLICT (sha256) DO UPDATE
+          SET refcount = b.refcount + EXCLUDED.refcount, unreferenced_since = NULL;
+      END IF;
+      RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_document_versions_blob_ins ON document_versions;
+    CREATE TRIGGER trg_document_versions_blob_ins AFTER INSERT ON document_versions
+      REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION blobs_ref();
+    DROP TRIGGER IF EXISTS trg_document_versions_blob_del ON document_versions;
+    CREATE TRIGGER trg_document_versions_blob_del AFTER DELETE ON document_versions
+      REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION blobs_ref();
+
+    -- Existing versions; their files stay at bytes_url until re-uploaded
+    INSERT INTO blobs (sha256, refcount)
+    SELECT sha256, count(*) FROM document_versions WHERE sha256 IS NOT NULL GROUP BY sha256
+    ON CONFLICT (sha256) DO NOTHING;
+    """)
+
+def downgrade():
+    op.execute("""
+    DROP TRIGGER IF EXISTS trg_document_versions_blob_del ON document_versions;
+    DROP TRIGGER IF EXISTS trg_document_versions_blob_ins ON document_versions;
+    DROP FUNCTION IF EXISTS blobs_ref();
+    DROP TABLE IF EXISTS blobs;
+    """)
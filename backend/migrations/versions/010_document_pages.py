@@ -0,0 +1,82 @@
+import json
+import zlib
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "010_document_pages"
+down_revision = "009_blobs"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Extracted text, one row per page (see services/page_store.py). body is
+    -- the UTF-8 text compressed with `codec` ('zstd', 'zlib' or 'raw');
+    -- char_start is the page's offset in the document text (pages joined
+    -- with a newline), the same coordinates as chunks.char_span.
+    CREATE TABLE IF NOT EXISTS document_pages (
+      version_id  TEXT  NOT NULL REFERENCES document_versions(id) ON DELETE CASCADE,
+      page_no     INT   NOT NULL,
+      char_start  INT   NOT NULL,
+      char_len    INT   NOT NULL,
+      text_md5    BYTEA NOT NULL,
+      codec       TEXT  NOT NULL,
+      body        BYTEA NOT NULL,
+      PRIMARY KEY (version_id, page_no)
+    );
+    -- Bodies are compressed client-side; keep TOAST from trying again.
+    ALTER TABLE document_pages ALTER COLUMN body SET STORAGE EXTERNAL;
+    CREATE INDEX IF NOT EXISTS idx_document_pages_offset ON document_pages (version_id, char_start);
+    -- Rows still waiting for page_store.compact().
+    CREATE INDEX IF NOT EXISTS idx_document_pages_raw ON document_pages (version_id) WHERE codec = 'raw';
+
+    ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS page_count INT;
+
+    -- Existing versions: copy pages_json uncompressed; the worker
+    -- recompresses these rows in the background.
+    INSERT INTO document_pages (version_id, page_no, char_start, char_len, text_md5, codec, body)
+    SELECT p.id, p.page_no,
+           coalesce(sum(length(p.text) + 1) OVER (
+             PARTITION BY p.id ORDER BY p.ord ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ), 0),
+           length(p.text), decode(md5(p.text), 'hex'), 'raw', convert_to(p.text, 'UTF8')
+    FROM (
+      SELECT dv.id, e.ord, coalesce((e.page->>'page_no')::int, e.ord::int) AS page_no,
+             coalesce(e.page->>'text', '') AS text
+      FROM document_versions dv, jsonb_array_elements(dv.pages_json) WITH ORDINALITY AS e(page, ord)
+      WHERE jsonb_typeof(dv.pages_json) = 'array'
+    ) p
+    ON CONFLICT DO NOTHING;
+
+    UPDATE document_versions dv
+       SET page_count = (SELECT count(*) FROM document_pages p WHERE p.version_id = dv.id)
+     WHERE jsonb_typeof(dv.pages_json) = 'array';
+
+    ALTER TABLE document_versions DROP COLUMN IF EXISTS pages_json;
+    """)
+
+def _decode(codec, body):
+    body = bytes(body)
+    if codec == "zlib":
+        body = zlib.decompress(body)
+    elif codec == "zstd":
+        import zstandard
+        body = zstandard.ZstdDecompressor().decompress(body)
+    return body.decode("utf-8")
+
+def downgrade():
+    op.execute("ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS pages_json JSONB")
+    bind = op.get_bind()
+    rows = bind.exec_driver_sql(
+        "SELECT version_id, page_no, codec, body FROM document_pages ORDER BY version_id, page_no"
+    )
+    pages = {}
+    for version_id, page_no, codec, body in rows:
+        pages.setdefault(version_id, []).append({"page_no": page_no, "text": _decode(codec, body)})
+    for version_id, items in pages.items():
+        bind.exec_driver_sql(
+            "UPDATE document_versions SET pages_json = %s::jsonb WHERE id = %s", (json.dumps(items), version_id)
+        )
+    # page_count stays: 002 carries it over from the 001 layout.
+    op.execute("DROP TABLE IF EXISTS document_pages")
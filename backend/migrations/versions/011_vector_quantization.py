@@ -0,0 +1,52 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "011_vector_quantization"
+down_revision = "010_document_pages"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- Per-tenant settings. vector_quantization picks the HNSW index a
+    -- tenant's chunk vectors go into; full-precision vectors are always kept
+    -- in chunk_vectors.vec for exact re-scoring.
+    CREATE TABLE IF NOT EXISTS tenant_settings (
+      tenant_id           TEXT PRIMARY KEY,
+      vector_quantization TEXT NOT NULL DEFAULT 'none'
+                          CHECK (vector_quantization IN ('none', 'halfvec', 'binary')),
+      updated_at          TIMESTAMPTZ DEFAULT now()
+    );
+
+    ALTER TABLE chunk_vectors ADD COLUMN IF NOT EXISTS quantization TEXT NOT NULL DEFAULT 'none';
+    CREATE INDEX IF NOT EXISTS idx_chunk_vectors_tenant_quantization ON chunk_vectors (tenant_id, quantization);
+
+    -- One partial HNSW index per representation, so a row is in exactly one
+    -- graph. Replacing idx_chunk_vectors_hnsw rebuilds the float index once;
+    -- on a large install, create idx_chunk_vectors_hnsw_full CONCURRENTLY first.
+    CREATE INDEX IF NOT EXISTS idx_chunk_vectors_hnsw_full
+      ON chunk_vectors USING hnsw (vec vector_cosine_ops) WHERE quantization = 'none';
+    DROP INDEX IF EXISTS idx_chunk_vectors_hnsw;
+
+    -- halfvec and binary_quantize need pgvector 0.7.
+    DO $$
+    BEGIN
+      IF string_to_array((SELECT extversion FROM pg_extension WHERE extname = 'vector'), '.')::int[] >= ARRAY[0, 7] THEN
+        CREATE INDEX IF NOT EXISTS idx_chunk_vectors_hnsw_halfvec
+          ON chunk_vectors USING hnsw ((vec::halfvec(1536)) halfvec_cosine_ops) WHERE quantization = 'halfvec';
+        CREATE INDEX IF NOT EXISTS idx_chunk_vectors_hnsw_binary
+          ON chunk_vectors USING hnsw ((binary_quantize(vec)::bit(1536)) bit_hamming_ops) WHERE quantization = 'binary';
+      END IF;
+    END $$;
+    """)
+
+def downgrade():
+    op.execute("""
+    CREATE INDEX IF NOT EXISTS idx_chunk_vectors_hnsw ON chunk_vectors USING hnsw (vec vector_cosine_ops);
+    DROP INDEX IF EXISTS idx_chunk_vectors_hnsw_binary;
+    DROP INDEX IF EXISTS idx_chunk_vectors_hnsw_halfvec;
+    DROP INDEX IF EXISTS idx_chunk_vectors_hnsw_full;
+    DROP INDEX IF EXISTS idx_chunk_vectors_tenant_quantization;
+    ALTER TABLE chunk_vectors DROP COLUMN IF EXISTS quantization;
+    DROP TABLE IF EXISTS tenant_settings;
+    """)
@@ -0,0 +1,34 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "012_version_sha256_unique"
+down_revision = "011_vector_quantization"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+    -- A document holds each content hash at most once, so concurrent uploads
+    -- of the same bytes as a new version cannot both insert one
+    -- (documents_service.create_version_from_path: ON CONFLICT DO NOTHING).
+    -- Earlier duplicates are collapsed first, keeping the document's latest
+    -- version if it is one of them, else the oldest; their pages are equal.
+    DELETE FROM document_versions dv
+    USING (
+      SELECT v.id,
+             row_number() OVER (
+               PARTITION BY v.document_id, v.sha256
+               ORDER BY (v.id = d.latest_version_id) DESC, v.created_at, v.id
+             ) AS rn
+      FROM document_versions v
+      JOIN documents d ON d.id = v.document_id
+      WHERE v.sha256 IS NOT NULL
+    ) dup
+    WHERE dv.id = dup.id AND dup.rn > 1;
+
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_document_versions_document_sha256
+      ON document_versions (document_id, sha256);
+    """)
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_document_versions_document_sha256")
@@ -0,0 +1,124 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures.
+
+    TEST_DATABASE_URL=postgresql://... python -m pytest -q backend/tests
+
+Tests that need Postgres take the `database` fixture: it creates a scratch
+database on the TEST_DATABASE_URL server (DATABASE_URL if unset), migrates
+it to head with alembic and drops it at the end of the session. They are
+skipped when no server is configured or reachable. Everything else runs
+offline: no OpenAI key, local embeddings, temporary storage directories.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import psycopg
+import pytest
+from psycopg.conninfo import conninfo_to_dict
+
+ROOT = Path(__file__).resolve().parents[2]
+
+_ADMIN_URL = os.getenv("TEST_DATABASE_URL") or os.getenv("DATABASE_URL")
+_TEST_DB = f"fp_test_{os.getpid()}"
+
+
+def _url(dbname: str) -> str:
+    """_ADMIN_URL pointed at another database, as a URL alembic also accepts."""
+    from sqlalchemy.engine import URL
+
+    p = conninfo_to_dict(_ADMIN_URL)
+    host = p.get("host") or None
+    query = {}
+    if host and host.startswith("/"):
+        query["host"] = host
+        host = None
+    return URL.create(
+        "postgresql",
+        username=p.get("user"),
+        password=p.get("password") or None,
+        host=host,
+        port=int(p["port"]) if p.get("port") else None,
+        database=dbname,
+        query=query,
+    ).render_as_string(hide_password=False)
+
+
+# Settled before any backend module is imported: most read their settings at import time.
+_TMP = tempfile.mkdtemp(prefix="fp-tests-")
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["EMBEDDING_BACKEND"] = "local"
+os.environ["DOCUMENT_STORAGE_DIR"] = _TMP
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_TMP, "vector_index")
+os.environ["EVENTS_FLUSH_INTERVAL_S"] = os.getenv("EVENTS_FLUSH_INTERVAL_S", "0.05")
+if _ADMIN_URL:
+    os.environ["DATABASE_URL"] = _url(_TEST_DB)
+else:
+    os.environ.pop("DATABASE_URL", None)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _tmp_storage():
+    yield _TMP
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+def _admin_conn() -> psycopg.Connection:
+    return psycopg.connect(_ADMIN_URL, autocommit=True, connect_timeout=3)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """A freshly migrated scratch database; DATABASE_URL already points at it."""
+    if not _ADMIN_URL:
+        pytest.skip("TEST_DATABASE_URL / DATABASE_URL not set")
+    try:
+        with _admin_conn() as conn:
+            conn.execute(f"DROP DATABASE IF EXISTS {_TEST_DB}")
+            conn.execute(f"CREATE DATABASE {_TEST_DB}")
+    except psycopg.OperationalError as e:
+        pytest.skip(f"Postgres unavailable: {e}")
+
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ROOT / "backend" / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "backend" / "migrations"))
+    command.upgrade(cfg, "head")
+    yield os.environ["DATABASE_URL"]
+
+    from backend.app.db import connection
+
+    asyncio.run(connection.close_pools())
+    with _admin_conn() as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {_TEST_DB} WITH (FORCE)")
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    """TestClient with the app lifespan (pools, OpenAI client) running."""
+    from fastapi.testclient import TestClient
+
+    from backend.app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def run_jobs(database):
+    """Runs queued jobs in-process until the queue is empty; returns how many ran."""
+    from backend.app import worker
+
+    def run() -> int:
+        n = 0
+        while worker.run_one("pytest"):
+            n += 1
+        return n
+
+    return run
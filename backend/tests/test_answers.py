@@ -0,0 +1,29 @@
+# backend/tests/test_answers.py
+from __future__ import annotations
+
+import asyncio
+
+from backend.app.services import answers, openai_client
+
+HITS = [{"doc_id": "d1", "title": "Catalog", "page_start": 1, "text": "Widgets ship in blue and red."}]
+
+
+def test_answer_stream_uses_the_answer_payload(monkeypatch):
+    sent = []
+
+    async def fake_stream(path, payload):
+        sent.append((path, payload))
+        for event in ({"choices": [{"delta": {"role": "assistant"}}]},
+                      {"choices": [{"delta": {"content": "Blue "}}]},
+                      {"choices": []},
+                      {"choices": [{"delta": {"content": "and red [1]."}}]}):
+            yield event
+
+    monkeypatch.setattr(openai_client, "stream_json", fake_stream)
+
+    async def collect():
+        return [d async for d in answers.answer_openai_stream("Which colours?", HITS)]
+
+    assert asyncio.run(collect()) == ["Blue ", "and red [1]."]
+    assert sent == [("/chat/completions", answers.chat_payload("Which colours?", HITS))]
+    assert sent[0][1]["model"] == answers.ANSWER_MODEL
@@ -0,0 +1,102 @@
+# backend/tests/test_blob_gc.py
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+
+import psycopg
+import pytest
+
+
+@pytest.fixture
+def store(database, tmp_path):
+    from backend.app.services import blob_store
+
+    return blob_store.LocalBlobStore(str(tmp_path / "blobs"))
+
+
+def _spool(data: bytes) -> str:
+    from backend.app.services import documents_service
+
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=documents_service.DOCUMENT_STORAGE_DIR)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _stored(store, data: bytes) -> str:
+    sha = hashlib.sha256(data).hexdigest()
+    store.put_file(_spool(data), sha)
+    return sha
+
+
+def test_gc_keeps_an_object_an_open_upload_is_reusing(store):
+    from backend.app.services import blob_store
+
+    data = b"claimed while gc runs"
+    sha = _stored(store, data)  # its blobs row was just deleted by gc's first transaction
+
+    upload = psycopg.connect(os.environ["DATABASE_URL"])
+    try:
+        # The version insert's trigger recreates the row, then put_file finds the object.
+        upload.execute("INSERT INTO blobs (sha256, refcount) VALUES (%s, 1)", (sha,))
+        blob_store.lock(upload, [sha])
+        assert store.put_file(_spool(data), sha) is False
+
+        result = {}
+
+        def sweep():
+            from backend.app.db.connection import get_conn
+
+            with get_conn() as conn:
+                result["deleted"] = blob_store._delete_objects(conn, store, [sha])
+
+        t = threading.Thread(target=sweep)
+        t.start()
+        t.join(0.3)
+        assert t.is_alive(), "gc must wait for the upload holding the blob lock"
+        upload.commit()
+        t.join(5)
+    finally:
+        upload.close()
+
+    assert result == {"deleted": 0}
+    assert store.exists(sha)
+
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        conn.execute("DELETE FROM blobs WHERE sha256 = %s", (sha,))
+
+
+def test_gc_deletes_rows_then_objects(store, monkeypatch):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import blob_store
+
+    sha = _stored(store, b"unreferenced for a long time")
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO blobs (sha256, refcount, unreferenced_since) VALUES (%s, 0, now() - interval '2 days')", (sha,),
+        )
+    monkeypatch.setattr(blob_store, "get_store", lambda: store)
+
+    assert blob_store.gc(sweep_orphans=False)["deleted"] == 1
+    assert not store.exists(sha)
+    with get_conn() as conn:
+        assert conn.execute("SELECT count(*) FROM blobs WHERE sha256 = %s", (sha,)).fetchone()[0] == 0
+
+
+def test_orphan_sweep_skips_objects_with_a_row(store):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import blob_store
+
+    orphan = _stored(store, b"stored, then the transaction rolled back")
+    kept = _stored(store, b"referenced")
+    with get_conn() as conn:
+        conn.execute("INSERT INTO blobs (sha256, refcount) VALUES (%s, 1)", (kept,))
+        assert blob_store._delete_objects(conn, store, [orphan, kept]) == 1
+        conn.execute("DELETE FROM blobs WHERE sha256 = %s", (kept,))
+    assert not store.exists(orphan)
+    assert store.exists(kept)
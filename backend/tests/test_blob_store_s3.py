@@ -0,0 +1,66 @@
+# backend/tests/test_blob_store_s3.py
+"""S3BlobStore against the in-process S3 stub."""
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from backend.app.services import blob_store
+from backend.bench.stub_s3 import StubS3Client
+
+
+@pytest.fixture
+def s3():
+    client = StubS3Client(page_size=2)
+    return client, blob_store.S3BlobStore("docs", "blobs/", client=client)
+
+
+def _spool(tmp_path, data: bytes):
+    path = tmp_path / f"upload-{hashlib.md5(data).hexdigest()}.part"
+    path.write_bytes(data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+def test_put_file_stores_once_and_consumes_the_spool(s3, tmp_path):
+    client, store = s3
+    path, sha = _spool(tmp_path, b"original bytes")
+    assert not store.exists(sha)
+    assert store.put_file(str(path), sha) is True
+    assert not path.exists()
+    assert store.exists(sha)
+    assert store.url(sha) == f"s3://docs/blobs/{sha[:2]}/{sha[2:4]}/{sha}"
+    with store.open(sha) as f:
+        assert f.read() == b"original bytes"
+
+    again, _ = _spool(tmp_path, b"original bytes")
+    assert store.put_file(str(again), sha) is False
+    assert not again.exists()
+    assert client.calls["PutObject"] == 1
+
+
+def test_delete_and_listing(s3, tmp_path):
+    _, store = s3
+    shas = []
+    for i in range(5):
+        path, sha = _spool(tmp_path, f"blob {i}".encode())
+        store.put_file(str(path), sha)
+        shas.append(sha)
+
+    assert sorted(sha for sha, _ in store.iter_blobs()) == sorted(shas)
+    store.delete(shas[0])
+    store.delete(shas[0])  # deleting a missing object is not an error
+    assert not store.exists(shas[0])
+    assert sorted(sha for sha, _ in store.iter_blobs()) == sorted(shas[1:])
+    assert "X-Amz-Expires" in store.presigned_url(shas[1])
+
+
+def test_other_client_errors_propagate(s3):
+    client, store = s3
+
+    def denied(**kwargs):
+        raise client.exceptions.ClientError("AccessDenied", "HeadObject")
+
+    client.head_object = denied
+    with pytest.raises(client.exceptions.ClientError):
+        store.exists("0" * 64)
@@ -0,0 +1,70 @@
+# backend/tests/test_bulk_import.py
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+
+@pytest.fixture
+def workspace(database):
+    from backend.app.services import workspaces_service
+
+    return workspaces_service.create("tenant-import", "import workspace")["id"]
+
+
+def _archive(data: bytes) -> str:
+    from backend.app.services import documents_service
+
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".part", dir=documents_service.DOCUMENT_STORAGE_DIR)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _zip(members) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_unreadable_members_are_counted_as_failed_not_imported(workspace, run_jobs):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import bulk_import, jobs_service
+
+    archive = _archive(_zip([
+        ("notes/a.txt", b"Alpha notes about the import.\n" * 20),
+        ("notes/copy-of-a.txt", b"Alpha notes about the import.\n" * 20),
+        ("broken.docx", b"PK\x03\x04truncated docx"),
+        ("image.png", b"\x89PNG"),
+    ]))
+    job_id = bulk_import.enqueue_import(workspace, archive_path=archive)
+    run_jobs()
+
+    job = jobs_service.get(job_id)
+    assert job["status"] == "succeeded", job["error"]
+    stats = job["result"]
+    assert (stats["imported"], stats["duplicates"], stats["failed"], stats["unsupported"]) == (1, 1, 1, 1)
+    assert not os.path.exists(archive)
+    with get_conn() as conn:
+        titles = [r[0] for r in conn.execute("SELECT title FROM documents WHERE playground_id = %s", (workspace,))]
+    assert titles == ["a"]
+
+
+def test_bad_archive_fails_without_retries(workspace, run_jobs):
+    from backend.app.services import bulk_import, jobs_service
+
+    archive = _archive(b"neither zip nor tar")
+    job_id = bulk_import.enqueue_import(workspace, archive_path=archive)
+    run_jobs()
+
+    job = jobs_service.get(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+    assert "not a zip or tar archive" in job["error"]
+    assert not os.path.exists(archive)
@@ -0,0 +1,92 @@
+# backend/tests/test_documents_dedupe.py
+"""Identical uploads racing each other create one document / one version."""
+from __future__ import annotations
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+import pytest
+
+
+def _spool(data: bytes) -> str:
+    from backend.app.services import documents_service
+
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=documents_service.DOCUMENT_STORAGE_DIR)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _race(fn, *arg_sets):
+    with ThreadPoolExecutor(max_workers=len(arg_sets)) as pool:
+        return list(pool.map(lambda args: fn(*args), arg_sets))
+
+
+@pytest.fixture
+def workspace(database):
+    from backend.app.services import workspaces_service
+
+    return workspaces_service.create("tenant-dedupe", "dedupe workspace")["id"]
+
+
+def test_concurrent_new_documents_with_the_same_bytes(workspace):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import documents_service
+
+    data = b"same bytes, two uploads\n" * 50
+    sha = documents_service._sha256_bytes(data)
+    results = _race(
+        documents_service.create_document_and_version_from_path,
+        *[(workspace, f"copy {i}", _spool(data), sha, "txt") for i in range(4)],
+    )
+
+    assert all(r is not None for r in results)
+    assert sum(not r.get("duplicate") for r in results) == 1
+    assert len({str(r["document"]["id"]) for r in results}) == 1
+    with get_conn() as conn:
+        n = conn.execute(
+            "SELECT count(*) FROM documents d JOIN document_versions dv ON dv.document_id = d.id"
+            " WHERE d.playground_id = %s AND dv.sha256 = %s", (workspace, sha),
+        ).fetchone()[0]
+    assert n == 1
+    assert documents_service.find_version_by_sha256(workspace, sha)["document_id"] == results[0]["document"]["id"]
+
+
+def test_concurrent_new_versions_with_the_same_bytes(workspace):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import documents_service
+
+    first = b"version one\n" * 20
+    doc = documents_service.create_document_and_version_from_path(
+        workspace, "versioned", _spool(first), documents_service._sha256_bytes(first), "txt",
+    )
+    doc_id = str(doc["document"]["id"])
+
+    second = b"version two\n" * 20
+    sha = documents_service._sha256_bytes(second)
+    results = _race(documents_service.create_version_from_path, *[(doc_id, _spool(second), sha, "txt") for _ in range(4)])
+
+    assert sum(not r.get("duplicate") for r in results) == 1
+    assert len({str(r["version"]["id"]) for r in results}) == 1
+    with get_conn() as conn:
+        assert conn.execute("SELECT count(*) FROM document_versions WHERE document_id = %s", (doc_id,)).fetchone()[0] == 2
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            conn.execute(
+                "INSERT INTO document_versions (id, document_id, sha256) VALUES ('dup', %s, %s)", (doc_id, sha),
+            )
+    assert documents_service.find_document_version_by_sha256(doc_id, sha)["version_id"] == results[0]["version"]["id"]
+
+
+def test_lookup_errors_propagate(monkeypatch):
+    from backend.app.services import documents_service
+
+    def broken():
+        raise psycopg.OperationalError("connection refused")
+
+    monkeypatch.setattr(documents_service, "get_conn", broken)
+    with pytest.raises(psycopg.OperationalError):
+        documents_service.find_version_by_sha256("ws", "abc")
+    with pytest.raises(psycopg.OperationalError):
+        documents_service.find_document_version_by_sha256("doc", "abc")
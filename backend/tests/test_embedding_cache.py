@@ -0,0 +1,86 @@
+# backend/tests/test_embedding_cache.py
+"""embedding_cache hits and misses in the embedding pass, with the local backend."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+from backend.app.services import embeddings
+
+TESTDATA = Path(__file__).resolve().parents[2] / "testdata"
+
+
+class CountingBackend(embeddings.LocalEmbeddingBackend):
+    def __init__(self, model: str = ""):
+        super().__init__()
+        self.model = model or self.model
+        self.texts: List[str] = []
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        self.texts.extend(texts)
+        return await super().embed(texts)
+
+
+def _ingest(client, run_jobs, tenant: str) -> str:
+    from backend.app.services import workspaces_service
+
+    wid = workspaces_service.create(tenant, "embedding cache")["id"]
+    body = (TESTDATA / "vendorsupplylist.txt").read_bytes()
+    r = client.post(f"/workspaces/{wid}/documents:upload", params={"filename": "vendorsupplylist.txt"}, content=body)
+    assert r.status_code == 202, r.text
+    run_jobs()
+    job = client.get(f"/jobs/{r.json()['job_id']}").json()
+    assert job["status"] == "succeeded", job
+    return job["result"]["document_id"]
+
+
+def _vectors(doc_id: str) -> dict:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        return {c: v for c, v in conn.execute("SELECT chunk_id, vec FROM chunk_vectors WHERE doc_id = %s", (doc_id,))}
+
+
+def _drop_vectors(doc_id: str) -> None:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        conn.execute("DELETE FROM chunk_vectors WHERE doc_id = %s", (doc_id,))
+
+
+def test_reembedding_is_served_from_the_cache(client, run_jobs):
+    doc_id = _ingest(client, run_jobs, "tenant-emb-hit")
+    before = _vectors(doc_id)
+    assert before
+    _drop_vectors(doc_id)
+
+    backend = CountingBackend()
+    stats = embeddings.embed_document_chunks(doc_id, backend)
+    assert stats["chunks"] == stats["cache_hits"] == len(before)
+    assert stats["embedded"] == 0 and backend.texts == []
+    after = _vectors(doc_id)
+    assert after.keys() == before.keys()
+    assert all(np.allclose(after[c], before[c]) for c in before)
+
+
+def test_cache_is_keyed_by_model(client, run_jobs):
+    from backend.app.db.connection import get_conn
+
+    doc_id = _ingest(client, run_jobs, "tenant-emb-miss")
+    _drop_vectors(doc_id)
+
+    backend = CountingBackend(model="local-hash-test")
+    stats = embeddings.embed_document_chunks(doc_id, backend)
+    assert stats["cache_hits"] == 0
+    assert stats["embedded"] == len(backend.texts) == len(set(backend.texts)) > 0
+    with get_conn() as conn:
+        stored = conn.execute("SELECT count(*) FROM embedding_cache WHERE model = 'local-hash-test'").fetchone()[0]
+    assert stored == stats["embedded"]
+
+    # Second pass with the same model: everything hits.
+    _drop_vectors(doc_id)
+    again = CountingBackend(model="local-hash-test")
+    stats = embeddings.embed_document_chunks(doc_id, again)
+    assert stats["cache_hits"] == stats["chunks"] and stats["embedded"] == 0 and again.texts == []
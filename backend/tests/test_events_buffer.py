@@ -0,0 +1,63 @@
+# backend/tests/test_events_buffer.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import psycopg
+
+from backend.app.services import events_service
+
+
+def _buffer(monkeypatch, max_pending=4):
+    buf = events_service.EventBuffer(batch_size=2, interval_s=60, max_pending=max_pending)
+    # No flusher thread: every flush in these tests is explicit.
+    monkeypatch.setattr(buf, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(buf, "flush", _no_inline_flush(buf.flush))
+    return buf
+
+
+def _no_inline_flush(flush):
+    def guarded():
+        raise AssertionError("record() must not flush inline")
+    guarded.real = flush
+    return guarded
+
+
+def _db_down(monkeypatch, during=None):
+    @contextmanager
+    def get_conn():
+        if during:
+            during()
+        raise psycopg.OperationalError("db down")
+        yield
+
+    monkeypatch.setattr(events_service, "get_conn", get_conn)
+
+
+def test_record_drops_and_counts_when_full(monkeypatch):
+    buf = _buffer(monkeypatch)
+    for i in range(10):
+        buf.record("ws", "k", "test", {"i": i})
+    stats = buf.stats()
+    assert stats["pending"] == 4
+    assert stats["recorded"] == 4
+    assert stats["dropped"] == 6
+
+
+def test_failed_flush_requeues_within_capacity(monkeypatch):
+    buf = _buffer(monkeypatch)
+    for i in range(3):
+        buf.record("ws", "k", "test", {"i": i})
+
+    _db_down(monkeypatch)
+    assert buf.flush.real() == 0
+    assert buf.stats()["pending"] == 3 and buf.stats()["dropped"] == 0
+
+    # Two events arrive while the next attempt is failing: one old event no longer fits.
+    _db_down(monkeypatch, during=lambda: [buf.record("ws", "k", "test", {"late": j}) for j in range(2)])
+    assert buf.flush.real() == 0
+    stats = buf.stats()
+    assert stats["pending"] == 4
+    assert stats["dropped"] == 1
+    assert stats["flush_errors"] == 2
+    assert [r[3] for r in buf._pending] == [{"i": 1}, {"i": 2}, {"late": 0}, {"late": 1}]
@@ -0,0 +1,56 @@
+# backend/tests/test_ingest_e2e.py
+"""Upload -> extract -> chunk -> embed -> query on a freshly migrated schema."""
+from __future__ import annotations
+
+from pathlib import Path
+
+TESTDATA = Path(__file__).resolve().parents[2] / "testdata"
+
+
+def test_ingest_and_query_testdata_file(client, run_jobs):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import workspaces_service
+
+    ws = workspaces_service.create("tenant-e2e", "e2e workspace")
+    assert ws is not None
+    wid = ws["id"]
+
+    body = (TESTDATA / "productcatalog.txt").read_bytes()
+    r = client.post(f"/workspaces/{wid}/documents:upload", params={"filename": "productcatalog.txt"}, content=body)
+    assert r.status_code == 202, r.text
+    job_id = r.json()["job_id"]
+    assert run_jobs() >= 1
+
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "succeeded", job
+    doc_id = job["result"]["document_id"]
+
+    with get_conn() as conn:
+        doc = conn.execute(
+            "SELECT d.playground_id, d.title, d.kind, dv.page_count, dv.sha256 FROM documents d"
+            " JOIN document_versions dv ON dv.id = d.latest_version_id WHERE d.id = %s",
+            (doc_id,),
+        ).fetchone()
+        chunks = conn.execute("SELECT count(*), min(tenant_id) FROM chunks WHERE doc_id = %s", (doc_id,)).fetchone()
+        vectors = conn.execute("SELECT count(*) FROM chunk_vectors WHERE doc_id = %s", (doc_id,)).fetchone()[0]
+        linked = conn.execute("SELECT count(*) FROM playground_docs WHERE pg_id = %s AND doc_id = %s", (wid, doc_id)).fetchone()[0]
+    assert doc[0] == wid and doc[1] == "productcatalog" and doc[2] == "txt"
+    assert doc[3] > 0 and doc[4] == r.json()["sha256"]
+    assert chunks[0] > 0 and chunks[1] == "tenant-e2e"
+    assert vectors == chunks[0]
+    assert linked == 1
+
+    # The same bytes again are recognised without a second document.
+    again = client.post(f"/workspaces/{wid}/documents:upload", params={"filename": "copy.txt"}, content=body)
+    assert again.json()["status"] == "duplicate"
+    assert again.json()["document_id"] == doc_id
+
+    answer = client.post(f"/workspaces/{wid}/query", json={"question": "Which products are in the catalog?"})
+    assert answer.status_code == 200, answer.text
+    result = answer.json()
+    assert result["citations"]
+    assert {c["doc_id"] for c in result["citations"]} == {doc_id}
+
+    pages = client.get(f"/workspaces/{wid}/documents/{doc_id}/pages", params={"first": 1, "last": 1})
+    assert pages.status_code == 200
+    assert body.decode("utf-8")[:50] in "".join(p["text"] for p in pages.json()["pages"])
@@ -0,0 +1,68 @@
+# backend/tests/test_jobs.py
+from __future__ import annotations
+
+import time
+
+import pytest
+
+KIND = "pytest_noop"
+
+
+@pytest.fixture
+def jobs(database):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import jobs_service
+
+    yield jobs_service
+    with get_conn() as conn:
+        conn.execute("DELETE FROM jobs WHERE kind = %s", (KIND,))
+
+
+def _age(job_id: str, seconds: float) -> None:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        conn.execute("UPDATE jobs SET locked_at = now() - make_interval(secs => %s) WHERE job_id = %s", (seconds, job_id))
+
+
+def test_keep_alive_heartbeats_while_the_handler_runs(jobs):
+    job_id = jobs.enqueue(KIND, {})
+    assert jobs.claim("w1", [KIND])["job_id"] == job_id
+    _age(job_id, 10_000)
+    with jobs.keep_alive(job_id, "w1", interval_s=0.02):
+        time.sleep(0.15)
+    assert jobs.requeue_stale() == 0
+    assert jobs.get(job_id)["status"] == "running"
+
+
+def test_requeue_stale_fails_jobs_out_of_attempts(jobs):
+    retry = jobs.enqueue(KIND, {}, max_attempts=2)
+    spent = jobs.enqueue(KIND, {}, max_attempts=1)
+    claimed = {jobs.claim("w1", [KIND])["job_id"], jobs.claim("w1", [KIND])["job_id"]}
+    assert claimed == {retry, spent}
+    _age(retry, 10_000)
+    _age(spent, 10_000)
+
+    assert jobs.requeue_stale() == 2
+    assert jobs.get(retry)["status"] == "queued"
+    failed = jobs.get(spent)
+    assert failed["status"] == "failed" and failed["finished_at"] is not None
+    assert failed["error"] == "worker heartbeat lost"
+
+
+def test_only_the_holder_finishes_a_job(jobs):
+    job_id = jobs.enqueue(KIND, {})
+    jobs.claim("w1", [KIND])
+    _age(job_id, 10_000)
+    jobs.requeue_stale()
+    assert jobs.claim("w2", [KIND])["job_id"] == job_id
+
+    # w1 comes back after its job was handed to w2.
+    assert jobs.heartbeat(job_id, "w1") is False
+    assert jobs.complete(job_id, "w1", {"by": "w1"}) is False
+    assert jobs.fail(job_id, "w1", "late", 1, 5) == "lost"
+    assert jobs.get(job_id)["status"] == "running"
+
+    assert jobs.complete(job_id, "w2", {"by": "w2"}) is True
+    done = jobs.get(job_id)
+    assert done["status"] == "succeeded" and done["result"] == {"by": "w2"}
@@ -0,0 +1,143 @@
+# backend/tests/test_openai_client.py
+"""Retry/backoff of the shared OpenAI client against bench/stub_openai.py."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+import pytest
+
+from backend.app.services import openai_client
+from backend.bench import stub_openai
+
+CHAT = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Starts the stub on a free port; returns its config (mutable between calls)."""
+    cfg = argparse.Namespace(latency_ms=0.0, token_delay_ms=0.0, fail_rate=0.0, rate_limit_every=0, retry_after=0.01)
+    httpd = stub_openai.serve("127.0.0.1", 0, cfg)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openai_client, "OPENAI_API_KEY", "stub")
+    monkeypatch.setattr(openai_client, "OPENAI_BASE_URL", f"http://127.0.0.1:{httpd.server_address[1]}/v1")
+    monkeypatch.setattr(openai_client, "OPENAI_RATE_LIMIT_RPS", 0.0)
+    monkeypatch.setattr(openai_client, "_loops", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(stub_openai, "STATS", {"requests": 0, "rate_limited": 0, "errors": 0})
+    yield cfg
+    httpd.shutdown()
+    httpd.server_close()
+
+
+async def _first_429(cfg) -> None:
+    """Waits until the stub has answered one 429, then stops rate limiting."""
+    for _ in range(400):
+        if stub_openai.STATS["rate_limited"]:
+            break
+        await asyncio.sleep(0.005)
+    cfg.rate_limit_every = 0
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await openai_client.shutdown()
+    return asyncio.run(main())
+
+
+def test_post_json_retries_a_429_after_retry_after(stub):
+    stub.rate_limit_every = 1
+    stub.retry_after = 0.2
+
+    async def call():
+        t0 = time.perf_counter()
+        task = asyncio.create_task(openai_client.post_json("/chat/completions", CHAT))
+        await _first_429(stub)
+        return await task, time.perf_counter() - t0
+
+    body, elapsed = _run(call())
+    assert body["choices"][0]["message"]["content"]
+    assert stub_openai.STATS == {"requests": 2, "rate_limited": 1, "errors": 0}
+    assert elapsed >= 0.2
+
+
+def test_retry_after_beyond_the_cap_falls_back_to_backoff(stub, monkeypatch):
+    stub.rate_limit_every = 2
+    stub.retry_after = 3600
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRY_DELAY_S", 0.05)
+
+    async def call():
+        t0 = time.perf_counter()
+        await openai_client.post_json("/chat/completions", CHAT)  # request 1: ok
+        await openai_client.post_json("/chat/completions", CHAT)  # request 2: 429, request 3: ok
+        return time.perf_counter() - t0
+
+    assert _run(call()) < 1.0
+    assert stub_openai.STATS["rate_limited"] == 1
+    assert stub_openai.STATS["requests"] == 3
+
+
+def test_retry_delay_clamps_the_hint(monkeypatch):
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRY_DELAY_S", 5.0)
+    assert openai_client._retry_delay(2.0, 0) == 2.0
+    for attempt in range(10):
+        assert 0 <= openai_client._retry_delay(3600.0, attempt) <= 5.0
+        assert 0 <= openai_client._retry_delay(None, attempt) <= 5.0
+
+
+def test_gives_up_after_max_retries(stub, monkeypatch):
+    stub.fail_rate = 1.0
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRIES", 3)
+    monkeypatch.setattr(openai_client, "_BACKOFF_BASE", 0.001)
+
+    with pytest.raises(httpx.HTTPStatusError) as e:
+        _run(openai_client.post_json("/chat/completions", CHAT))
+    assert e.value.response.status_code == 500
+    assert stub_openai.STATS["errors"] == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    with pytest.raises(httpx.HTTPStatusError) as e:
+        _run(openai_client.post_json("/unknown", CHAT))
+    assert e.value.response.status_code == 404
+    assert stub_openai.STATS["requests"] == 1
+
+
+def test_stream_retries_before_the_first_event(stub):
+    stub.rate_limit_every = 1
+
+    async def call():
+        deltas = []
+        async for event in openai_client.stream_json("/chat/completions", CHAT):
+            deltas.append(event["choices"][0]["delta"].get("content", ""))
+        return deltas
+
+    async def first_429_then_ok():
+        task = asyncio.create_task(call())
+        await _first_429(stub)
+        return await task
+
+    deltas = _run(first_429_then_ok())
+    assert "".join(deltas).startswith("Stub provider output.")
+    assert stub_openai.STATS["rate_limited"] == 1
+
+
+def test_each_event_loop_gets_its_own_client(stub):
+    # The worker runs one event loop per document; a client or bucket from
+    # an earlier, closed loop must not be reused.
+    clients = []
+
+    async def call():
+        clients.append(openai_client.get_client())
+        return await openai_client.post_json("/chat/completions", CHAT)
+
+    assert asyncio.run(call())["choices"]
+    assert asyncio.run(call())["choices"]
+    assert clients[0] is not clients[1]
+    assert stub_openai.STATS["requests"] == 2
@@ -0,0 +1,76 @@
+# backend/tests/test_rerank.py
+"""BM25 ordering, SimHash dedupe and budgeted trimming of retrieved hits."""
+from __future__ import annotations
+
+from pathlib import Path
+
+from backend.app.services import chunking, rerank
+
+TESTDATA = Path(__file__).resolve().parents[2] / "testdata"
+
+
+def _hit(chunk_id: str, text: str, char_start: int = 0) -> dict:
+    return {"chunk_id": chunk_id, "text": text, "char_start": char_start, "char_end": char_start + len(text)}
+
+
+def test_lexical_scorer_prefers_query_terms():
+    scores = rerank.LexicalScorer().score(
+        "solar panel warranty",
+        ["The solar panel warranty lasts ten years.", "Shipping is free on orders over fifty.", "One panel is mounted on the roof."],
+    )
+    assert scores[0] > scores[2] > scores[1] == 0.0
+
+
+def test_dedupe_drops_near_duplicates_keeping_the_first():
+    base = "The inverter converts direct current from the panels into alternating current for the house"
+    hits = [_hit("a", base), _hit("b", base + "."), _hit("c", "Batteries store surplus energy for use at night")]
+    kept, dropped = rerank.dedupe(hits)
+    assert [h["chunk_id"] for h in kept] == ["a", "c"]
+    assert dropped == 1
+
+
+def test_rerank_moves_relevant_hit_up():
+    hits = [_hit("a", "Shipping is free on orders over fifty."), _hit("b", "The solar panel warranty lasts ten years.")]
+    out, stats = rerank.rerank("solar panel warranty", hits, 2, scorer=rerank.LexicalScorer(), time_budget_ms=10_000)
+    assert [h["chunk_id"] for h in out] == ["b", "a"]
+    assert stats["scorer"] == "lexical" and not stats["time_budget_exceeded"]
+
+
+def test_trim_keeps_relevant_sentences_and_narrows_offsets():
+    text = "Intro about the company. The warranty covers panels for ten years. Contact sales for pricing."
+    out, stats = rerank.rerank("warranty panels", [_hit("a", text, char_start=100)], 1, scorer=rerank.LexicalScorer(), token_budget=12, time_budget_ms=10_000)
+    (h,) = out
+    assert h["trimmed"] and h["text"] == "The warranty covers panels for ten years."
+    assert text[h["char_start"] - 100:h["char_end"] - 100] == h["text"]
+    assert stats["tokens_out"] <= 12 < stats["tokens_in"]
+
+
+def test_token_budget_caps_total_output():
+    sentence = "Panels convert sunlight into electricity every day. "
+    hits = [_hit(str(i), f"Topic {i}. " + sentence * 20) for i in range(5)]
+    out, stats = rerank.rerank("panels sunlight", hits, 5, scorer=rerank.LexicalScorer(), token_budget=40)
+    assert sum(rerank.count_text_tokens(h["text"]) for h in out) == stats["tokens_out"] <= 40
+
+
+def test_exhausted_time_budget_keeps_retrieval_order_and_truncates():
+    hits = [_hit("a", "Shipping is free. Returns within thirty days."), _hit("b", "The solar panel warranty lasts ten years.")]
+    out, stats = rerank.rerank("solar panel warranty", hits, 2, scorer=rerank.LexicalScorer(), time_budget_ms=-1)
+    assert stats["time_budget_exceeded"]
+    assert [h["chunk_id"] for h in out] == ["a", "b"]
+    assert out[0]["text"] == hits[0]["text"] and out[0]["char_end"] == hits[0]["char_end"]
+
+
+def test_dedupe_past_its_deadline_keeps_the_rest_unchecked():
+    hits = [_hit("a", "same words here again"), _hit("b", "same words here again")]
+    kept, dropped = rerank.dedupe(hits, deadline=0.0)
+    assert [h["chunk_id"] for h in kept] == ["a", "b"] and dropped == 0
+
+
+def test_chunk_sized_candidates_stay_near_the_default_budget():
+    text = (TESTDATA / "complaintslog.txt").read_text(encoding="utf-8")
+    hits = [_hit(str(i), text[i * 2000:(i + 1) * 2000], char_start=i * 2000) for i in range(16)]
+    chunking.count_tokens(" warm")  # tokenizer load is not part of the stage
+    out, stats = rerank.rerank("late delivery complaint refund", hits, 8)
+    assert out
+    # Past the deadline only cheap truncation is left, so overshoot stays small.
+    assert stats["rerank_ms"] < 3 * rerank.RERANK_TIME_BUDGET_MS
@@ -0,0 +1,40 @@
+# backend/tests/test_retrieval.py
+"""Snippet fields of lexical hits."""
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+import psycopg
+
+from backend.app.services import retrieval
+
+TESTDATA = Path(__file__).resolve().parents[2] / "testdata"
+
+
+def test_lexical_hits_on_unembedded_chunks_carry_the_document_title(client, run_jobs):
+    from backend.app.db.connection import get_conn
+    from backend.app.services import workspaces_service
+
+    wid = workspaces_service.create("tenant-lexical", "lexical titles")["id"]
+    r = client.post(
+        f"/workspaces/{wid}/documents:upload",
+        params={"filename": "operatingprocedures.txt", "title": "Operating procedures"},
+        content=(TESTDATA / "operatingprocedures.txt").read_bytes(),
+    )
+    assert r.status_code == 202, r.text
+    run_jobs()
+    doc_id = client.get(f"/jobs/{r.json()['job_id']}").json()["result"]["document_id"]
+    with get_conn() as conn:
+        # As if the embedding stage had not reached this document yet.
+        conn.execute("DELETE FROM chunk_vectors WHERE doc_id = %s", (doc_id,))
+
+    async def search():
+        async with await psycopg.AsyncConnection.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+            return await retrieval.lexical_search(conn, [doc_id], "procedures", 5)
+
+    hits = asyncio.run(search())["hits"]
+    assert hits
+    assert {h["title"] for h in hits} == {"Operating procedures"}
+    assert {c["title"] for c in retrieval.citations_for(hits)} == {"Operating procedures"}
@@ -0,0 +1,91 @@
+# backend/tests/test_synth_cache.py
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.app.services import synth_cache
+
+
+def _doc(topic: str) -> dict:
+    return {"topic": topic, "outline": ["A"], "content_md": f"# {topic}", "provider": "builtin"}
+
+
+def test_request_key_includes_tenant():
+    a = synth_cache.request_key("Topic", 3, 0.7, "builtin", "tenant-a")
+    assert a == synth_cache.request_key("  topic ", 3, 0.701, "builtin", "tenant-a")
+    assert a != synth_cache.request_key("Topic", 3, 0.7, "builtin", "tenant-b")
+    assert a != synth_cache.request_key("Topic", 3, 0.7, "builtin")
+
+
+def test_waiters_take_over_from_a_cancelled_leader():
+    cache = synth_cache.SynthCache(8, 60, 0)
+    calls = []
+
+    async def slow():
+        calls.append("leader")
+        await asyncio.sleep(10)
+        return _doc("never")
+
+    async def fast():
+        calls.append("waiter")
+        return _doc("t")
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_create("k", slow))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_create("k", fast))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    value, source = asyncio.run(main())
+    assert value == _doc("t") and source == "miss"
+    assert calls == ["leader", "waiter"]
+    assert cache.stats()["inflight"] == 0
+
+
+def test_waiters_share_the_leaders_failure():
+    cache = synth_cache.SynthCache(8, 60, 0)
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def main():
+        return await asyncio.gather(
+            cache.get_or_create("k", boom), cache.get_or_create("k", boom), return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.counters["coalesced"] == 0
+
+
+def test_cache_tiers_are_scoped_to_the_tenant(client):
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        for t in ("tenant-sa", "tenant-sb"):
+            conn.execute("INSERT INTO tenants (tenant_id, name) VALUES (%s, %s) ON CONFLICT DO NOTHING", (t, t))
+
+    def synth(tenant_id, path="/synth/document"):
+        body = {"topic": "Tenant scoped report", "num_sections": 2, "tenant_id": tenant_id}
+        return client.post(path, json=body)
+
+    assert synth("tenant-sa").json()["cache"] == "miss"
+    assert synth("tenant-sa").json()["cache"] == "memory"
+    assert synth("tenant-sb").json()["cache"] == "miss"
+
+    # Memory dropped (e.g. a restart): each tenant only finds its own synth_docs row.
+    synth_cache.cache._entries.clear()
+    with get_conn() as conn:
+        conn.execute("DELETE FROM synth_docs WHERE tenant_id = 'tenant-sb'")
+    assert synth("tenant-sb").json()["cache"] == "miss"
+    synth_cache.cache._entries.clear()
+    stream = synth("tenant-sa", "/synth/document:stream").text
+    assert '"cache": "db"' in stream
+    assert stream.count("event: ") == 2
@@ -0,0 +1,93 @@
+# backend/tests/test_synth_stream.py
+"""Server-sent event framing of /synth/document:stream with the builtin writer."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import List, Tuple
+
+
+def _events(body: str) -> List[Tuple[str, dict]]:
+    assert body.endswith("\n\n")
+    out = []
+    for frame in body[:-2].split("\n\n"):
+        name, data = frame.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        out.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def _stream(client, **body):
+    r = client.post("/synth/document:stream", json={"topic": "Warehouse safety", "num_sections": 3, **body})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/event-stream")
+    return _events(r.text)
+
+
+def test_stream_frames_outline_sections_done(client):
+    events = _stream(client, use_cache=False)
+    names = [n for n, _ in events]
+    assert names[0] == "outline" and names[-1] == "done"
+    assert set(names[1:-1]) <= {"section_delta", "section"}
+    assert names.count("section") == 3
+
+    outline = events[0][1]
+    assert outline["topic"] == "Warehouse safety" and len(outline["outline"]) == 3 and outline["provider"] == "builtin"
+
+    deltas = {i: "" for i in range(3)}
+    sections = {}
+    for name, data in events[1:-1]:
+        if name == "section_delta":
+            assert data["index"] not in sections  # no deltas after a section is complete
+            deltas[data["index"]] += data["delta"]
+        else:
+            sections[data["index"]] = data
+    for i, title in enumerate(outline["outline"]):
+        assert sections[i]["title"] == title and not sections[i]["failed"]
+        assert sections[i]["body_md"] == deltas[i].strip()
+
+    done = events[-1][1]
+    assert done["cache"] == "bypass" and done["outline"] == outline["outline"]
+    assert all(s["body_md"] in done["content_md"] for s in sections.values())
+
+
+def test_cached_stream_is_outline_then_done(client):
+    first = _stream(client, topic="Forklift maintenance")
+    again = _stream(client, topic="Forklift maintenance")
+    assert first[-1][1]["cache"] == "miss"
+    assert [n for n, _ in again] == ["outline", "done"]
+    assert again[0][1]["outline"] == first[0][1]["outline"]
+    assert again[1][1]["cache"] == "memory" and again[1][1]["content_md"] == first[-1][1]["content_md"]
+
+
+def test_coalesced_waiter_sees_the_leaders_failed_sections(client, monkeypatch):
+    from backend.app.routes import synth
+
+    topic = "Loading dock incidents"
+    failing = synth._outline_builtin(topic, 2)[0]
+    real = synth._section_builtin_stream
+
+    async def flaky(topic, title):
+        await asyncio.sleep(0.3)  # keep the leader in flight while the waiter arrives
+        if title == failing:
+            raise RuntimeError("provider down")
+        async for delta in real(topic, title):
+            yield delta
+
+    monkeypatch.setattr(synth, "_section_builtin_stream", flaky)
+    monkeypatch.setattr(synth, "SYNTH_SECTION_RETRIES", 0)
+
+    body = {"topic": topic, "num_sections": 2}
+    leader = {}
+    t = threading.Thread(target=lambda: leader.update(events=_stream(client, **body)))
+    t.start()
+    time.sleep(0.1)
+    waiter = client.post("/synth/document", json=body).json()
+    t.join()
+
+    done = leader["events"][-1][1]
+    assert done["failed_sections"] == [failing]
+    assert waiter["cache"] == "coalesced"
+    assert waiter["failed_sections"] == [failing] and waiter["content_md"] == done["content_md"]
@@ -0,0 +1,41 @@
+# backend/tests/test_unsupported_upload.py
+"""Files no extractor handles are rejected instead of stored with zero pages."""
+from __future__ import annotations
+
+import hashlib
+
+BINARY = bytes(range(256)) * 64
+
+
+def _documents(workspace_id: str) -> int:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        return conn.execute("SELECT count(*) FROM documents WHERE playground_id = %s", (workspace_id,)).fetchone()[0]
+
+
+def test_upload_of_unsupported_binary_is_415(client, run_jobs):
+    from backend.app.services import workspaces_service
+
+    wid = workspaces_service.create("tenant-unsupported", "unsupported uploads")["id"]
+    r = client.post(f"/workspaces/{wid}/documents:upload", params={"filename": "firmware.bin"}, content=BINARY)
+    assert r.status_code == 415, r.text
+    assert "no extractor" in r.json()["detail"]
+    run_jobs()
+    assert _documents(wid) == 0
+
+
+def test_ingest_job_fails_permanently_on_unsupported_file(client, run_jobs, tmp_path):
+    from backend.app.services import ingest_service, workspaces_service
+
+    wid = workspaces_service.create("tenant-unsupported", "unsupported jobs")["id"]
+    spool = tmp_path / "upload.bin"
+    spool.write_bytes(BINARY)
+    job_id = ingest_service.enqueue_ingest(wid, "firmware", str(spool), hashlib.sha256(BINARY).hexdigest(), "bin")
+    assert run_jobs() == 1
+
+    job = client.get(f"/jobs/{job_id}").json()
+    # Failed for good on the first attempt, not queued for a retry.
+    assert job["status"] == "failed" and "no extractor" in job["error"]
+    assert not spool.exists()
+    assert _documents(wid) == 0
@@ -0,0 +1,117 @@
+# backend/tests/test_vector_backends.py
+"""Every retrieval.VECTOR_BACKENDS implementation answers the same queries the same way."""
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+import psycopg
+import pytest
+from pgvector.psycopg import register_vector_async
+
+from backend.app.services import embeddings, retrieval, vector_index
+
+TESTDATA = Path(__file__).resolve().parents[2] / "testdata"
+
+pytestmark = pytest.mark.parametrize("backend", sorted(retrieval.VECTOR_BACKENDS))
+
+
+def _upload(client, run_jobs, tenant: str, filename: str) -> str:
+    """Ingests a testdata file into a new workspace; returns the document id."""
+    from backend.app.services import workspaces_service
+
+    wid = workspaces_service.create(tenant, f"{tenant} workspace")["id"]
+    r = client.post(f"/workspaces/{wid}/documents:upload", params={"filename": filename}, content=(TESTDATA / filename).read_bytes())
+    assert r.status_code == 202, r.text
+    run_jobs()
+    job = client.get(f"/jobs/{r.json()['job_id']}").json()
+    assert job["status"] == "succeeded", job
+    return job["result"]["document_id"]
+
+
+def _sync(tenant: str) -> None:
+    from backend.app.db.connection import get_conn
+
+    with get_conn() as conn:
+        vector_index.sync(conn, tenant)
+
+
+def _search(backend: str, doc_ids, question: str, top_k: int = 5, **kwargs) -> dict:
+    vec = embeddings.LocalEmbeddingBackend().embed_one(question)
+
+    async def run() -> dict:
+        async with await psycopg.AsyncConnection.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+            await register_vector_async(conn)
+            return await retrieval.VECTOR_BACKENDS[backend](conn, doc_ids, vec, top_k, **kwargs)
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope="module")
+def corpus(client):
+    from backend.app import worker
+
+    def run_jobs():
+        while worker.run_one("pytest"):
+            pass
+
+    docs = {
+        "catalog": _upload(client, run_jobs, "tenant-vec-a", "productcatalog.txt"),
+        "complaints": _upload(client, run_jobs, "tenant-vec-a", "complaintslog.txt"),
+        "vendors": _upload(client, run_jobs, "tenant-vec-b", "vendorsupplylist.txt"),
+    }
+    _sync("tenant-vec-a")
+    _sync("tenant-vec-b")
+    return docs
+
+
+def test_hits_stay_in_scope(backend, corpus):
+    scope = [corpus["catalog"], corpus["complaints"]]
+    result = _search(backend, scope, "vendor supply list delivery terms", top_k=10)
+    assert result["hits"]
+    assert {h["doc_id"] for h in result["hits"]} <= set(scope)
+    assert [h["score"] for h in result["hits"]] == sorted((h["score"] for h in result["hits"]), reverse=True)
+
+    only = _search(backend, [corpus["vendors"]], "vendor supply list delivery terms", top_k=10)
+    assert only["hits"] and {h["doc_id"] for h in only["hits"]} == {corpus["vendors"]}
+
+
+def test_empty_scopes_return_no_hits(backend, corpus):
+    assert _search(backend, [], "anything")["hits"] == []
+    # A document of a tenant that has no vectors (and, locally, no index).
+    assert _search(backend, ["no-such-document"], "anything")["hits"] == []
+
+
+def test_exact_and_hnsw_agree(backend, corpus):
+    scope = [corpus["catalog"], corpus["complaints"]]
+    exact = _search(backend, scope, "customer complaint about a late order", strategy="exact")
+    assert exact["strategy"] == "exact"
+    graph = _search(backend, scope, "customer complaint about a late order", strategy="hnsw")
+    if backend == "local" and vector_index.hnswlib is None:
+        assert graph["strategy"] == "exact"  # no graph to walk; answered exactly
+    assert [h["chunk_id"] for h in graph["hits"]] == [h["chunk_id"] for h in exact["hits"]]
+
+
+def test_deleted_chunks_are_never_returned(backend, client, run_jobs):
+    from backend.app.db.connection import get_conn
+
+    tenant = f"tenant-vec-del-{backend}"
+    doc_id = _upload(client, run_jobs, tenant, "operatingprocedures.txt")
+    _sync(tenant)
+    question = "opening procedures checklist"
+    before = [h["chunk_id"] for h in _search(backend, [doc_id], question, top_k=3)["hits"]]
+    assert len(before) == 3
+
+    with get_conn() as conn:
+        conn.execute("DELETE FROM chunks WHERE chunk_id = %s", (before[0],))
+
+    # Locally the row is still indexed: the stale chunk is skipped and the next one fills in.
+    stale = [h["chunk_id"] for h in _search(backend, [doc_id], question, top_k=3)["hits"]]
+    assert before[0] not in stale and stale[:2] == before[1:] and len(stale) == 3
+
+    # After a sync it is tombstoned.
+    _sync(tenant)
+    snap = vector_index.get_index(tenant).refresh()
+    assert snap.deleted[snap.row_of[before[0]]]
+    assert [h["chunk_id"] for h in _search(backend, [doc_id], question, top_k=3)["hits"]] == stale
@@ -17,7 +17,7 @@ export default function SynthCard({ apiBase, defaultTopic = '' }) {
   };
 
   const downloadMarkdown = () => {
-    if (!result?.content_md) return;
+    if (!result?.content_md || result.streaming) return;
     const blob = new Blob([result.content_md], { type: 'text/markdown' });
     const a = document.createElement('a');
     a.href = URL.createObjectURL(blob);
@@ -28,7 +28,7 @@ export default function SynthCard({ apiBase, defaultTopic = '' }) {
   };
 
   const renderContent = () => {
-    if (generating) return <p className="p-4 text-center" style={{ color: tokens.muted }}>Generating document...</p>;
+    if (generating && !result) return <p className="p-4 text-center" style={{ color: tokens.muted }}>Generating document...</p>;
     if (error) return <p className="p-4 text-center" style={{ color: tokens.danger }}>Error: {error}</p>;
     if (!result) return <p className="p-4 text-center" style={{ color: tokens.muted }}>Enter a topic and generate a document.</p>;
 
@@ -109,9 +109,9 @@ export default function SynthCard({ apiBase, defaultTopic = '' }) {
         </button>
         <button
           onClick={downloadMarkdown}
-          disabled={!result?.content_md}
+          disabled={!result?.content_md || result.streaming}
           className={`px-6 py-3 rounded-lg font-bold text-sm transition-all duration-200 ${
-            !result?.content_md ? 'bg-gray-700 cursor-not-allowed' : 'bg-white bg-opacity-10 hover:bg-opacity-20'
+            !result?.content_md || result.streaming ? 'bg-gray-700 cursor-not-allowed' : 'bg-white bg-opacity-10 hover:bg-opacity-20'
           }`}
           style={{ color: tokens.text }}
         >
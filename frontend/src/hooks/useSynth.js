@@ -1,5 +1,25 @@
 import { useState } from 'react';
 
+// Parse one "event: x\ndata: {...}" block from the SSE stream.
+function parseEvent(block) {
+  let event = 'message';
+  const data = [];
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+  }
+  if (!data.length) return null;
+  return { event, data: JSON.parse(data.join('\n')) };
+}
+
+function assemble(topic, outline, bodies) {
+  const parts = [`# Document: ${topic}\n`];
+  outline.forEach((title, i) => {
+    if (bodies[i]) parts.push(`## ${title}\n\n${bodies[i].trim()}\n`);
+  });
+  return parts.join('\n');
+}
+
 export default function useSynth(apiBase) {
   const [generating, setGenerating] = useState(false);
   const [result, setResult] = useState(null);
@@ -15,9 +35,9 @@ export default function useSynth(apiBase) {
     setError(null);
 
     try {
-      const res = await fetch(`${apiBase}/synth/document`, {
+      const res = await fetch(`${apiBase}/synth/document:stream`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
         body: JSON.stringify({
           topic,
           num_sections: Number(numSections),
@@ -28,9 +48,54 @@ export default function useSynth(apiBase) {
         const txt = await res.text().catch(() => '');
         throw new Error(`HTTP ${res.status} ${res.statusText} ${txt}`);
       }
-      const data = await res.json();
-      setResult(data);
-      return data;
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let outline = [];
+      let provider = '';
+      const bodies = [];
+      let final = null;
+
+      const publish = () => setResult({
+        topic,
+        num_sections: Number(numSections),
+        outline,
+        provider,
+        content_md: assemble(topic, outline, bodies),
+        streaming: true,
+      });
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+          const msg = parseEvent(buffer.slice(0, sep));
+          buffer = buffer.slice(sep + 2);
+          if (!msg) continue;
+          const { event, data } = msg;
+          if (event === 'outline') {
+            outline = data.outline;
+            provider = data.provider;
+          } else if (event === 'section_delta') {
+            bodies[data.index] = (bodies[data.index] || '') + data.delta;
+          } else if (event === 'section_reset') {
+            bodies[data.index] = '';
+          } else if (event === 'section') {
+            bodies[data.index] = data.body_md;
+          } else if (event === 'done') {
+            final = data;
+          } else if (event === 'error') {
+            throw new Error(data.detail || 'Synthesis failed');
+          }
+          if (final) setResult(final);
+          else publish();
+        }
+      }
+      if (!final) throw new Error('Stream ended before the document was complete.');
+      return final;
     } catch (e) {
       setError(e.message || String(e));
       return null;